@@ -1,4 +1,5 @@
 import argparse
+import multiprocessing
 import os
 
 from profilehooks import profile
@@ -6,7 +7,7 @@ from profilehooks import profile
 from pygly2.algorithms import database
 from pygly2.utils import pickle
 
-from .matching import find_matches, DEFAULT_MS2_MATCH_TOLERANCE, DEFAULT_MS1_MATCH_TOLERANCE, MassShift, NoShift
+from .matching import find_matches, match_candidates, precursor_candidates, DEFAULT_MS2_MATCH_TOLERANCE, DEFAULT_MS1_MATCH_TOLERANCE, MassShift, NoShift
 from .spectra import bupid_topdown_deconvoluter, spectra
 from .report import render
 
@@ -15,7 +16,26 @@ def main(structure_database, observed_data,
          ms1_match_tolerance=DEFAULT_MS1_MATCH_TOLERANCE,
          ms2_match_tolerance=DEFAULT_MS2_MATCH_TOLERANCE,
          shifts=None,
-         ion_types="ABCXYZ"):
+         ion_types="ABCXYZ",
+         join=False,
+         workers=1,
+         chunk_size=100,
+         spectrum_store=None):
+    '''
+    Search `observed_data` for every structure in `structure_database`.
+
+    If `join` is |True|, structures are paired with the observed precursors they match by
+    :func:`~.matching.precursor_candidates` in one sweep over the precursor masses, and
+    structures without a precursor match are never loaded. Otherwise each structure is
+    loaded and searched for with its own queries by :func:`~.matching.find_matches`.
+
+    If `workers` is greater than 1, the search is run by :func:`search_parallel`, which
+    requires both databases to be stored in files.
+
+    If `spectrum_store` is given, tandem spectra are read from the
+    :class:`~.spectra.SpectrumStore` saved with that path prefix, which is built first
+    if it does not exist.
+    '''
     if shifts is None:
         shifts = [NoShift]
     if isinstance(structure_database, str):
@@ -31,8 +51,47 @@ def main(structure_database, observed_data,
         observed_db = observed_data
     else:
         raise Exception("Cannot load data: {}".format(observed_data))
+    if spectrum_store is not None:
+        observed_db.use_spectrum_store(spectrum_store)
+    params = dict(shifts=shifts,
+                  ms1_match_tolerance=ms1_match_tolerance,
+                  ms2_match_tolerance=ms2_match_tolerance,
+                  ion_types=ion_types,
+                  join=join)
+    if workers > 1:
+        return search_parallel(structure_database, observed_db, workers=workers,
+                               chunk_size=chunk_size, **params)
+    return search(structure_database, observed_db, **params)
+
+
+def search(structure_database, observed_db,
+           ms1_match_tolerance=DEFAULT_MS1_MATCH_TOLERANCE,
+           ms2_match_tolerance=DEFAULT_MS2_MATCH_TOLERANCE,
+           shifts=None,
+           ion_types="ABCXYZ",
+           join=False,
+           id_range=None,
+           precursor_masses=None):
+    '''
+    Search `observed_db` for the structures in `structure_database`, in order of glycan_id.
+    If `id_range` is given as a pair ``(start, end)``, only structures whose glycan_id is at
+    least `start` and less than `end` are searched. Either bound may be |None|.
+    `precursor_masses` is passed to :func:`~.matching.precursor_candidates` in join mode.
+    '''
+    shifts = shifts or [NoShift]
     matches = []
-    for structure in structure_database:
+    if join:
+        for structure, candidates in precursor_candidates(structure_database, observed_db,
+                                                          shifts=shifts,
+                                                          ms1_match_tolerance=ms1_match_tolerance,
+                                                          id_range=id_range,
+                                                          precursor_masses=precursor_masses):
+            matches.append(match_candidates(structure, candidates,
+                                            shifts=shifts,
+                                            ms2_match_tolerance=ms2_match_tolerance,
+                                            ion_types=ion_types))
+        return matches
+    for structure in _iter_structures(structure_database, id_range):
         results = find_matches(structure, observed_db,
                                shifts=shifts,
                                ms1_match_tolerance=ms1_match_tolerance,
@@ -43,6 +102,111 @@ def main(structure_database, observed_data,
     return matches
 
 
+def _iter_structures(structure_database, id_range=None):
+    if id_range is None:
+        for structure in structure_database:
+            yield structure
+        return
+    start, end = id_range
+    rows = structure_database.execute(
+        "select * from {table_name} where (? is null or glycan_id >= ?)"
+        " and (? is null or glycan_id < ?) order by glycan_id;", (start, start, end, end))
+    for row in rows:
+        yield structure_database.record_type.from_sql(row, database=structure_database)
+
+
+def _id_ranges(structure_database, chunk_size):
+    ids = [row[0] for row in structure_database.execute(
+        "select glycan_id from {table_name} order by glycan_id;")]
+    for i in range(0, len(ids), chunk_size):
+        start = ids[i]
+        end = ids[i + chunk_size] if i + chunk_size < len(ids) else None
+        yield start, end
+
+
+# The sorted precursor masses shared by the searches of a worker process
+_worker_precursor_masses = None
+
+
+def _init_worker(precursor_masses):
+    global _worker_precursor_masses
+    _worker_precursor_masses = precursor_masses
+
+
+def _search_range(args):
+    '''
+    Search the structures in a range of glycan_ids, using new read-only connections to both
+    databases. Run by the worker processes of :func:`search_parallel`.
+    '''
+    structure_path, record_type, observed_path, precursor_type, store_path, id_range, params = args
+    structure_database = database.RecordDatabase(structure_path, record_type=record_type)
+    observed_db = spectra.MSMSSqlDB(observed_path, precursor_type=precursor_type, spectrum_store=store_path)
+    try:
+        for connection in (structure_database.connection, observed_db.connection):
+            connection.execute("PRAGMA query_only = ON;")
+        return search(structure_database, observed_db, id_range=id_range,
+                      precursor_masses=_worker_precursor_masses, **params)
+    finally:
+        structure_database.connection.close()
+        observed_db.connection.close()
+
+
+def search_parallel(structure_database, observed_db, workers=None, chunk_size=100, **params):
+    '''
+    Search `observed_db` for the structures in `structure_database` using a pool of worker
+    processes.
+
+    The structure database is split into ranges of `chunk_size` glycan_ids. Each worker opens
+    its own read-only connections to both database files, memory-maps the saved
+    :class:`~.spectra.SpectrumStore` of `observed_db` if it has one, and runs :func:`search`
+    on its ranges. In join mode, the sorted precursor masses are loaded once here and sent to
+    each worker when it starts. The results of each range are passed back as soon as the ranges before it are
+    done, and are returned in the same order as :func:`search` would return them.
+
+    Parameters
+    ----------
+    structure_database: RecordDatabase
+    observed_db: MSMSSqlDB
+    workers: int, optional
+        The number of worker processes. Defaults to the number of CPUs.
+    chunk_size: int, optional
+        The number of structures searched by a worker at a time. Defaults to 100
+    **params:
+        Passed to :func:`search`
+
+    Returns
+    -------
+    list of GlycanRecord
+    '''
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    for db in (structure_database, observed_db):
+        if db.connection_string == ":memory:":
+            raise ValueError("Cannot share an in-memory database with worker processes")
+    store = observed_db.spectrum_store
+    if store is not None and store.prefix is None:
+        raise ValueError("Cannot share an unsaved SpectrumStore with worker processes")
+    # Workers only see changes written to the files
+    structure_database.commit()
+    observed_db.commit()
+    # The parent's connections cannot be used from the pool's task handler thread
+    tasks = [(structure_database.connection_string, structure_database.record_type,
+              observed_db.connection_string, observed_db.precursor_type,
+              store.prefix if store is not None else None, id_range, params)
+             for id_range in _id_ranges(structure_database, chunk_size)]
+    precursor_masses = observed_db.precursor_masses() if params.get("join") else None
+    matches = []
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(precursor_masses,))
+    try:
+        for chunk in pool.imap(_search_range, tasks):
+            matches.extend(chunk)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return matches
+
+
 app = argparse.ArgumentParser("pygly-ms2")
 app.add_argument("-s", "--structure-database")
 app.add_argument("-d", "--observed-data")
@@ -51,6 +215,13 @@ app.add_argument("-t2", "--ms2-tolerance", type=float, default=DEFAULT_MS2_MATCH
 app.add_argument("-i", "--ion-types", action="append", default=[], help='Control which ion types (ABCXYZ) are considered. Defaults to all of them.')
 app.add_argument("-m", "--mass-shift", action='append', nargs=2, default=[])
 app.add_argument("-o", "--output", default=None)
+app.add_argument("-j", "--join", action="store_true", default=False,
+                 help="Pair structures with observed precursors by mass before any MS2 matching.")
+app.add_argument("-w", "--workers", type=int, default=1,
+                 help="The number of worker processes to search with. Defaults to 1.")
+app.add_argument("-p", "--spectrum-store", default=None,
+                 help="Read tandem spectra from memory-mapped arrays saved with this path prefix,"
+                      " building them if they do not exist.")
 
 
 def taskmain():
@@ -72,7 +243,10 @@ def taskmain():
                    shifts=args.mass_shift,
                    ms1_match_tolerance=args.ms1_tolerance,
                    ms2_match_tolerance=args.ms2_tolerance,
-                   ion_types=args.ion_types)
+                   ion_types=args.ion_types,
+                   join=args.join,
+                   workers=args.workers,
+                   spectrum_store=args.spectrum_store)
     if args.output is None:
         args.output = os.path.splitext(args.structure_database)[0] + ".results.html"
     outfile = open(args.output, "w")
@@ -24,3 +24,29 @@ def permethelylated_mass(row):
 def deuteroreduced_permethylated_mass(row):
     row.structure.set_reducing_end(ReducedEnd("H[2]H"))
     return permethelylated_mass(row)
+
+
+# Composition Transform Functions
+# Each mirrors a mass transform above, for use with
+# :func:`pygly2.composition.batch_calculate_mass`
+
+def total_composition(row):
+    return row.structure.total_composition()
+
+
+def reduced_composition(row):
+    row.structure.set_reducing_end(ReducedEnd())
+    return total_composition(row)
+
+
+def derivatized_composition(row, derivative):
+    return composition_transform.derivatize(row.structure, derivative).total_composition()
+
+
+def permethylated_composition(row):
+    return derivatized_composition(row, "methyl")
+
+
+def deuteroreduced_permethylated_composition(row):
+    row.structure.set_reducing_end(ReducedEnd("H[2]H"))
+    return permethylated_composition(row)
@@ -3,12 +3,14 @@ import sys
 import csv
 
 from pygly2.algorithms import database
-from pygly2.composition import composition_transform
+from pygly2.composition import composition_transform, batch_calculate_mass
+from pygly2.composition.batch import mass_to_mz
 from pygly2.structure.monosaccharide import ReducedEnd
 
 from .common_transforms import (monoisotopic_mass, reduced_mass,
                                 permethelylated_mass,
-                                deuteroreduced_permethylated_mass, derivatized_mass)
+                                deuteroreduced_permethylated_mass, derivatized_mass,
+                                total_composition)
 
 headings = [["Molecular Weight", "C", "Composition"], ["Adduct/Replacement", "Adduct Amount"]]
 
@@ -27,20 +29,40 @@ def pack_composition_string(record, residues):
         ';'.join(str(composition.get(residue, 0)) for residue in residues))
 
 
-def prepare_row(row, residues, adduct_mass, num_adducts, mass_fn=lambda x: x.mass()):
+def prepare_row(row, residues, adduct_mass, num_adducts, mass_fn=lambda x: x.mass(), mass=None, mz=()):
     composition = row.monosaccharides
-    return [mass_fn(row) + (adduct_mass * num_adducts), 0, pack_composition_string(row, residues)] +\
+    if mass is None:
+        mass = mass_fn(row) + (adduct_mass * num_adducts)
+    return [mass, 0, pack_composition_string(row, residues)] +\
            [composition.get(residue, 0) for residue in residues] +\
-           [adduct_mass if adduct_mass > 0.0 else "/0", num_adducts]
+           [adduct_mass if adduct_mass > 0.0 else "/0", num_adducts] + list(mz)
 
 
-def hypothesis(db, outstream=sys.stdout, adduct_mass=0., num_adducts=0, mass_fn=monoisotopic_mass):
+def hypothesis(db, outstream=sys.stdout, adduct_mass=0., num_adducts=0, mass_fn=None,
+               composition_fn=total_composition, charges=()):
+    '''
+    Write a CSV of the composition and mass of each record in `db`.
+
+    If `mass_fn` is |None|, the structures are converted to elemental compositions
+    with `composition_fn` and all of their masses are computed in one batch. One
+    extra m/z column is written for each entry of `charges`.
+    '''
     residues = get_all_residue_types(db)
-    columns = headings[0] + list(residues) + headings[1]
+    columns = headings[0] + list(residues) + headings[1] + ["m/z ({:+d})".format(z) for z in charges]
     writer = csv.writer(outstream)
     writer.writerow(columns)
-    for row in db:
-        writer.writerow(map(str, prepare_row(row, residues, adduct_mass, num_adducts, mass_fn=mass_fn)))
+    rows = list(db)
+    if mass_fn is None:
+        masses = batch_calculate_mass([composition_fn(row) for row in rows])
+    else:
+        masses = [mass_fn(row) for row in rows]
+    masses = [float(mass) + (adduct_mass * num_adducts) for mass in masses]
+    if charges:
+        mzs = mass_to_mz(masses, charges).tolist()
+    else:
+        mzs = [()] * len(rows)
+    for row, mass, mz in zip(rows, masses, mzs):
+        writer.writerow(map(str, prepare_row(row, residues, adduct_mass, num_adducts, mass=mass, mz=mz)))
     try:
         outstream.close()
     except:
@@ -1,5 +1,8 @@
 import os
 import logging
+
+import numpy as np
+
 from pygly2.algorithms import database
 from .common_transforms import monoisotopic_mass
 from pygly2.utils import identity
@@ -7,6 +10,22 @@ from pygly2.utils import identity
 
 logger = logging.getLogger(__name__)
 
+fragment_index_schema = '''
+create table if not exists {table_name}_fragments (
+fragment_id integer unique primary key not null,
+glycan_id integer not null,
+kind text,
+mass float,
+name text,
+foreign key(glycan_id) references {table_name}(glycan_id)
+);
+'''
+
+fragment_index_indices = '''
+create index if not exists {table_name}_fragment_mass_index on {table_name}_fragments(mass);
+create index if not exists {table_name}_fragment_glycan_index on {table_name}_fragments(glycan_id);
+'''
+
 
 default_fragmentation_parameters = {
     "kind": "ABCYXZ",
@@ -31,7 +50,7 @@ def mass_transform(record, derivatize_fn=identity, adduct_mass=0, adduct_number=
 
 def extract_fragments(record, fragmentation_parameters=None):
     fragmentation_parameters = fragmentation_parameters or default_fragmentation_parameters
-    return list(record.structure.fragments(**fragmentation_parameters))
+    return record.structure.fragment_array(**fragmentation_parameters)
 
 
 def record_handle(record, mass_transform_parameters, fragmentation_parameters):
@@ -42,7 +61,13 @@ def record_handle(record, mass_transform_parameters, fragmentation_parameters):
     return record
 
 
-def prepare_database(in_database, out_database=None, mass_transform_parameters=None, fragmentation_parameters=None):
+def prepare_database(in_database, out_database=None, mass_transform_parameters=None, fragmentation_parameters=None,
+                     index_fragments=True):
+    '''
+    Compute the intact mass and fragments of every record of `in_database` and store them in
+    `out_database`. If `index_fragments` is |True|, the fragments are also written to the
+    fragment table described in :func:`build_fragment_index`.
+    '''
     if isinstance(in_database, str):
         in_database = database.RecordDatabase(in_database)
     if out_database is None:
@@ -50,50 +75,197 @@ def prepare_database(in_database, out_database=None, mass_transform_parameters=N
         out_database = database.RecordDatabase(out_database_string, record_type=in_database.record_type)
     elif isinstance(out_database, str):
         out_database = database.RecordDatabase(out_database, record_type=in_database.record_type)
+    if index_fragments:
+        out_database.executescript(out_database.stn(fragment_index_schema))
     for i, record in enumerate(in_database):
         mass = mass_transform(record, **(mass_transform_parameters or {}))
         fragments = extract_fragments(record, fragmentation_parameters)
         record.fragments = fragments
         record.intact_mass = mass
         out_database.load_data([record], commit=False, mass_params={"override": mass})
+        if index_fragments:
+            _write_fragment_index(out_database, [record])
         logger.info("%d records processed", i)
+    if index_fragments:
+        out_database.executescript(out_database.stn(fragment_index_indices))
     out_database.commit()
     return out_database
 
 
+def fragment_rows(record):
+    '''
+    Generate the rows of the fragment table for each of `record.fragments`
+
+    Returns
+    -------
+    list of tuple:
+        The glycan_id, kind, mass and name of each fragment
+    '''
+    return [(record.id, fragment.kind, fragment.mass, fragment.name) for fragment in record.fragments]
+
+
+def _write_fragment_index(db, records):
+    db.executemany("insert into {table_name}_fragments (glycan_id, kind, mass, name) values (?, ?, ?, ?);",
+                   [row for record in records for row in fragment_rows(record)])
+
+
+def has_fragment_index(db):
+    '''
+    Whether `db` has the fragment table written by :func:`prepare_database`
+    '''
+    return db.execute("select count(*) from sqlite_master where type = 'table' and name = ?;",
+                      (db.record_type.table_name + "_fragments",)).fetchone()[0] > 0
+
+
+def build_fragment_index(db, commit=True):
+    '''
+    Fill the fragment table of `db` from the stored fragments of every record, discarding
+    any existing rows. This indexes databases prepared before the table was introduced.
+
+    The table ``{table_name}_fragments`` holds one row per fragment, with its glycan_id,
+    kind, mass and name, and is indexed by mass so that the structures with a fragment
+    matching an observed peak can be found without unpickling any record.
+    '''
+    db.executescript(db.stn(fragment_index_schema))
+    db.execute("delete from {table_name}_fragments;")
+    batch = []
+    for record in db:
+        batch.append(record)
+        if len(batch) == 1000:
+            _write_fragment_index(db, batch)
+            batch = []
+    _write_fragment_index(db, batch)
+    db.executescript(db.stn(fragment_index_indices))
+    if commit:
+        db.commit()
+
+
+def fragment_search(db, mass, tolerance):
+    '''
+    Find the fragments stored in `db` within `tolerance` ppm of `mass`, using the same
+    boundaries as :meth:`RecordDatabase.ppm_match_tolerance_search`
+
+    Yields
+    ------
+    sqlite3.Row:
+        With the fragment_id, glycan_id, kind, mass and name of each fragment
+    '''
+    spread = mass * tolerance
+    for row in db.execute("select * from {table_name}_fragments where mass between ? and ?;",
+                          (mass - spread, mass + spread)):
+        yield row
+
+
+class FragmentMassIndex(object):
+    '''
+    The masses of every fragment in the fragment table of a database, sorted into arrays which
+    can be saved and memory-mapped by many processes.
+
+    Attributes
+    ----------
+    masses: np.ndarray
+        The mass of every fragment, in ascending order
+    glycan_ids: np.ndarray
+        The glycan_id of the record each fragment belongs to
+    fragment_ids: np.ndarray
+        The fragment_id of each fragment in the fragment table
+    '''
+    _suffixes = ("masses", "glycan_ids", "fragment_ids")
+
+    def __init__(self, masses, glycan_ids, fragment_ids):
+        self.masses = masses
+        self.glycan_ids = glycan_ids
+        self.fragment_ids = fragment_ids
+
+    @classmethod
+    def from_database(cls, db):
+        rows = db.execute(
+            "select mass, glycan_id, fragment_id from {table_name}_fragments order by mass, fragment_id;").fetchall()
+        return cls(np.array([row[0] for row in rows], dtype=float),
+                   np.array([row[1] for row in rows], dtype=np.int64),
+                   np.array([row[2] for row in rows], dtype=np.int64))
+
+    def save(self, prefix):
+        '''
+        Write each array to ``<prefix>.<name>.npy``
+        '''
+        for suffix in self._suffixes:
+            np.save("{}.{}.npy".format(prefix, suffix), getattr(self, suffix))
+
+    @classmethod
+    def load(cls, prefix, mmap_mode="r"):
+        '''
+        Read the arrays written by :meth:`save`, memory-mapping them unless `mmap_mode` is |None|
+        '''
+        return cls(*[np.load("{}.{}.npy".format(prefix, suffix), mmap_mode=mmap_mode)
+                     for suffix in cls._suffixes])
+
+    def __len__(self):
+        return len(self.masses)
+
+    def between(self, low, high):
+        '''
+        The slice of the arrays holding the fragments with masses from `low` to `high`, inclusive
+        '''
+        return slice(np.searchsorted(self.masses, low, side="left"),
+                     np.searchsorted(self.masses, high, side="right"))
+
+    def search(self, mass, tolerance):
+        '''
+        Find the fragments within `tolerance` ppm of `mass`
+
+        Returns
+        -------
+        glycan_ids: np.ndarray
+        fragment_ids: np.ndarray
+        '''
+        spread = mass * tolerance
+        window = self.between(mass - spread, mass + spread)
+        return self.glycan_ids[window], self.fragment_ids[window]
+
+    def candidates(self, masses, tolerance):
+        '''
+        Count the observed `masses` which match at least one fragment of each structure
+
+        Returns
+        -------
+        glycan_ids: np.ndarray
+            The glycan_ids of the structures with at least one match, in ascending order
+        counts: np.ndarray
+            The number of `masses` matched by each structure
+        '''
+        masses = np.asarray(masses, dtype=float)
+        spread = masses * tolerance
+        lows = np.searchsorted(self.masses, masses - spread, side="left")
+        highs = np.searchsorted(self.masses, masses + spread, side="right")
+        hits = [np.unique(self.glycan_ids[low:high]) for low, high in zip(lows, highs) if high > low]
+        if not hits:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(hits), return_counts=True)
+
+
 def duplicate_check(db):
     '''
-    Check the passed iterable of |GlycanRecord| objects for topological duplicates.
+    Check the passed iterable of |GlycanRecord| objects for topological duplicates,
+    ignoring anomeric configuration. Records are grouped by the topological
+    :meth:`~pygly2.structure.glycan.Glycan.canonical_hash` of their structures with
+    all anomers erased, keeping the first record of each group.
+
+    Databases whose duplicates should also differ in anomeric configuration can use
+    :meth:`~pygly2.algorithms.database.RecordDatabase.deduplicate` instead.
     '''
-    blacklist = set()
+    seen = set()
     keepers = []
     for rec in db:
-        print rec.id
-        if rec.id in blacklist:
-            continue
-        keepers.append(rec)
         anomers = []
         for node in rec.structure:
             anomers.append(node.anomer)
             node.anomer = None
-        m = rec.mass()
-        isobarics = list(db.ppm_match_tolerance_search(m, 0))
-        for iso in isobarics:
-            if iso.id == rec.id:
-                continue
-
-            iso_anomers = []
-            for node in iso.structure:
-                iso_anomers.append(node.anomer)
-                node.anomer = None
-
-            if iso.structure.topological_equality(rec.structure):
-                blacklist.add(iso.id)
-
-            for an, node in zip(iso_anomers, iso.structure):
-                node.anomer = an
-
+        key = rec.structure.canonical_hash(exact=False)
         for an, node in zip(anomers, rec.structure):
             node.anomer = an
-
+        if key in seen:
+            continue
+        seen.add(key)
+        keepers.append(rec)
     return keepers
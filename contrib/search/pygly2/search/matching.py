@@ -1,7 +1,11 @@
 import re
 from math import fabs
-from itertools import chain
+from bisect import bisect_left, bisect_right
+from itertools import chain, izip
 from collections import defaultdict
+
+import numpy as np
+
 from pygly2.utils import make_struct
 from pygly2 import Composition
 
@@ -17,6 +21,9 @@ MergedMatch = make_struct("MergedMatch", ["match_key", "mass", "ppm_error", "int
 MassShift = make_struct("MassShift", ["name", "mass"])
 NoShift = MassShift("", 0.0)
 
+# The relative amount by which peak search windows are widened beyond the match tolerance
+_window_slack = 1e-9
+
 
 def neutral_mass(mz, z):
     return (mz * z) - (z * PROTON)
@@ -40,11 +47,22 @@ def ppm_error(x, y):
 def collect_similar_ions(fragments, tolerance=2e-8, redundant=True):
     '''
     Find clusters of close mass fragments.
+
+    Only fragments inside the mass window of each fragment are compared, found by
+    binary search over the fragments sorted by mass. Fragments generated with
+    ``group_by="composition"`` are already merged by exact composition.
     '''
     groups = defaultdict(list)
     membership = dict()
+    fragments = list(fragments)
+    order = sorted(range(len(fragments)), key=lambda i: fragments[i].mass)
+    masses = [fragments[i].mass for i in order]
     for index in fragments:
-        for other in fragments:
+        # Wide enough to contain every mass within `tolerance` of index.mass
+        low = bisect_left(masses, index.mass / (1 + 2 * tolerance))
+        high = bisect_right(masses, index.mass / (1 - 2 * tolerance))
+        for i in sorted(order[low:high]):
+            other = fragments[i]
             if other.name in membership and not redundant:
                 continue
             if fabs(ppm_error(index.mass, other.mass)) < tolerance:
@@ -60,6 +78,27 @@ def find_matches(precursor, msms_db, shifts=None,
     Find all MS1 matches, find all MS2 matches in these matches, and merge the fragments found.
     '''
     shifts = shifts or [NoShift]
+    candidates = ((shift, msms_db.precursor_type.from_sql(row, msms_db))
+                  for shift in shifts
+                  for row in msms_db.ppm_match_tolerance_search(
+                      precursor.intact_mass + shift.mass, ms1_match_tolerance))
+    return match_candidates(precursor, candidates, shifts=shifts,
+                            ms2_match_tolerance=ms2_match_tolerance, ion_types=ion_types)
+
+
+def match_candidates(precursor, candidates, shifts=None,
+                     ms2_match_tolerance=DEFAULT_MS2_MATCH_TOLERANCE, ion_types="ABCXYZ"):
+    '''
+    Find all MS2 matches in the observed spectra already matched to `precursor`, and merge
+    the fragments found.
+
+    Parameters
+    ----------
+    precursor: GlycanRecord
+    candidates: iterable of (MassShift, ObservedPrecursorSpectrum)
+        The observed spectra matching `precursor` at MS1, with the shift they matched with
+    '''
+    shifts = shifts or [NoShift]
     results = []
     precursor_ppm_errors = []
     scans_searched = set()
@@ -67,15 +106,13 @@ def find_matches(precursor, msms_db, shifts=None,
     ion_types = map(sorted, ion_types)
     precursor.fragments = [f for f in precursor.fragments if sorted(crossring_pattern.sub("", f.kind)) in (ion_types)]
 
-    for shift in shifts:
-        for row in msms_db.ppm_match_tolerance_search(precursor.intact_mass + shift.mass, ms1_match_tolerance):
-            spectrum = msms_db.precursor_type.from_sql(row, msms_db)
-            precursor_ppm_errors.append(ppm_error(precursor.mass() + shift.mass, spectrum.neutral_mass))
-            scans_searched.update(spectrum.scan_ids)
-            matches = match_fragments(precursor.fragments, spectrum.tandem_data,
-                                      shifts=shifts, ms2_match_tolerance=ms2_match_tolerance)
-            results.append(matches)
-            i += 1
+    for shift, spectrum in candidates:
+        precursor_ppm_errors.append(ppm_error(precursor.mass() + shift.mass, spectrum.neutral_mass))
+        scans_searched.update(spectrum.scan_ids)
+        matches = match_fragments(precursor.fragments, spectrum.tandem_data,
+                                  shifts=shifts, ms2_match_tolerance=ms2_match_tolerance)
+        results.append(matches)
+        i += 1
     precursor.ppm_error = precursor_ppm_errors
     precursor.scan_ids = scans_searched
     precursor.intact_structures_searched = i
@@ -83,23 +120,139 @@ def find_matches(precursor, msms_db, shifts=None,
     return precursor
 
 
+def precursor_candidates(structure_database, msms_db, shifts=None,
+                         ms1_match_tolerance=DEFAULT_MS1_MATCH_TOLERANCE, id_range=None,
+                         precursor_masses=None):
+    '''
+    Join the structures of `structure_database` to the observed precursors of `msms_db` by
+    intact mass, without running a query or unpickling a record per structure.
+
+    The observed neutral masses are loaded once into a sorted array, and the precursors
+    within `ms1_match_tolerance` of every structure's stored mass, the :attr:`intact_mass`
+    written by :func:`~.ms2_fragment_database_hypothesis.prepare_database`, are found for each shift
+    with a single binary search sweep. Only structures with at least one precursor match
+    are loaded. If `id_range` is given as a pair ``(start, end)``, only structures whose
+    glycan_id is at least `start` and less than `end` are considered.
+
+    When many ranges of the same database are searched, the output of
+    :meth:`MSMSSqlDB.precursor_masses` can be computed once and passed as `precursor_masses`.
+
+    Yields
+    ------
+    record: GlycanRecord
+    candidates: list of (MassShift, ObservedPrecursorSpectrum)
+        In the order :func:`find_matches` would search them
+    '''
+    shifts = shifts or [NoShift]
+    if precursor_masses is None:
+        precursor_masses = msms_db.precursor_masses()
+    precursor_ids, precursor_masses = precursor_masses
+    start, end = id_range or (None, None)
+    rows = structure_database.execute(
+        "select glycan_id, mass from {table_name} where mass is not null"
+        " and (? is null or glycan_id >= ?) and (? is null or glycan_id < ?)"
+        " order by glycan_id;", (start, start, end, end)).fetchall()
+    if not rows or not len(precursor_ids):
+        return
+    glycan_ids = np.array([row[0] for row in rows], dtype=int)
+    structure_masses = np.array([row[1] for row in rows], dtype=float)
+    windows = []
+    hit = np.zeros(len(glycan_ids), dtype=bool)
+    for shift in shifts:
+        masses = structure_masses + shift.mass
+        lows, highs = _mass_windows(precursor_masses, masses, ms1_match_tolerance)
+        windows.append((shift, lows, highs))
+        hit |= highs > lows
+    spectra = {}
+
+    def get_spectrum(precursor_id):
+        try:
+            return spectra[precursor_id]
+        except KeyError:
+            spectrum = spectra[precursor_id] = msms_db.get_precursor(precursor_id)
+            return spectrum
+
+    for index in np.flatnonzero(hit):
+        record = structure_database[int(glycan_ids[index])]
+        candidates = [(shift, get_spectrum(precursor_id))
+                      for shift, lows, highs in windows
+                      for precursor_id in precursor_ids[lows[index]:highs[index]]]
+        yield record, candidates
+
+
 def match_fragments(fragments, peak_list, shifts=None, ms2_match_tolerance=DEFAULT_MS2_MATCH_TOLERANCE):
     '''
     Match theoretical MS2 fragments against the observed peaks.
+
+    The peak masses are sorted once, and the peaks which may be within `ms2_match_tolerance`
+    of every shifted fragment mass are found together by binary search. Only those peaks are
+    compared, and the matches are produced in the same order as comparing each fragment with
+    each peak in turn would produce them.
+
+    If `peak_list` is a :class:`~.spectra.PeakArray`, its mass array is used directly, and
+    no peak objects are built.
     '''
     shifts = shifts or [NoShift]
     matches = []
+    fragments = list(fragments)
+    if hasattr(peak_list, "masses"):
+        peak_masses = np.asarray(peak_list.masses, dtype=float)
+        peak_values = peak_list.values
+    else:
+        peak_list = list(peak_list)
+        peak_masses = np.array([peak.mass for peak in peak_list], dtype=float)
+        peak_values = _peak_values(peak_list)
+    if not fragments or not len(peak_masses):
+        return matches
+    order = np.argsort(peak_masses, kind="mergesort")
+    sorted_masses = peak_masses[order]
+    fragment_masses = np.array([fragment.mass for fragment in fragments], dtype=float)
     for shift in shifts:
-        for fragment in fragments:
-            for peak in peak_list:
-                match_error = fabs(ppm_error(fragment.mass + shift.mass, peak.mass))
+        lows, highs = _peak_windows(sorted_masses, fragment_masses + shift.mass, ms2_match_tolerance)
+        for fragment, low, high in izip(fragments, lows, highs):
+            if low == high:
+                continue
+            for i in sorted(order[low:high]):
+                mass, intensity, charge, scan_id = peak_values(i)
+                match_error = fabs(ppm_error(fragment.mass + shift.mass, mass))
                 if match_error <= ms2_match_tolerance:
                     matches.append(FragmentMatch(
-                        fragment.name + ":" + shift.name, peak.mass,
-                        match_error, peak.intensity, peak.charge, peak.id))
+                        fragment.name + ":" + shift.name, mass,
+                        match_error, intensity, charge, scan_id))
     return matches
 
 
+def _peak_values(peak_list):
+    def values(i):
+        peak = peak_list[i]
+        return peak.mass, peak.intensity, peak.charge, peak.id
+    return values
+
+
+def _peak_windows(sorted_masses, masses, tolerance):
+    '''
+    Find the slice of `sorted_masses` which may be within `tolerance` of each of `masses`,
+    widened slightly so that rounding never excludes a peak :func:`ppm_error` would match
+    '''
+    lows = np.searchsorted(sorted_masses, masses / (1 + tolerance) * (1 - _window_slack), side="left")
+    if tolerance < 1:
+        highs = np.searchsorted(sorted_masses, masses / (1 - tolerance) * (1 + _window_slack), side="right")
+    else:
+        highs = np.full_like(lows, len(sorted_masses))
+    return lows, highs
+
+
+def _mass_windows(sorted_masses, masses, tolerance):
+    '''
+    Find the slice of `sorted_masses` which lies within `tolerance` of each of `masses`, using
+    the same boundaries as :meth:`MSMSSqlDB.ppm_match_tolerance_search`
+    '''
+    spread = masses * tolerance
+    lows = np.searchsorted(sorted_masses, masses - spread, side="left")
+    highs = np.searchsorted(sorted_masses, masses + spread, side="right")
+    return lows, highs
+
+
 def collect_matches(matches):
     '''
     Groups matches to the same theoretical ions into lists, and calls :func:`merge_matches`
@@ -9,7 +9,9 @@ from .spectra import (neutral_mass,
                       mass_charge_ratio,
                       ObservedPrecursorSpectrum,
                       ObservedTandemSpectrum,
-                      MSMSSqlDB)
+                      MSMSSqlDB,
+                      PeakArray,
+                      SpectrumStore)
 
 from .constants import constants
 
@@ -1,5 +1,6 @@
 import itertools
 import json
+import os
 import re
 import sqlite3
 import logging
@@ -25,7 +26,14 @@ def mass_charge_ratio(neutral_mass, z):
 
 
 class MSMSSqlDB(object):
-    def __init__(self, connection_string=":memory:", precursor_type=None):
+    '''
+    A wrapper around an Sqlite3 database of observed precursors and their tandem spectra.
+
+    If `spectrum_store` is given as a :class:`SpectrumStore` or the prefix of one saved
+    with :meth:`SpectrumStore.save`, the tandem spectra of precursors are read from it as
+    :class:`PeakArray` views instead of from the database.
+    '''
+    def __init__(self, connection_string=":memory:", precursor_type=None, spectrum_store=None):
         self.connection_string = connection_string
         self.connection = sqlite3.connect(connection_string)
         self.connection.row_factory = sqlite3.Row
@@ -33,6 +41,37 @@ class MSMSSqlDB(object):
         if precursor_type is None:
             precursor_type = ObservedPrecursorSpectrum
         self.precursor_type = precursor_type
+        if isinstance(spectrum_store, basestring):
+            spectrum_store = SpectrumStore.load(spectrum_store)
+        self.spectrum_store = spectrum_store
+        self._precursor_columns = None
+
+    def use_spectrum_store(self, prefix):
+        '''
+        Read tandem spectra from the :class:`SpectrumStore` saved at `prefix`, first building
+        and saving it from this database if it does not exist.
+        '''
+        if os.path.exists(SpectrumStore.path(prefix, "offsets")):
+            store = SpectrumStore.load(prefix)
+        else:
+            store = SpectrumStore.from_db(self)
+            store.save(prefix)
+            store = SpectrumStore.load(prefix)
+        self.spectrum_store = store
+        return store
+
+    def _select_precursors(self):
+        '''
+        The start of a query selecting precursor rows, leaving out the serialized tandem
+        spectra when they are read from :attr:`spectrum_store`
+        '''
+        if self.spectrum_store is None:
+            return "select * from ObservedPrecursorSpectrum"
+        if self._precursor_columns is None:
+            self._precursor_columns = [
+                row[1] for row in self.execute("PRAGMA table_info(ObservedPrecursorSpectrum);")
+                if row[1] != "tandem_data"]
+        return "select {} from ObservedPrecursorSpectrum".format(", ".join(self._precursor_columns))
 
     def init_schema(self):
         self.connection.executescript(self.precursor_type.sql_schema())
@@ -64,7 +103,7 @@ class MSMSSqlDB(object):
         return results
 
     def __iter__(self):
-        for row in self.execute("select * from ObservedPrecursorSpectrum;"):
+        for row in self.execute(self._select_precursors() + ";"):
             yield self.precursor_type.from_sql(row, self)
 
     def execute(self, *args, **kwargs):
@@ -89,11 +128,37 @@ class MSMSSqlDB(object):
     def ppm_match_tolerance_search(self, mass, tolerance, target_table="ObservedPrecursorSpectrum",
                                    precursor_id=None, mass_shift=0):
         boundaries = self._find_boundaries(mass + mass_shift, tolerance)
-        results = self.execute("select * from ObservedPrecursorSpectrum\
+        results = self.execute(self._select_precursors() + "\
          where neutral_mass between %f and %f;" % boundaries)
         for result in results:
             yield result
 
+    def precursor_masses(self):
+        '''
+        Load the id and neutral mass of every precursor into arrays sorted by mass, so
+        that many mass queries can be answered in memory by binary search.
+
+        Returns
+        -------
+        ids: np.ndarray
+        masses: np.ndarray
+        '''
+        rows = self.execute("select precursor_id, neutral_mass from ObservedPrecursorSpectrum\
+         where neutral_mass is not null order by neutral_mass, precursor_id;").fetchall()
+        ids = np.array([row[0] for row in rows], dtype=int)
+        masses = np.array([row[1] for row in rows], dtype=float)
+        return ids, masses
+
+    def get_precursor(self, precursor_id):
+        '''
+        Look up a precursor by its id and build it with :attr:`precursor_type`.
+        '''
+        row = self.execute(self._select_precursors() + " where precursor_id = ?;",
+                           (int(precursor_id),)).fetchone()
+        if row is None:
+            raise KeyError(precursor_id)
+        return self.precursor_type.from_sql(row, self)
+
 
 class Scan(object):
     def __init__(self, id, z, mz):
@@ -190,9 +255,13 @@ class ObservedPrecursorSpectrumBase(object):
         for i, scan in enumerate(scans):
             scan['id'] = scan_ids[i]
             scan.pop("precursor_id")
-        tandem_rows = cursor.execute("select * from ObservedTandemSpectrum where\
-         ObservedTandemSpectrum.precursor_id={0};".format(_iterkey))
-        tandem_spectra = [ObservedTandemSpectrum.from_sql(row, cursor) for row in tandem_rows]
+        store = getattr(cursor, "spectrum_store", None)
+        if store is not None:
+            tandem_spectra = store.peaks(_iterkey)
+        else:
+            tandem_rows = cursor.execute("select * from ObservedTandemSpectrum where\
+             ObservedTandemSpectrum.precursor_id={0};".format(_iterkey))
+            tandem_spectra = [ObservedTandemSpectrum.from_sql(row, cursor) for row in tandem_rows]
         instance = cls(scans, scan_ids, charge, neutral_mass, tandem_spectra, **other_data)
         instance._iterkey = _iterkey
         return instance
@@ -250,7 +319,11 @@ class ObservedPrecursorSpectrum(ObservedPrecursorSpectrumBase):
         _iterkey = row['precursor_id']
         other_data = json.loads(row['other_data'])
         scan_data = json.loads(row['scan_data'])
-        tandem_data = [ObservedTandemSpectrum(**d) for d in json.loads(row['tandem_data'])]
+        store = getattr(cursor, "spectrum_store", None)
+        if store is not None:
+            tandem_data = store.peaks(_iterkey)
+        else:
+            tandem_data = [ObservedTandemSpectrum(**d) for d in json.loads(row['tandem_data'])]
         inst = cls(scan_data, [s['id'] for s in scan_data],
                    charge, neutral_mass, tandem_data, **other_data)
         inst._iterkey = _iterkey
@@ -322,6 +395,148 @@ class ObservedTandemSpectrum(object):
         return instance
 
 
+class PeakArray(object):
+    '''
+    The tandem spectrum of one precursor in a :class:`SpectrumStore`, as views of its arrays.
+
+    Iterating or indexing produces :class:`ObservedTandemSpectrum` objects, which are built
+    on demand and carry no annotation. Code which only needs the peak values can use the
+    arrays directly.
+
+    Attributes
+    ----------
+    masses, intensities, charges, ids: np.ndarray
+        The neutral mass, intensity, charge and id of each peak. Missing ids are -1.
+    '''
+    def __init__(self, masses, intensities, charges, ids):
+        self.masses = masses
+        self.intensities = intensities
+        self.charges = charges
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.masses)
+
+    def values(self, i):
+        '''
+        The mass, intensity, charge and id of peak `i` as Python scalars
+        '''
+        id = int(self.ids[i])
+        return (float(self.masses[i]), float(self.intensities[i]),
+                int(self.charges[i]), id if id >= 0 else None)
+
+    def __getitem__(self, i):
+        mass, intensity, charge, id = self.values(i)
+        return ObservedTandemSpectrum(mass, charge, intensity, id=id)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return "<PeakArray {} peaks>".format(len(self))
+
+
+class SpectrumStore(object):
+    '''
+    Tandem spectra stored as contiguous columns of peak values, with an offset table
+    locating the peaks of each precursor. Once saved, the columns can be memory-mapped
+    so that the peaks of any precursor are read without a query and shared between
+    processes.
+
+    Attributes
+    ----------
+    precursor_ids: np.ndarray
+        The id of each precursor, in ascending order
+    offsets: np.ndarray
+        The start of each precursor's peaks in the peak columns, followed by the total
+        number of peaks
+    masses, intensities, charges, ids: np.ndarray
+        The neutral mass, intensity, charge and id of every peak. Missing ids are -1.
+    prefix: str
+        The path prefix the store was saved to or loaded from, or |None|
+    '''
+    _columns = ("precursor_ids", "offsets", "masses", "intensities", "charges", "ids")
+
+    def __init__(self, precursor_ids, offsets, masses, intensities, charges, ids, prefix=None):
+        self.precursor_ids = precursor_ids
+        self.offsets = offsets
+        self.masses = masses
+        self.intensities = intensities
+        self.charges = charges
+        self.ids = ids
+        self.prefix = prefix
+
+    @classmethod
+    def from_precursors(cls, precursors):
+        '''
+        Build a store from the :attr:`tandem_data` of each of `precursors`
+        '''
+        spectra = sorted(((precursor.id, precursor.tandem_data) for precursor in precursors),
+                         key=lambda spectrum: spectrum[0])
+        offsets = [0]
+        peaks = []
+        for precursor_id, tandem_data in spectra:
+            peaks.extend(tandem_data)
+            offsets.append(len(peaks))
+        return cls(np.array([precursor_id for precursor_id, tandem_data in spectra], dtype=np.int64),
+                   np.array(offsets, dtype=np.int64),
+                   np.array([peak.neutral_mass for peak in peaks], dtype=float),
+                   np.array([peak.intensity for peak in peaks], dtype=float),
+                   np.array([peak.charge for peak in peaks], dtype=np.int32),
+                   np.array([-1 if peak.id is None else peak.id for peak in peaks], dtype=np.int64))
+
+    @classmethod
+    def from_db(cls, msms_db):
+        '''
+        Build a store from the tandem spectra of every precursor in `msms_db`
+        '''
+        store, msms_db.spectrum_store = msms_db.spectrum_store, None
+        try:
+            return cls.from_precursors(msms_db)
+        finally:
+            msms_db.spectrum_store = store
+
+    @staticmethod
+    def path(prefix, name):
+        return "{}.{}.npy".format(prefix, name)
+
+    def save(self, prefix):
+        '''
+        Write each column to ``<prefix>.<name>.npy``
+        '''
+        for name in self._columns:
+            np.save(self.path(prefix, name), getattr(self, name))
+        self.prefix = prefix
+
+    @classmethod
+    def load(cls, prefix, mmap_mode="r"):
+        '''
+        Read the columns written by :meth:`save`, memory-mapping them unless `mmap_mode` is |None|
+        '''
+        columns = [np.load(cls.path(prefix, name), mmap_mode=mmap_mode)
+                   for name in cls._columns]
+        return cls(*columns, prefix=prefix)
+
+    def __len__(self):
+        return len(self.precursor_ids)
+
+    def __contains__(self, precursor_id):
+        i = np.searchsorted(self.precursor_ids, precursor_id)
+        return i < len(self.precursor_ids) and self.precursor_ids[i] == precursor_id
+
+    def peaks(self, precursor_id):
+        '''
+        The peaks of `precursor_id` as a :class:`PeakArray` of views, without copying them
+        '''
+        i = np.searchsorted(self.precursor_ids, precursor_id)
+        if i == len(self.precursor_ids) or self.precursor_ids[i] != precursor_id:
+            raise KeyError(precursor_id)
+        window = slice(self.offsets[i], self.offsets[i + 1])
+        return PeakArray(self.masses[window], self.intensities[window],
+                         self.charges[window], self.ids[window])
+
+
 def extract_annotations(*spectra):
     return [dict(s.annotation) for s in spectra]
 
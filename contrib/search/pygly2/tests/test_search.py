@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pygly2.algorithms import database
+from pygly2.tests.common import load
+
+from pygly2.search import app
+from pygly2.search.hypothesis import ms2_fragment_database_hypothesis
+from pygly2.search.spectra import spectra
+
+
+def make_observed(records, path):
+    '''
+    Build a database with one precursor matching each of `records` and one matching none,
+    each with peaks matching a subset of the record's fragments
+    '''
+    precursors = []
+    for i, record in enumerate(records):
+        tandem = [spectra.ObservedTandemSpectrum(fragment.mass * (1 + 3e-6), 1, 100. + j, id=(i + 1) * 1000 + j)
+                  for j, fragment in enumerate(record.fragments) if j % 3 == 0]
+        precursors.append(spectra.ObservedPrecursorSpectrum(
+            [{"id": i + 1, "mz": record.intact_mass, "z": 1}], [i + 1], 1,
+            record.intact_mass * (1 + 2e-6), tandem, id=i + 1))
+    precursors.append(spectra.ObservedPrecursorSpectrum(
+        [{"id": 100, "mz": 1.5, "z": 1}], [100], 1, 1.5,
+        [spectra.ObservedTandemSpectrum(1.0, 1, 1.0, id=100000)], id=100))
+    db = spectra.MSMSSqlDB(path)
+    db.init_schema()
+    db.load_data(precursors)
+    db.apply_indices()
+    return db
+
+
+def summarize(results):
+    return [(record.id, sorted(record.ppm_error), sorted(record.scan_ids),
+             sorted(record.matches, key=lambda match: match.match_key))
+            for record in results]
+
+
+class SearchTestBase(unittest.TestCase):
+    names = ("broad_n_glycan", "complex_glycan", "branchy_glycan", "common_glycan")
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        records = [database.GlycanRecord(load(name)) for name in self.names]
+        self.hypothesis = ms2_fragment_database_hypothesis.prepare_database(
+            database.RecordDatabase(records=records), os.path.join(self.directory, "hypothesis.db"))
+        self.observed = make_observed(list(self.hypothesis), os.path.join(self.directory, "observed.db"))
+
+    def tearDown(self):
+        self.hypothesis.connection.close()
+        self.observed.connection.close()
+        shutil.rmtree(self.directory)
+
+
+class ParallelSearchTest(SearchTestBase):
+
+    def test_parallel_search(self):
+        for join in (False, True):
+            serial = app.search(self.hypothesis, self.observed, join=join)
+            self.assertEqual(len(serial), len(self.names))
+            parallel = app.search_parallel(self.hypothesis, self.observed, workers=2, chunk_size=1, join=join)
+            self.assertEqual(summarize(serial), summarize(parallel))
+
+
+if __name__ == '__main__':
+    unittest.main()
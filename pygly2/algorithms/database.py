@@ -1,12 +1,17 @@
 import os
 import sqlite3
+import struct
 import logging
+import itertools
+from binascii import hexlify
 from collections import Counter, Iterable
 
 import pygly2
 from pygly2.utils import pickle, classproperty, make_struct
+from pygly2.io import binary
 from pygly2.io.nomenclature import identity
 from pygly2.algorithms import subtree_search
+from pygly2.structure import fingerprint
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +20,15 @@ Aglyca = make_struct("Aglyca", ("name", "reducing", 'entries'))
 DatabaseEntry = make_struct("DatabaseEntry", ("database", "id"))
 Motif = make_struct("Motif", ("name", "id", "motif_class"))
 
+#: Prefixes the serialized form of a record with the length of its encoded structure
+_record_header = struct.Struct("!I")
+
+#: The number of records inserted per statement batch by :meth:`RecordDatabase.bulk_load`
+_bulk_batch_size = 1000
+
+#: The suffixes of the side tables used by :meth:`RecordDatabase.substructure_search`
+_substructure_index_tables = ("_residue_index", "_linkage_index", "_path_index", "_fingerprint")
+
 
 def _resolve_metadata_mro(cls):
     '''
@@ -124,8 +138,16 @@ class GlycanRecordBase(object):
 
     The basic table schema includes a primary key, `glycan_id`, mapping to :attr:`id`.
     Additionally, it includes the mass calculated at the time of serialization under
-    the `mass` column, and the entire record structure is pickled and stored under the
-    `structure` column.
+    the `mass` column, and the record is stored as a BLOB under the `structure` column,
+    with :attr:`structure` written using :mod:`pygly2.io.binary` and the remaining
+    attributes pickled. The exact and topological :meth:`~.Glycan.canonical_hash` of
+    :attr:`structure` are stored in the indexed `exact_hash` and `topology_hash` columns.
+
+    The features of :attr:`structure` from :mod:`pygly2.structure.fingerprint` are stored
+    in three side tables, `{table_name}_residue_index`, `{table_name}_linkage_index` and
+    `{table_name}_path_index`, and its :meth:`~.Glycan.fingerprint` in a fourth,
+    `{table_name}_fingerprint`. These are used by :meth:`RecordDatabase.substructure_search` to
+    discard records which cannot contain a query structure.
 
     The translation to SQL values is carried out by :meth:`.to_sql`, and is restored from
     a query row by :meth:`.from_sql`.
@@ -141,7 +163,38 @@ class GlycanRecordBase(object):
     create table {table_name}(
         glycan_id integer unique primary key not null,
         mass float not null,
-        structure text not null/*rest*/
+        structure blob not null,
+        exact_hash char(40) not null,
+        topology_hash char(40) not null/*rest*/
+    );
+    '''
+
+    #: The tables holding the substructure search features of each record
+    __substructure_index_schema__ = '''
+    drop table if exists {table_name}_residue_index;
+    create table {table_name}_residue_index(
+        glycan_id integer not null,
+        label text not null,
+        count integer not null
+    );
+    create index {table_name}_residue_index_label on {table_name}_residue_index(label, glycan_id);
+    drop table if exists {table_name}_linkage_index;
+    create table {table_name}_linkage_index(
+        glycan_id integer not null,
+        label text not null,
+        count integer not null
+    );
+    create index {table_name}_linkage_index_label on {table_name}_linkage_index(label, glycan_id);
+    drop table if exists {table_name}_path_index;
+    create table {table_name}_path_index(
+        glycan_id integer not null,
+        path text not null
+    );
+    create index {table_name}_path_index_path on {table_name}_path_index(path, glycan_id);
+    drop table if exists {table_name}_fingerprint;
+    create table {table_name}_fingerprint(
+        glycan_id integer primary key not null,
+        fingerprint blob not null
     );
     '''
 
@@ -198,6 +251,34 @@ class GlycanRecordBase(object):
         schema = cls.__table_schema__.format(table_name=cls.table_name)
         schema = schema.replace("/*rest*/", ext_def)
         yield schema
+        yield cls.substructure_index_schema()
+
+    @classmethod
+    def substructure_index_schema(cls):
+        '''
+        Generate the schema of the side tables filled by :meth:`substructure_index_rows`.
+
+        Returns
+        -------
+        str
+        '''
+        return cls.__substructure_index_schema__.format(table_name=cls.table_name)
+
+    @classmethod
+    def substructure_index_sql(cls):
+        '''
+        Generate the parameterized ``INSERT`` statements for each side table, in the
+        same order as the rows produced by :meth:`substructure_index_rows`.
+
+        Returns
+        -------
+        tuple of str
+        '''
+        return (
+            "insert into {}_residue_index (glycan_id, label, count) values (?, ?, ?);".format(cls.table_name),
+            "insert into {}_linkage_index (glycan_id, label, count) values (?, ?, ?);".format(cls.table_name),
+            "insert into {}_path_index (glycan_id, path) values (?, ?);".format(cls.table_name),
+            "insert into {}_fingerprint (glycan_id, fingerprint) values (?, ?);".format(cls.table_name))
 
     @classmethod
     def add_index(cls, *args, **kwargs):
@@ -207,10 +288,15 @@ class GlycanRecordBase(object):
         Yields
         ------
         str:
-            The SQL script block describing the mass_index of the GlycanRecord table
+            The SQL script blocks describing the mass_index and the structure hash indices
+            of the GlycanRecord table
         '''
         yield '''create index if not exists mass_index on {table_name}(mass desc);'''.format(
             table_name=cls.table_name)
+        yield '''create index if not exists exact_hash_index on {table_name}(exact_hash);'''.format(
+            table_name=cls.table_name)
+        yield '''create index if not exists topology_hash_index on {table_name}(topology_hash);'''.format(
+            table_name=cls.table_name)
 
     def __init__(self, structure, motifs=None, dbxref=None, aglycones=None, taxa=None, **kwargs):
         self.structure = structure
@@ -234,6 +320,35 @@ class GlycanRecordBase(object):
             return override
         return self.structure.mass(average=average, charge=charge, mass_data=mass_data)
 
+    def canonical_hash(self, exact=True):
+        '''
+        The hash of :attr:`structure` stored in the `exact_hash` or `topology_hash` column.
+
+        See Also
+        --------
+        :meth:`pygly2.structure.glycan.Glycan.canonical_hash`
+        '''
+        return self.structure.canonical_hash(exact=exact)
+
+    def substructure_index_rows(self):
+        '''
+        Compute the rows of each side table for this record, from the
+        :func:`~pygly2.structure.fingerprint.residue_counts`,
+        :func:`~pygly2.structure.fingerprint.linkage_counts`,
+        :func:`~pygly2.structure.fingerprint.residue_paths` and :meth:`~.Glycan.fingerprint`
+        of :attr:`structure`.
+
+        Returns
+        -------
+        tuple of list
+        '''
+        structure = self.structure
+        return (
+            [(self.id, label, count) for label, count in fingerprint.residue_counts(structure).items()],
+            [(self.id, label, count) for label, count in fingerprint.linkage_counts(structure).items()],
+            [(self.id, path) for path in fingerprint.residue_paths(structure)],
+            [(self.id, sqlite3.Binary(structure.fingerprint().to_bytes()))])
+
     def __repr__(self):  # pragma: no cover
         rep = '<{type} {id} {mass}>\n{glycoct}'.format(
                 id=(self.id or ''), mass=self.mass(), glycoct=self.structure.to_glycoct(),
@@ -246,6 +361,51 @@ class GlycanRecordBase(object):
         state.pop("_bound_db", None)
         return state
 
+    def serialize(self):
+        '''
+        Encode this record as a byte string for storage in the `structure` column.
+
+        The byte string is made up of the length of the encoded :attr:`structure`,
+        the output of :func:`pygly2.io.binary.dumps`, and a pickle of all of the
+        other attributes of the record.
+
+        Returns
+        -------
+        bytes
+        '''
+        structure = binary.dumps(self.structure)
+        state = self.__getstate__()
+        state.pop("structure", None)
+        # Bypass __getstate__ so that the record is rebuilt without calling __init__
+        attributes = pickle.dumps((self.__class__, state), pickle.HIGHEST_PROTOCOL)
+        return _record_header.pack(len(structure)) + structure + attributes
+
+    @classmethod
+    def deserialize(cls, data):
+        '''
+        Rebuild a record from the output of :meth:`serialize`. Text is
+        treated as a whole record pickled by older versions of this class.
+
+        Parameters
+        ----------
+        data: bytes or unicode
+
+        Returns
+        -------
+        GlycanRecordBase
+        '''
+        if isinstance(data, unicode):
+            return pickle.loads(str(data))
+        data = bytes(data)
+        size = _record_header.unpack_from(data)[0]
+        start = _record_header.size
+        structure = binary.loads(data[start:start + size])
+        record_type, state = pickle.loads(data[start + size:])
+        record = record_type.__new__(record_type)
+        record.__dict__.update(state)
+        record.structure = structure
+        return record
+
     def to_sql(self, id=None, mass_params=None, inherits=None):
         '''
         Translates the :class:`GlycanRecord` instance into SQL.
@@ -268,8 +428,8 @@ class GlycanRecordBase(object):
         inherits = dict(inherits or {})
         inherits.update(inherits)
 
-        template = '''insert into {table_name} (glycan_id, mass, structure /*rest*/)
-         values ({id}, {mass}, "{structure}" /*values*/);'''
+        template = '''insert into {table_name} (glycan_id, mass, structure, exact_hash, topology_hash /*rest*/)
+         values ({id}, {mass}, X'{structure}', '{exact_hash}', '{topology_hash}' /*values*/);'''
         ext_names = ', '.join(inherits)
         if len(ext_names) > 0:
             ext_names = ', ' + ext_names
@@ -283,13 +443,60 @@ class GlycanRecordBase(object):
         values = {}
         values['id'] = self.id
         values['mass'] = self.mass(**(mass_params or {}))
-        _bound_db = self._bound_db
-        self._bound_db = None
-        values['structure'] = pickle.dumps(self)
-        self._bound_db = _bound_db
+        values['structure'] = hexlify(self.serialize())
+        values['exact_hash'] = self.canonical_hash(exact=True)
+        values['topology_hash'] = self.canonical_hash(exact=False)
         values['table_name'] = self.__table_name
         yield template.format(**values)
 
+    @classmethod
+    def insert_sql(cls, inherits=None):
+        '''
+        Generates a parameterized ``INSERT`` statement for this record type, to be filled in
+        with the output of :meth:`.to_sql_parameters`.
+
+        Parameters
+        ----------
+        inherits: dict
+            Mapping of inherited metadata properties to include in the record
+
+        Returns
+        -------
+        str
+        '''
+        meta_map = dict(inherits or {})
+        meta_map.update(cls.__metadata_map)
+        columns = ["glycan_id", "mass", "structure", "exact_hash", "topology_hash"] + sorted(meta_map)
+        return "insert into {table_name} ({columns}) values ({params});".format(
+            table_name=cls.table_name, columns=', '.join(columns),
+            params=', '.join('?' * len(columns)))
+
+    def to_sql_parameters(self, id=None, mass_params=None, inherits=None):
+        '''
+        Translates the :class:`GlycanRecord` instance into the parameters of the statement
+        generated by :meth:`.insert_sql`. Unlike :meth:`.to_sql`, the serialized record is
+        passed to Sqlite as a BLOB and never formatted into SQL.
+
+        Parameters
+        ----------
+        id: int
+            The primary key to use, overwriting :attr:`id` if present. Optional
+        mass_params: tuple
+            Parameters to pass to :meth:`.mass`. The output is stored
+            in the SQL record as the `mass` value
+
+        Returns
+        -------
+        tuple
+        '''
+        if id is not None:
+            self.id = id
+        ext_data = self._collect_ext_data()
+        params = [self.id, self.mass(**(mass_params or {})), sqlite3.Binary(self.serialize()),
+                  self.canonical_hash(exact=True), self.canonical_hash(exact=False)]
+        params.extend(_sql_parameter(ext_data[name]) for name in sorted(ext_data))
+        return tuple(params)
+
     def to_update_sql(self, mass_params=None, inherits=None, *args, **kwargs):
         '''
         Generates SQL for use with ``UPDATE {table_name} set ... where glycan_id = {id};``.
@@ -301,7 +508,8 @@ class GlycanRecordBase(object):
         inherits.update(inherits)
 
         template = '''update {table_name} set mass = {mass},
-         structure = "{structure}" /*rest*/ where glycan_id = {id};'''
+         structure = X'{structure}', exact_hash = '{exact_hash}',
+         topology_hash = '{topology_hash}' /*rest*/ where glycan_id = {id};'''
 
         ext_names = list(inherits)
         ext_values = ["{}".format(v) for k, v in self._collect_ext_data().items()]
@@ -313,7 +521,9 @@ class GlycanRecordBase(object):
         values = {}
         values['id'] = self.id
         values['mass'] = self.mass(**(mass_params or {}))
-        values['structure'] = pickle.dumps(self)
+        values['structure'] = hexlify(self.serialize())
+        values['exact_hash'] = self.canonical_hash(exact=True)
+        values['topology_hash'] = self.canonical_hash(exact=False)
         values['table_name'] = self.__table_name
 
         yield template.format(**values)
@@ -338,6 +548,8 @@ class GlycanRecordBase(object):
         cur = self._bound_db.cursor()
         for stmt in self.to_update_sql(mass_params=mass_params, inherits=inherits):
             cur.execute(stmt)
+        if getattr(self._bound_db, "has_substructure_index", False):
+            self._bound_db._write_substructure_index([self])
         if commit:
             cur.connection.commit()
 
@@ -369,17 +581,21 @@ class GlycanRecordBase(object):
         Parameters
         ----------
         row: sqlite3.Row
-            A dict-like object containing the pickled value of the record in
+            A dict-like object containing the serialized value of the record in
             the `structure` field
 
         Returns
         -------
         GlycanRecord:
-            The unpickled :class:`GlycanRecord` object. Sub-classes may perform
+            The deserialized :class:`GlycanRecord` object. Sub-classes may perform
             more complex operations like decompressing or joining other tables in
             the database.
+
+        See Also
+        --------
+        :meth:`.deserialize`
         '''
-        record = pickle.loads(str(row["structure"]))
+        record = cls.deserialize(row["structure"])
         record._bound_db = kwargs.get("database")
         return record
 
@@ -410,6 +626,17 @@ class GlycanRecordBase(object):
         return not self == other
 
 
+def _sql_parameter(value):
+    '''
+    Metadata transforms return values formatted as SQL literals. Strip the quotes
+    from string literals so they can be passed as parameters instead.
+    '''
+    if isinstance(value, basestring) and len(value) > 1 and value[0] == value[-1] and value[0] in "\"'":
+        quote = value[0]
+        return value[1:-1].replace(quote * 2, quote)
+    return value
+
+
 def extract_composition(record, max_size=120):
     '''
     Given a :class:`GlycanRecord`, translate its :attr:`.monosaccharides` property
@@ -508,8 +735,25 @@ def is_n_glycan(record):
     :func:`pygly2.algorithms.subtree_search.subtree_of`
     '''
     return int(subtree_search.subtree_of(
-        n_glycan_core, record.structure, exact=False) == 1)
-n_glycan_core = pygly2.glycans["N-Linked Core"]
+        n_glycan_core(), record.structure, exact=False) == 1)
+
+
+_n_glycan_core = None
+
+
+def n_glycan_core():
+    '''
+    The :title:`N-linked Glycan` core motif from :obj:`pygly2.glycans`, parsed on first use
+    and shared afterwards. It must not be modified.
+
+    Returns
+    -------
+    |Glycan|
+    '''
+    global _n_glycan_core
+    if _n_glycan_core is None:
+        _n_glycan_core = pygly2.glycans["N-Linked Core"]
+    return _n_glycan_core
 
 
 @metadata("composition", "varchar(120)", extract_composition)
@@ -566,6 +810,10 @@ class GlycanRecord(GlycanRecordBase):
         inherits = _resolve_metadata_mro(self.__class__)
         return super(GlycanRecord, self).to_sql(*args, inherits=inherits, **kwargs)
 
+    @classmethod
+    def insert_sql(cls, inherits=None):
+        return super(GlycanRecord, cls).insert_sql(inherits=_resolve_metadata_mro(cls))
+
     def to_update_sql(self, *args, **kwargs):
         inherits = _resolve_metadata_mro(self.__class__)
         inherits = inherits or _resolve_metadata_mro(self.__class__)
@@ -620,7 +868,10 @@ class RecordDatabase(object):
     table name, and :meth:`GlycanRecord.from_sql` function.
 
     If ``records`` is not provided, no records are added. If records are provided, they are inserted
-    with :meth:`.load_data` and afterwards :meth:`.apply_indices` is called.
+    with :meth:`.bulk_load`, which calls :meth:`.apply_indices` afterwards.
+
+    An existing database file written before the `exact_hash` and `topology_hash` columns were
+    introduced has them added and filled when it is opened.
 
     Attributes
     ----------
@@ -654,15 +905,16 @@ class RecordDatabase(object):
         self.cursor = self.connection.cursor
         self.record_type = record_type
         self._id = 0
+        self._has_substructure_index = None
 
         if records is not None:
             self.apply_schema()
-            self.load_data(records)
-            self.apply_indices()
+            self.bulk_load(records)
         elif created_new:
             self.apply_schema()
         else:
             self._id = len(self)
+            self._migrate_schema()
 
     def apply_schema(self):
         '''
@@ -678,6 +930,28 @@ class RecordDatabase(object):
         self.connection.executescript('\n'.join(self.record_type.sql_schema()))
         self.connection.commit()
         self._id = 0
+        self._has_substructure_index = None
+
+    def _migrate_schema(self):
+        '''
+        Add the `exact_hash` and `topology_hash` columns to a record table written before they
+        were introduced, fill them from the stored structures and create their indices.
+        '''
+        columns = {row[1] for row in self.execute("PRAGMA table_info({table_name});")}
+        missing = [column for column in ("exact_hash", "topology_hash") if column not in columns]
+        if not columns or not missing:
+            return
+        for column in missing:
+            self.execute("alter table {{table_name}} add column {} char(40);".format(column))
+        rows = self.execute("select glycan_id, structure from {table_name};").fetchall()
+        hashes = []
+        for row in rows:
+            record = self.record_type.from_sql(row)
+            hashes.append((record.canonical_hash(exact=True), record.canonical_hash(exact=False),
+                           row["glycan_id"]))
+        self.executemany("update {table_name} set exact_hash = ?, topology_hash = ? where glycan_id = ?;",
+                         hashes)
+        self.apply_indices()
 
     def apply_indices(self):
         '''
@@ -712,9 +986,213 @@ class RecordDatabase(object):
                 except:
                     print(stmt)
                     raise
+            if self.has_substructure_index:
+                self._write_substructure_index([record])
+        if commit:
+            self.commit()
+
+    def bulk_load(self, record_list, set_id=True, pragmas=None, defer_indices=True, mass_params=None):
+        '''
+        Insert an iterable of :attr:`.record_type` objects in a single transaction using
+        :meth:`executemany` with the statement from :meth:`GlycanRecord.insert_sql`. This
+        avoids building and parsing one SQL string per record as :meth:`.load_data` does.
+
+        Parameters
+        ----------
+        record_list: iterable
+            The records to insert. They are consumed lazily.
+        set_id: bool
+            Whether to assign each record the next primary key. Defaults to |True|
+        pragmas: dict, optional
+            Sqlite ``PRAGMA`` settings to use while loading, such as ``journal_mode``,
+            ``synchronous`` or ``cache_size``. The previous values are restored afterwards.
+        defer_indices: bool
+            Whether to drop the indices of the record table before loading and rebuild them
+            once all records are inserted, alongside those from :meth:`.apply_indices`.
+            Defaults to |True|
+        mass_params: dict, optional
+            Parameters passed to :meth:`GlycanRecord.mass`
+
+        Returns
+        -------
+        int:
+            The number of records inserted
+        '''
+        if not isinstance(record_list, Iterable):
+            record_list = [record_list]
+        records = iter(record_list)
+        # Pragmas like journal_mode cannot be changed inside of a transaction
+        self.commit()
+        previous = self._set_pragmas(pragmas or {})
+        dropped = self._drop_indices() if defer_indices else []
+        insert_stmt = self.record_type.insert_sql()
+        index_substructures = self.has_substructure_index
+        count = 0
+        try:
+            while True:
+                batch = list(itertools.islice(records, _bulk_batch_size))
+                if not batch:
+                    break
+                if set_id:
+                    for record in batch:
+                        self._id += 1
+                        record.id = self._id
+                self.connection.executemany(
+                    insert_stmt, (record.to_sql_parameters(mass_params=mass_params) for record in batch))
+                if index_substructures:
+                    self._write_substructure_index(batch, replace=False)
+                count += len(batch)
+            self.commit()
+        except:
+            self.rollback()
+            raise
+        finally:
+            for index_stmt in dropped:
+                self.connection.execute(index_stmt)
+            if defer_indices:
+                self.apply_indices()
+            self.commit()
+            self._set_pragmas(previous)
+        return count
+
+    def _set_pragmas(self, pragmas):
+        '''
+        Apply each ``PRAGMA`` in `pragmas`, returning a mapping of their prior values
+        '''
+        previous = {}
+        for name, value in pragmas.items():
+            if not name.replace("_", "").isalnum():
+                raise ValueError("Invalid PRAGMA name {!r}".format(name))
+            previous[name] = self.connection.execute("PRAGMA {};".format(name)).fetchone()[0]
+            self.connection.execute("PRAGMA {} = {};".format(name, value))
+        return previous
+
+    def _drop_indices(self):
+        '''
+        Drop the indices on the record table, returning the statements which recreate them
+        '''
+        table_name = self.record_type.table_name
+        indices = self.connection.execute(
+            "select name, sql from sqlite_master where type = 'index' and tbl_name = ? and sql is not null;",
+            (table_name,)).fetchall()
+        for name, sql in indices:
+            self.connection.execute('drop index "{}";'.format(name))
+        return [sql for name, sql in indices]
+
+    # Substructure Search
+
+    @property
+    def has_substructure_index(self):
+        '''
+        Whether the side tables used by :meth:`substructure_search` exist. Databases
+        created before they were introduced are indexed by :meth:`build_substructure_index`.
+        '''
+        if self._has_substructure_index is None:
+            self._has_substructure_index = self.execute(
+                "select count(*) from sqlite_master where type = 'table' and name = ?;",
+                (self.record_type.table_name + _substructure_index_tables[-1],)).fetchone()[0] > 0
+        return self._has_substructure_index
+
+    def _write_substructure_index(self, records, replace=True):
+        '''
+        Insert the rows of :meth:`GlycanRecord.substructure_index_rows` for each of `records`,
+        first removing any existing rows for them if `replace` is |True|
+        '''
+        tables = [[] for suffix in _substructure_index_tables]
+        for record in records:
+            for rows, record_rows in zip(tables, record.substructure_index_rows()):
+                rows.extend(record_rows)
+        if replace:
+            ids = [(record.id,) for record in records]
+            for suffix in _substructure_index_tables:
+                self.executemany("delete from {table_name}" + suffix + " where glycan_id = ?;", ids)
+        for stmt, rows in zip(self.record_type.substructure_index_sql(), tables):
+            self.connection.executemany(stmt, rows)
+
+    def build_substructure_index(self, commit=True):
+        '''
+        Create the side tables used by :meth:`substructure_search`, discarding any
+        existing ones, and fill them from every record in the database.
+        '''
+        self.connection.executescript(self.record_type.substructure_index_schema())
+        records = iter(self)
+        while True:
+            batch = list(itertools.islice(records, _bulk_batch_size))
+            if not batch:
+                break
+            self._write_substructure_index(batch, replace=False)
+        self._has_substructure_index = True
         if commit:
             self.commit()
 
+    def _substructure_candidates_sql(self, query, counted=True):
+        '''
+        Build a query selecting the id of each record which has every residue, linkage and
+        path label of `query`, and if `counted` is |True|, at least as many residues and
+        linkages of each label as `query`
+        '''
+        clauses = []
+        params = []
+
+        def variants(label):
+            found = fingerprint.label_variants(label.split(">"))
+            return found, ', '.join('?' * len(found))
+
+        for table, counts in (("residue", fingerprint.residue_counts(query)),
+                              ("linkage", fingerprint.linkage_counts(query))):
+            for label, count in counts.items():
+                found, marks = variants(label)
+                clauses.append(
+                    "select glycan_id from {{table_name}}_{}_index where label in ({}) "
+                    "group by glycan_id having sum(count) >= ?".format(table, marks))
+                params.extend(found)
+                params.append(count if counted else 1)
+        for path in fingerprint.residue_paths(query):
+            found, marks = variants(path)
+            clauses.append("select glycan_id from {{table_name}}_path_index where path in ({})".format(marks))
+            params.extend(found)
+        return " intersect ".join(clauses), params
+
+    def substructure_search(self, query, exact=False):
+        '''
+        Find the records whose :attr:`structure` contains `query`, as tested by
+        :func:`~pygly2.algorithms.subtree_search.subtree_of`.
+
+        Candidate records are first selected in SQL using the side tables described in
+        :class:`GlycanRecordBase`. Unless `exact` is |True|, their stored fingerprints are then
+        screened with :meth:`.Fingerprint.screen`, and only the remaining records are decoded
+        and compared to `query`. If the side tables are missing, they are built with
+        :meth:`build_substructure_index`.
+
+        :func:`~pygly2.algorithms.subtree_search.exact_ordering_inclusion` may match several
+        residues of `query` to the same residue, so residue and linkage counts and fingerprints
+        are not used when `exact` is |True|.
+
+        Parameters
+        ----------
+        query: |Glycan|
+        exact: bool
+            Passed to :func:`~pygly2.algorithms.subtree_search.subtree_of`. Defaults to |False|
+
+        Yields
+        ------
+        :attr:`.record_type`
+        '''
+        if not self.has_substructure_index:
+            self.build_substructure_index()
+        candidates, params = self._substructure_candidates_sql(query, counted=not exact)
+        stmt = '''select {{table_name}}.*, {{table_name}}_fingerprint.fingerprint
+            from {{table_name}} join {{table_name}}_fingerprint using (glycan_id)
+            where glycan_id in ({});'''.format(candidates)
+        query_fingerprint = query.fingerprint()
+        for row in self.execute(stmt, params).fetchall():
+            if not exact and not query_fingerprint.screen(
+                    fingerprint.Fingerprint.from_bytes(row["fingerprint"])):
+                continue
+            record = self.record_type.from_sql(row, database=self)
+            if subtree_search.subtree_of(query, record.structure, exact=exact) is not None:
+                yield record
+
     def __len__(self):
         res = (self.execute("select count(glycan_id) from {table_name};").next())["count(glycan_id)"]
         return res or 0
@@ -836,6 +1314,91 @@ class RecordDatabase(object):
         '''
         self.connection.rollback()
 
+    # Duplicate Detection
+
+    @staticmethod
+    def _hash_column(exact):
+        return "exact_hash" if exact else "topology_hash"
+
+    def find_structure(self, structure, exact=True):
+        '''
+        Find the records whose :attr:`structure` is equal to `structure`, by looking up its
+        :meth:`~.Glycan.canonical_hash` in the indexed hash column.
+
+        Parameters
+        ----------
+        structure: |Glycan|
+        exact: bool
+            Whether to compare with :meth:`~.Glycan.exact_ordering_equality` or
+            :meth:`~.Glycan.topological_equality`. Defaults to |True|
+
+        Yields
+        ------
+        :attr:`.record_type`
+        '''
+        column = self._hash_column(exact)
+        for row in self.execute("select * from {{table_name}} where {} = ?;".format(column),
+                                (structure.canonical_hash(exact=exact),)):
+            yield self.record_type.from_sql(row, database=self)
+
+    def find_duplicates(self, exact=True):
+        '''
+        Group the records whose structures are equal, using SQL grouping over the indexed
+        hash column instead of comparing every pair of records.
+
+        Parameters
+        ----------
+        exact: bool
+            Whether to compare with :meth:`~.Glycan.exact_ordering_equality` or
+            :meth:`~.Glycan.topological_equality`. Defaults to |True|
+
+        Returns
+        -------
+        list of list of int:
+            The ids of the records in each group of two or more equal structures,
+            in ascending order
+        '''
+        column = self._hash_column(exact)
+        stmt = '''select {column}, glycan_id from {{table_name}} where {column} in
+            (select {column} from {{table_name}} group by {column} having count(*) > 1)
+            order by {column}, glycan_id;'''.format(column=column)
+        groups = []
+        last = None
+        for key, glycan_id in self.execute(stmt):
+            if key != last:
+                groups.append([])
+                last = key
+            groups[-1].append(glycan_id)
+        return groups
+
+    def deduplicate(self, exact=True, commit=True):
+        '''
+        Delete every record whose structure is equal to that of a record with a lower id.
+
+        Parameters
+        ----------
+        exact: bool
+            Whether to compare with :meth:`~.Glycan.exact_ordering_equality` or
+            :meth:`~.Glycan.topological_equality`. Defaults to |True|
+        commit: bool
+            If |True|, commit changes afterwards. Defaults to |True|
+
+        Returns
+        -------
+        int:
+            The number of records deleted
+        '''
+        column = self._hash_column(exact)
+        cursor = self.execute('''delete from {{table_name}} where glycan_id not in
+            (select min(glycan_id) from {{table_name}} group by {column});'''.format(column=column))
+        if self.has_substructure_index:
+            for suffix in _substructure_index_tables:
+                self.execute("delete from {table_name}" + suffix +
+                             " where glycan_id not in (select glycan_id from {table_name});")
+        if commit:
+            self.commit()
+        return cursor.rowcount
+
     def _find_boundaries(self, mass, tolerance):
         spread = mass * tolerance
         return (mass - spread, mass + spread)
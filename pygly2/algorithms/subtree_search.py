@@ -113,6 +113,9 @@ def subtree_of(subtree, tree, exact=False, tolerance=0):
         comparator = exact_ordering_inclusion
     else:
         comparator = topological_inclusion
+        # Every residue, linkage and path of an included structure has a match in `tree`
+        if not subtree.fingerprint().screen(tree.fingerprint()):
+            return None
     for node in tree:
         if comparator(subtree.root, node):
             return node.id
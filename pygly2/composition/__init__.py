@@ -4,5 +4,7 @@ __package__ = "pygly2.composition"
 
 import composition
 from .composition import Composition, calculate_mass
+from .acomposition import AComposition
+from .batch import batch_calculate_mass
 
 pkg_resources.declare_namespace('pygly2.composition')
@@ -0,0 +1,326 @@
+'''
+An array-backed implementation of the |Composition| interface.
+
+:class:`AComposition` stores the counts of a fixed set of common elements in a list
+indexed by :data:`element_order`, and only falls back to a :class:`dict` for other
+elements and explicit isotopes. Addition, subtraction, copying and comparison are
+element-wise list operations instead of string hashing, and a collection of
+compositions can be stacked into a NumPy matrix with one column per element.
+'''
+import operator
+from itertools import izip
+
+from .base import ChemicalCompositionError
+from .composition import PComposition, get_mass_table, pcalculate_mass
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+#: The elements stored in the fixed vector of each :class:`AComposition`, in order.
+element_order = ("C", "H", "N", "O", "S", "P", "Na", "K", "Li", "Ca", "Mg", "Cl", "Fe", "H+")
+element_index = {element: i for i, element in enumerate(element_order)}
+_n_elements = len(element_order)
+_zeros = [0] * _n_elements
+
+_element_mass_vectors = {}
+
+
+def _element_masses(mass_data, average):
+    '''
+    Get the mass of each element in :data:`element_order` under `mass_data`, along with
+    the indices of any elements missing from `mass_data`, whose mass is given as 0.
+    '''
+    # Each `mass_data` is kept alive by its :class:`MassTable`, so its id is not reused
+    key = (id(mass_data), average)
+    try:
+        return _element_mass_vectors[key]
+    except KeyError:
+        table = get_mass_table(mass_data)
+        index = 1 if average else 0
+        masses = []
+        missing = []
+        for i, element in enumerate(element_order):
+            try:
+                masses.append(table[element][index])
+            except KeyError:
+                masses.append(0.0)
+                missing.append(i)
+        _element_mass_vectors[key] = masses, missing
+        return masses, missing
+
+
+def _coerce_count(value):
+    if isinstance(value, float):
+        return int(round(value))
+    elif not isinstance(value, (int, long)):
+        raise ChemicalCompositionError(
+            'Only integers allowed as values in \
+            Composition, got {}.'.format(type(value).__name__))
+    return value
+
+
+class AComposition(object):
+    '''
+    Represent arbitrary elemental compositions using a fixed vector of counts for the
+    elements in :data:`element_order` and a :class:`dict` for everything else.
+
+    Behaves like :class:`~.composition.PComposition`: missing elements have a count of
+    zero, elements whose count becomes zero are removed, and arithmetic with any
+    mapping of isotope strings to counts is supported.
+    '''
+    __slots__ = ("_counts", "_overflow")
+
+    def __init__(self, *args, **kwargs):
+        '''
+        Accepts the same arguments as :class:`~.composition.PComposition`: a formula string,
+        a mapping of isotope strings to counts, or keyword arguments.
+        '''
+        self._counts = list(_zeros)
+        self._overflow = {}
+        if len(args) == 1 and not kwargs:
+            source = args[0]
+            if isinstance(source, AComposition):
+                self._counts = list(source._counts)
+                self._overflow = dict(source._overflow)
+                return
+            elif hasattr(source, 'items'):
+                self.update(source)
+                return
+        self.update(PComposition(*args, **kwargs))
+
+    @classmethod
+    def _from_parts(cls, counts, overflow):
+        inst = cls.__new__(cls)
+        inst._counts = counts
+        inst._overflow = overflow
+        return inst
+
+    # Mapping Interface
+
+    def __getitem__(self, key):
+        try:
+            return self._counts[element_index[key]]
+        except KeyError:
+            return self._overflow.get(key, 0)
+
+    def __setitem__(self, key, value):
+        value = _coerce_count(value)
+        try:
+            self._counts[element_index[key]] = value
+        except KeyError:
+            if value:
+                self._overflow[key] = value
+            else:
+                self._overflow.pop(key, None)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self[key] = 0
+
+    def __contains__(self, key):
+        return self[key] != 0
+
+    def get(self, key, default=0):
+        value = self[key]
+        return value if value != 0 else default
+
+    def keys(self):
+        return [k for k, v in self.items()]
+
+    def values(self):
+        return [v for k, v in self.items()]
+
+    def items(self):
+        items = [(element, count) for element, count in izip(element_order, self._counts) if count]
+        items.extend(self._overflow.items())
+        return items
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._overflow) + _n_elements - self._counts.count(0)
+
+    def update(self, other):
+        for elem, cnt in other.items():
+            self[elem] = cnt
+
+    def clone(self):
+        return self._from_parts(list(self._counts), dict(self._overflow))
+
+    copy = clone
+
+    # Arithmetic
+
+    def _combine(self, other, op):
+        if isinstance(other, AComposition):
+            counts = map(op, self._counts, other._counts)
+            overflow = dict(self._overflow)
+            for elem, cnt in other._overflow.items():
+                value = op(overflow.get(elem, 0), cnt)
+                if value:
+                    overflow[elem] = value
+                else:
+                    overflow.pop(elem, None)
+            return self._from_parts(counts, overflow)
+        result = self.clone()
+        for elem, cnt in other.items():
+            result[elem] = op(result[elem], cnt)
+        return result
+
+    def __add__(self, other):
+        return self._combine(other, operator.add)
+
+    def __radd__(self, other):
+        return self + other
+
+    def __iadd__(self, other):
+        combined = self._combine(other, operator.add)
+        self._counts = combined._counts
+        self._overflow = combined._overflow
+        return self
+
+    def __sub__(self, other):
+        return self._combine(other, operator.sub)
+
+    def __rsub__(self, other):
+        return (self - other) * (-1)
+
+    def __isub__(self, other):
+        combined = self._combine(other, operator.sub)
+        self._counts = combined._counts
+        self._overflow = combined._overflow
+        return self
+
+    def __mul__(self, other):
+        if not isinstance(other, (int, long)):
+            raise ChemicalCompositionError(
+                'Cannot multiply Composition by non-integer',
+                other)
+        return self._from_parts(
+            [c * other for c in self._counts],
+            {k: v * other for k, v in self._overflow.items() if v * other})
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __neg__(self):
+        return -1 * self
+
+    def __eq__(self, other):
+        if isinstance(other, AComposition):
+            return self._counts == other._counts and self._overflow == other._overflow
+        if not hasattr(other, 'items'):
+            return False
+        return set(self.items()) == set(i for i in other.items() if i[1])
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __str__(self):   # pragma: no cover
+        return 'Composition({})'.format(dict(self.items()))
+
+    def __repr__(self):  # pragma: no cover
+        return str(self)
+
+    # Serialization
+
+    def __reduce__(self):
+        return AComposition, (), self.__getstate__()
+
+    def __getstate__(self):
+        return dict(self.items())
+
+    def __setstate__(self, state):
+        self._counts = list(_zeros)
+        self._overflow = {}
+        self.update(state)
+
+    # Mass Calculation
+
+    def calc_mass(self, *args, **kwargs):
+        '''
+        Calculate the mass of this composition, taking the same keyword arguments
+        as :func:`~.composition.calculate_mass`.
+
+        Returns
+        -------
+        float
+        '''
+        if args or 'ion_type' in kwargs:
+            kwargs["composition"] = self
+            return pcalculate_mass(*args, **kwargs)
+        average = kwargs.get("average", False)
+        mass_data = kwargs.get("mass_data")
+        masses, missing = _element_masses(mass_data, average)
+        counts = self._counts
+        for i in missing:
+            if counts[i]:
+                raise KeyError(element_order[i])
+        charge = counts[-1]
+        if 'charge' in kwargs:
+            if charge:
+                raise ChemicalCompositionError(
+                    'Charge is specified both by the number of protons and '
+                    '`charge` in kwargs')
+            charge = kwargs['charge']
+            mass = sum(map(operator.mul, counts, masses)) + charge * masses[-1]
+        else:
+            mass = sum(map(operator.mul, counts, masses))
+        if self._overflow:
+            table = get_mass_table(mass_data)
+            index = 1 if average else 0
+            for isotope_string, count in self._overflow.items():
+                mass += count * table[isotope_string][index]
+        if charge:
+            mass /= charge
+        return mass
+
+    @property
+    def mass(self):
+        return self.calc_mass()
+
+    # Vectorization
+
+    def to_array(self):
+        '''
+        The counts of the elements in :data:`element_order` as a NumPy array.
+        Elements and isotopes outside of :data:`element_order` are not included.
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+        '''
+        return np.array(self._counts, dtype=int)
+
+    @classmethod
+    def from_array(cls, counts, overflow=None):
+        '''
+        Build an :class:`AComposition` from a vector of counts ordered by
+        :data:`element_order`, as produced by :meth:`to_array`.
+
+        Parameters
+        ----------
+        counts: sequence of int
+        overflow: dict, optional
+            Counts for any other elements or isotopes
+
+        Returns
+        -------
+        :class:`AComposition`
+        '''
+        if len(counts) != _n_elements:
+            raise ChemicalCompositionError(
+                "Expected {} element counts, got {}".format(_n_elements, len(counts)))
+        inst = cls._from_parts([int(c) for c in counts], {})
+        if overflow:
+            inst.update(overflow)
+        return inst
@@ -0,0 +1,167 @@
+'''
+Mass calculation for many compositions at once using NumPy.
+
+Compositions are packed into a count matrix with one row per composition and one
+column per isotope string, which is multiplied against a vector of element masses
+from :func:`~.composition.get_mass_table`. Masses for several charge states are
+produced together as columns of the result.
+'''
+from .base import ChemicalCompositionError
+from .composition import get_mass_table
+from .acomposition import AComposition, element_order
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def _require_numpy():
+    if np is None:  # pragma: no cover
+        raise ImportError("NumPy is required for batch mass calculation")
+
+
+def composition_matrix(compositions, elements=None):
+    '''
+    Pack `compositions` into an integer count matrix.
+
+    Parameters
+    ----------
+    compositions: sequence of |Composition|
+        Any mappings from isotope strings to counts
+    elements: sequence of str, optional
+        The isotope strings to use as columns. Defaults to :data:`.acomposition.element_order`,
+        followed by any other isotope strings present in `compositions` in order of appearance.
+
+    Returns
+    -------
+    matrix: :class:`numpy.ndarray`
+        An array of shape ``(len(compositions), len(elements))``
+    elements: tuple of str
+        The isotope string for each column of `matrix`
+
+    Raises
+    ------
+    ChemicalCompositionError:
+        If `elements` is given and a composition contains an isotope string not in it
+    '''
+    _require_numpy()
+    compositions = list(compositions)
+    fixed = elements is not None
+    elements = list(element_order if elements is None else elements)
+    column = {element: i for i, element in enumerate(elements)}
+    if not fixed:
+        for composition in compositions:
+            for isotope_string in composition.keys():
+                if isotope_string not in column:
+                    column[isotope_string] = len(elements)
+                    elements.append(isotope_string)
+
+    matrix = np.zeros((len(compositions), len(elements)), dtype=np.int64)
+    use_vectors = tuple(elements[:len(element_order)]) == element_order
+    n_fixed = len(element_order)
+    for i, composition in enumerate(compositions):
+        if use_vectors and isinstance(composition, AComposition):
+            matrix[i, :n_fixed] = composition._counts
+            items = composition._overflow.items()
+        else:
+            items = composition.items()
+        for isotope_string, count in items:
+            try:
+                matrix[i, column[isotope_string]] = count
+            except KeyError:
+                raise ChemicalCompositionError(
+                    "Composition {} contains {!r} which is not one of the columns {}".format(
+                        i, isotope_string, elements))
+    return matrix, tuple(elements)
+
+
+def element_mass_vector(elements, average=False, mass_data=None):
+    '''
+    The mass of each isotope string in `elements`.
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+    '''
+    _require_numpy()
+    table = get_mass_table(mass_data)
+    index = 1 if average else 0
+    return np.array([table[element][index] for element in elements], dtype=float)
+
+
+def mass_to_mz(masses, charge=0, mass_data=None, average=False):
+    '''
+    Convert neutral masses to m/z for one or more charge states. A charge of 0
+    leaves the neutral mass unchanged.
+
+    Parameters
+    ----------
+    masses: sequence of float
+    charge: int or sequence of int
+
+    Returns
+    -------
+    :class:`numpy.ndarray`:
+        One value per mass if `charge` is an |int|, otherwise an array of shape
+        ``(len(masses), len(charge))``
+    '''
+    _require_numpy()
+    masses = np.asarray(masses, dtype=float)
+    proton = get_mass_table(mass_data)['H+'][1 if average else 0]
+    charges = np.asarray(charge)
+    if charges.ndim == 0:
+        if charge == 0:
+            return masses
+        return (masses + charge * proton) / charge
+    charges = charges.astype(float)
+    shifted = masses[:, np.newaxis] + charges * proton
+    nonzero = charges != 0
+    divisor = np.where(nonzero, charges, 1.)
+    return np.where(nonzero, shifted / divisor, masses[:, np.newaxis])
+
+
+def batch_calculate_mass(compositions, average=False, charge=0, mass_data=None, elements=None):
+    '''
+    Calculate the mass or m/z of many compositions at once.
+
+    Any ``"H+"`` counts in a composition contribute their mass, but unlike
+    :func:`~.composition.calculate_mass` they do not set its charge.
+
+    Parameters
+    ----------
+    compositions: sequence of |Composition| or :class:`numpy.ndarray`
+        The compositions to calculate masses for, or a count matrix with one
+        row per composition and one column per entry of `elements`
+    average: bool, optional, defaults to False
+        Whether or not to use the average isotopic composition when calculating masses.
+    charge: int or sequence of int, optional, defaults to 0
+        The charge state or states to calculate m/z for. 0 produces the neutral mass.
+    mass_data: dict, optional
+        If mass_data is |None|, standard NIST mass and isotopic abundance data are used.
+    elements: sequence of str, optional
+        The isotope string of each column when `compositions` is a matrix. Defaults
+        to :data:`.acomposition.element_order`
+
+    Returns
+    -------
+    :class:`numpy.ndarray`:
+        One value per composition if `charge` is an |int|, otherwise an array of shape
+        ``(len(compositions), len(charge))``
+
+    See also
+    --------
+    :func:`pygly2.composition.composition.calculate_mass`
+    '''
+    _require_numpy()
+    if isinstance(compositions, np.ndarray):
+        matrix = compositions
+        if elements is None:
+            elements = element_order
+        if matrix.ndim != 2 or matrix.shape[1] != len(elements):
+            raise ChemicalCompositionError(
+                "Expected a matrix with {} columns, got shape {}".format(len(elements), matrix.shape))
+    else:
+        matrix, elements = composition_matrix(compositions, elements)
+    masses = matrix.dot(element_mass_vector(elements, average=average, mass_data=mass_data))
+    return mass_to_mz(masses, charge, mass_data=mass_data, average=average)
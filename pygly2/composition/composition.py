@@ -93,7 +93,7 @@ class PComposition(defaultdict):
         return self * other
 
     def __eq__(self, other):
-        if not isinstance(other, dict):
+        if not hasattr(other, 'items'):
             return False
         self_items = set([i for i in self.items() if i[1]])
         other_items = set([i for i in other.items() if i[1]])
@@ -319,6 +319,59 @@ class PComposition(defaultdict):
             self._from_dict(kwargs)
 
 
+class MassTable(dict):
+    """Maps isotope strings to their monoisotopic and average masses under one
+    `mass_data` source, parsing each isotope string only the first time it is seen.
+
+    Values are pairs of ``(monoisotopic mass, average mass)``. The average mass of
+    an isotope string with an explicit isotope number is its monoisotopic mass.
+
+    Use :func:`get_mass_table` rather than constructing instances directly, so that
+    one table is shared for each `mass_data` object.
+    """
+    def __init__(self, mass_data):
+        dict.__init__(self)
+        self.mass_data = mass_data
+
+    def __missing__(self, isotope_string):
+        element_name, isotope_num = _parse_isotope_string(isotope_string)
+        isotopes = self.mass_data[element_name]
+        monoisotopic = isotopes[isotope_num][0]
+        if isotope_num:
+            average = monoisotopic
+        else:
+            average = sum(mass * abundance for isotope, (mass, abundance) in isotopes.items()
+                          if isotope != 0)
+        value = self[isotope_string] = (monoisotopic, average)
+        return value
+
+
+_mass_tables = {}
+
+
+def get_mass_table(mass_data=None):
+    """Get the shared :class:`MassTable` for `mass_data`, or for
+    :py:data:`nist_mass` if `mass_data` is :py:const:`None`.
+
+    The table keeps a reference to `mass_data`, so changes made to `mass_data`
+    after the first call are not reflected in the table.
+
+    Returns
+    -------
+    MassTable
+    """
+    if mass_data is None:
+        mass_data = nist_mass
+    try:
+        table = _mass_tables[id(mass_data)]
+        if table.mass_data is mass_data:
+            return table
+    except KeyError:
+        pass
+    table = _mass_tables[id(mass_data)] = MassTable(mass_data)
+    return table
+
+
 def pcalculate_mass(*args, **kwargs):
     """Calculates the monoisotopic mass of a chemical formula or
     Composition object.
@@ -353,41 +406,39 @@ def pcalculate_mass(*args, **kwargs):
     """
 
     mass_data = kwargs.get('mass_data', nist_mass) or nist_mass
-    ion_comp = kwargs.get('ion_comp', std_ion_comp)
-    # Make a deep copy of `composition` keyword argument.
-    composition = (PComposition(kwargs['composition'])
-                   if 'composition' in kwargs
-                   else PComposition(*args, **kwargs))
-
+    table = get_mass_table(mass_data)
+
+    # The composition is only read, so it is not copied unless it must be
+    # converted from some other representation.
+    if 'composition' in kwargs:
+        composition = kwargs['composition']
+        if not hasattr(composition, 'items'):
+            composition = PComposition(composition)
+    else:
+        composition = PComposition(*args, **kwargs)
     if 'ion_type' in kwargs:
-        composition += ion_comp[kwargs['ion_type']]
+        ion_comp = kwargs.get('ion_comp', std_ion_comp)
+        composition = composition + ion_comp[kwargs['ion_type']]
+
+    # The average mass is only used for isotope strings without an
+    # isotope number, which :class:`MassTable` accounts for.
+    index = 1 if kwargs.get('average', False) else 0
 
     # Get charge.
-    charge = composition['H+']
+    charge = composition.get('H+', 0)
+    mass = 0.0
     if 'charge' in kwargs:
         if charge:
             raise ChemicalCompositionError(
                 'Charge is specified both by the number of protons and '
                 '`charge` in kwargs')
         charge = kwargs['charge']
-        composition['H+'] = charge
+        if charge:
+            mass += charge * table['H+'][index]
 
     # Calculate mass.
-    mass = 0.0
-    average = kwargs.get('average', False)
-    for isotope_string in composition:
-        element_name, isotope_num = _parse_isotope_string(isotope_string)
-        # Calculate average mass if required and the isotope number is
-        # not specified.
-        if (not isotope_num) and average:
-            for isotope in mass_data[element_name]:
-                if isotope != 0:
-                    mass += (composition[element_name]
-                             * mass_data[element_name][isotope][0]
-                             * mass_data[element_name][isotope][1])
-        else:
-            mass += (composition[isotope_string]
-                     * mass_data[element_name][isotope_num][0])
+    for isotope_string, count in composition.items():
+        mass += count * table[isotope_string][index]
 
     # Calculate m/z if required.
     if charge:
@@ -2,6 +2,7 @@ from ..structure import Substituent
 from ..structure import Glycan
 from ..structure import Monosaccharide
 from ..structure import Modification
+from ..structure.base import mark_modified
 
 from .composition import Composition
 
@@ -52,6 +53,8 @@ def derivatize_monosaccharide(monosaccharide_obj, substituent):
             red_end.add_substituent(
                 s, parent_loss=Composition(H=1), max_occupancy=3,
                 position=i, child_loss=Composition(H=1), child_position=1)
+        # The reducing end is not linked back to its monosaccharide
+        mark_modified(monosaccharide_obj)
 
     for pos, mod in monosaccharide_obj.modifications.items():
         if mod == Modification.a:
@@ -95,6 +98,7 @@ def strip_derivatization_monosaccharide(monosaccharide_obj):
         for pos, subst_link in red_end.links.items():
             if hasattr(subst_link.child, "_derivatize"):
                 red_end.drop_substituent(pos, subst_link.child)
+        mark_modified(monosaccharide_obj)
 
 
 
@@ -1,6 +1,6 @@
 import pkg_resources
 
-__all__ = ["glycoct", "glycoct_xml", "linear_code", "iupac", "format_constants_map", "nomenclature"]
+__all__ = ["glycoct", "glycoct_xml", "linear_code", "iupac", "binary", "format_constants_map", "nomenclature"]
 
 
 pkg_resources.declare_namespace("pygly2.io")
@@ -0,0 +1,324 @@
+'''
+A compact, versioned binary encoding of |Glycan| objects.
+
+Pickling a |Glycan| stores every |Monosaccharide|, |Substituent|, and |Link| as a
+generic object graph, including the full |EnumValue| objects used for each residue's
+anomer, stem, configuration, and modifications. This format instead flattens the graph
+into tables of plain values which can be rebuilt without re-applying any of the
+compositional changes made by each |Link|:
+
+    - A string table holding every substituent name and element symbol
+    - A residue table, with enum members stored as their integer codes
+    - A substituent table and a reduced end table
+    - A link table, which every other table refers to by row number
+
+The tables are written with :mod:`marshal`, behind a fixed header carrying a magic
+string and a format version number.
+'''
+import marshal
+import struct
+
+from ..composition import Composition
+from ..structure import (Monosaccharide, Substituent, Glycan, Link, constants)
+from ..structure.monosaccharide import ReducedEnd
+
+Anomer = constants.Anomer
+Configuration = constants.Configuration
+Stem = constants.Stem
+SuperClass = constants.SuperClass
+Modification = constants.Modification
+
+#: Identifies a byte string as an encoded |Glycan|
+MAGIC = b"PGLY"
+#: The current version of the encoding
+VERSION = 1
+
+_header = struct.Struct("!4sB")
+header_size = _header.size
+
+# Codes for the kinds of objects a |Link| may connect
+MONOSACCHARIDE = 0
+SUBSTITUENT = 1
+REDUCED_END = 2
+
+# Modification code marking the position of a residue's :class:`.ReducedEnd`
+REDUCED_END_MODIFICATION = -1
+
+
+class BinaryGlycanError(Exception):
+    pass
+
+
+def _enum_codes(enum_type):
+    return {value.value: value for name, value in enum_type}
+
+_anomer_codes = _enum_codes(Anomer)
+_configuration_codes = _enum_codes(Configuration)
+_stem_codes = _enum_codes(Stem)
+_superclass_codes = _enum_codes(SuperClass)
+_modification_codes = _enum_codes(Modification)
+
+
+def is_encoded(data):
+    '''
+    Check whether `data` begins with the header written by :func:`dumps`
+
+    Parameters
+    ----------
+    data: bytes
+
+    Returns
+    -------
+    bool
+    '''
+    return isinstance(data, (bytes, bytearray, buffer)) and bytes(data[:len(MAGIC)]) == MAGIC
+
+
+class _Encoder(object):
+    '''
+    Flattens the graph of a |Glycan| into tables, assigning each object a row
+    the first time it is seen.
+    '''
+
+    def __init__(self):
+        self.strings = []
+        self.string_index = {}
+        self.nodes = []
+        self.substituents = []
+        self.reduced_ends = []
+        self.links = []
+        self.refs = {}
+        self.link_rows = {}
+
+    def string(self, value):
+        try:
+            return self.string_index[value]
+        except KeyError:
+            self.string_index[value] = ix = len(self.strings)
+            self.strings.append(value)
+            return ix
+
+    def composition(self, composition):
+        if composition is None:
+            return None
+        flat = []
+        for element, count in composition.items():
+            flat.append(self.string(element))
+            flat.append(count)
+        return tuple(flat)
+
+    def link(self, link):
+        key = id(link)
+        try:
+            return self.link_rows[key]
+        except KeyError:
+            self.link_rows[key] = ix = len(self.links)
+            # Reserve the row before visiting the far side of the link, which
+            # will refer back to it.
+            self.links.append(None)
+            self.links[ix] = (
+                link.id, self.ref(link.parent), self.ref(link.child),
+                link.parent_position, link.child_position,
+                self.composition(link.parent_loss), self.composition(link.child_loss),
+                link.label)
+            return ix
+
+    def link_map(self, links):
+        return tuple((pos, self.link(link)) for pos, link in links.items())
+
+    def ref(self, obj):
+        key = id(obj)
+        try:
+            return self.refs[key]
+        except KeyError:
+            pass
+        if isinstance(obj, Monosaccharide):
+            kind, table = MONOSACCHARIDE, self.nodes
+        elif isinstance(obj, Substituent):
+            kind, table = SUBSTITUENT, self.substituents
+        elif isinstance(obj, ReducedEnd):
+            kind, table = REDUCED_END, self.reduced_ends
+        else:
+            raise BinaryGlycanError("Cannot encode {!r}".format(obj))
+        ref = (kind, len(table))
+        self.refs[key] = ref
+        table.append(None)
+        table[ref[1]] = getattr(self, "_encode_" + obj.__class__.__name__.lower())(obj)
+        return ref
+
+    def _encode_monosaccharide(self, node):
+        modifications = []
+        for pos, mod in node.modifications.items():
+            if isinstance(mod, ReducedEnd):
+                modifications.append((pos, REDUCED_END_MODIFICATION, self.ref(mod)[1]))
+            else:
+                modifications.append((pos, mod.value, None))
+        return (
+            node.id, node.anomer.value, node.superclass.value,
+            tuple(s.value for s in node.stem), tuple(c.value for c in node.configuration),
+            node.ring_start, node.ring_end, tuple(modifications),
+            self.composition(node.composition),
+            None if node._reducing_end is None else self.ref(node._reducing_end)[1],
+            self.link_map(node.links), self.link_map(node.substituent_links))
+
+    def _encode_substituent(self, substituent):
+        return (
+            substituent.id, self.string(substituent.name),
+            self.composition(substituent.composition),
+            substituent.can_nh_derivatize, substituent.is_nh_derivatizable,
+            getattr(substituent, "_derivatize", False),
+            self.link_map(substituent.links))
+
+    def _encode_reducedend(self, reduced_end):
+        return (
+            reduced_end.id, self.composition(reduced_end.composition),
+            self.composition(getattr(reduced_end, "base_composition", None)),
+            reduced_end.valence, self.link_map(reduced_end.links))
+
+    def encode(self, glycan):
+        root = self.ref(glycan.root)[1]
+        nodes = glycan.index or list(glycan)
+        index = tuple(self.ref(node)[1] for node in glycan.index or ())
+        link_index = tuple(self.link(link) for link in glycan.link_index or ())
+        for node in nodes:
+            self.ref(node)
+        return (
+            tuple(self.strings), tuple(self.nodes), tuple(self.substituents),
+            tuple(self.reduced_ends), tuple(self.links), root, index, link_index,
+            dict(glycan.branch_lengths))
+
+
+class _Decoder(object):
+    '''
+    Rebuilds the objects described by the tables written by :class:`_Encoder`
+    '''
+
+    def __init__(self, payload):
+        (self.strings, self.node_rows, self.substituent_rows, self.reduced_end_rows,
+         self.link_rows, self.root, self.index, self.link_index, self.branch_lengths) = payload
+
+    def composition(self, flat):
+        if flat is None:
+            return None
+        strings = self.strings
+        return Composition({strings[flat[i]]: flat[i + 1] for i in range(0, len(flat), 2)})
+
+    def fill(self, multimap, entries):
+        links = self.links
+        for pos, ix in entries:
+            multimap[pos] = links[ix]
+
+    def decode(self):
+        composition = self.composition
+
+        reduced_ends = []
+        for ident, comp, base_comp, valence, links in self.reduced_end_rows:
+            reduced_end = ReducedEnd(id=ident, valence=valence)
+            reduced_end.composition = composition(comp)
+            if base_comp is not None:
+                reduced_end.base_composition = composition(base_comp)
+            reduced_ends.append(reduced_end)
+
+        substituents = []
+        for ident, name, comp, can_nh, is_nh, derivatize, links in self.substituent_rows:
+            substituent = Substituent(
+                self.strings[name], composition=composition(comp), id=ident,
+                can_nh_derivatize=can_nh, is_nh_derivatizable=is_nh)
+            if derivatize:
+                substituent._derivatize = True
+            substituents.append(substituent)
+
+        nodes = []
+        for row in self.node_rows:
+            (ident, anomer, superclass, stem, configuration, ring_start, ring_end,
+             modifications, comp, reduced, links, substituent_links) = row
+            node = Monosaccharide(
+                anomer=_anomer_codes[anomer], superclass=_superclass_codes[superclass],
+                stem=[_stem_codes[s] for s in stem],
+                configuration=[_configuration_codes[c] for c in configuration],
+                ring_start=ring_start, ring_end=ring_end, composition=composition(comp),
+                id=ident, fast=True)
+            for pos, code, ix in modifications:
+                if code == REDUCED_END_MODIFICATION:
+                    node.modifications[pos] = reduced_ends[ix]
+                else:
+                    node.modifications[pos] = _modification_codes[code]
+            if reduced is not None:
+                node._reducing_end = reduced_ends[reduced]
+            nodes.append(node)
+
+        tables = {MONOSACCHARIDE: nodes, SUBSTITUENT: substituents, REDUCED_END: reduced_ends}
+        self.links = links = []
+        for row in self.link_rows:
+            (ident, parent, child, parent_position, child_position,
+             parent_loss, child_loss, label) = row
+            link = Link(
+                tables[parent[0]][parent[1]], tables[child[0]][child[1]],
+                parent_position=parent_position, child_position=child_position,
+                parent_loss=composition(parent_loss), child_loss=composition(child_loss),
+                id=ident, attach=False)
+            link.label = label
+            links.append(link)
+
+        # Attach the links in their original order without re-applying their losses,
+        # which are already reflected in each stored composition
+        for node, row in zip(nodes, self.node_rows):
+            self.fill(node.links, row[10])
+            self.fill(node.substituent_links, row[11])
+        for substituent, row in zip(substituents, self.substituent_rows):
+            self.fill(substituent.links, row[6])
+        for reduced_end, row in zip(reduced_ends, self.reduced_end_rows):
+            self.fill(reduced_end.links, row[4])
+
+        glycan = Glycan(nodes[self.root], index_method=None)
+        glycan.index = [nodes[i] for i in self.index]
+        glycan.link_index = [links[i] for i in self.link_index]
+        glycan.branch_lengths = dict(self.branch_lengths)
+        return glycan
+
+
+def dumps(glycan):
+    '''
+    Encode `glycan` as a byte string
+
+    Parameters
+    ----------
+    glycan: |Glycan|
+
+    Returns
+    -------
+    bytes
+    '''
+    payload = _Encoder().encode(glycan)
+    return _header.pack(MAGIC, VERSION) + marshal.dumps(payload, 2)
+
+
+def loads(data):
+    '''
+    Decode a |Glycan| from a byte string produced by :func:`dumps`
+
+    Parameters
+    ----------
+    data: bytes
+
+    Returns
+    -------
+    |Glycan|
+
+    Raises
+    ------
+    BinaryGlycanError:
+        If `data` is not an encoded |Glycan|, or was written by an unsupported
+        version of the format
+    '''
+    data = bytes(data)
+    if not is_encoded(data):
+        raise BinaryGlycanError("Not an encoded Glycan")
+    magic, version = _header.unpack_from(data)
+    if version != VERSION:
+        raise BinaryGlycanError("Unsupported encoding version {}".format(version))
+    try:
+        payload = marshal.loads(data[header_size:])
+    except (EOFError, ValueError, TypeError) as e:
+        raise BinaryGlycanError("Malformed Glycan encoding: {}".format(e))
+    return _Decoder(payload).decode()
@@ -1,7 +1,10 @@
+import os
 import re
+import json
 import logging
 import warnings
-from ..utils import opener, StringIO, enum
+import multiprocessing
+from ..utils import opener, StringIO, enum, make_struct
 from ..utils.multimap import OrderedMultiMap
 from ..structure import monosaccharide, substituent, link, constants, glycan
 from .format_constants_map import (anomer_map, superclass_map,
@@ -218,12 +221,7 @@ class GlycoCT(object):
         self._iter = None
 
     def _read(self):
-        for line in self.handle:
-            for token in re.split(r"\s|;", line):
-                logger.debug(token)
-                if "" == token.strip():
-                    continue
-                yield token
+        return tokenize(self.handle)
 
     def _reset(self):
         self.graph = {}
@@ -357,7 +355,17 @@ class GlycoCT(object):
         Returns an iterator that yields each complete :class:`Glycan` instance
         from the underlying text stream.
         '''
-        for line in self._read():
+        for glycan in self._parse_tokens(self._read()):
+            yield glycan
+        yield Glycan(self.root)
+
+    def _parse_tokens(self, tokens):
+        '''
+        Feed each token in `tokens` through the state machine, yielding each |Glycan|
+        completed by the start of a new RES section. The last structure is left in
+        :attr:`root` for the caller to finish.
+        '''
+        for line in tokens:
             if RES == line.strip():
                 self.state = RES
                 logger.debug("RES")
@@ -408,16 +416,435 @@ class GlycoCT(object):
             else:
                 raise GlycoCTError("Unknown format error: {}".format(line))
         self.in_repeat = False
-        yield Glycan(self.root)
 
 
-def read(stream):
+GlycoCTBlock = make_struct("GlycoCTBlock", ("offset", "length", "text"))
+'''
+The text of a single structure in a GlycoCT file, beginning at a RES section.
+
+Created by :func:`make_struct`.
+
+Attributes
+----------
+offset: |int|
+    The byte offset of the start of the block in the file
+length: |int|
+    The length of the block in bytes
+text: |str|
+    The text of the block
+
+See Also
+--------
+:meth:`StreamingGlycoCT.blocks`
+'''
+
+
+class StreamingGlycoCT(GlycoCT):
     '''
-    A convenience wrapper for :class:`GlycoCT`
+    A parser for files holding many condensed GlycoCT structures which reads one
+    structure block at a time, so that only the current structure's text is held in memory.
+    Each block begins with a line starting with RES. Any text before the first block is skipped.
+
+    The byte offset of each block is tracked. A reader can be restricted to the blocks which
+    begin within a byte range, which partitions a file into shards, and :attr:`offset` gives
+    the position from which a later reader should resume.
+
+    Attributes
+    ----------
+    start: |int|
+        The byte offset to begin reading from. If it does not fall on the start of a
+        structure, reading begins at the next structure.
+    end: |int| or |None|
+        No structure beginning at or after this byte offset is read. If |None|, read to the
+        end of the file.
+    offset: |int|
+        The byte offset just past the last structure yielded
     '''
+
+    def __init__(self, stream, start=0, end=None):
+        '''
+        Creates a streaming parser of condensed GlycoCT.
+
+        Parameters
+        ----------
+        stream: basestring or file-like
+            A path to a file or a seekable file-like object to be processed
+        start: int, optional
+            The byte offset to begin reading from. Defaults to 0
+        end: int, optional
+            The byte offset at or after which no new structure is read. Defaults to |None|
+        '''
+        super(StreamingGlycoCT, self).__init__(opener(stream, "rb"))
+        self.start = start
+        self.end = end
+        self.offset = start
+
+    def _seek_start(self):
+        '''
+        Position :attr:`handle` at the first line beginning at or after :attr:`start`
+
+        Returns
+        -------
+        int:
+            The byte offset of the first whole line
+        '''
+        if self.start == 0:
+            try:
+                self.handle.seek(0)
+            except (AttributeError, IOError):
+                pass
+            return 0
+        self.handle.seek(self.start - 1)
+        if self.handle.read(1) == "\n":
+            return self.start
+        return self.start + len(self.handle.readline())
+
+    def blocks(self):
+        '''
+        Iterate over the text of each structure beginning between :attr:`start` and :attr:`end`
+        without parsing it.
+
+        Yields
+        ------
+        :class:`GlycoCTBlock`
+        '''
+        position = self._seek_start()
+        block_start = None
+        lines = []
+        readline = self.handle.readline
+        while True:
+            line = readline()
+            if not line:
+                break
+            if is_block_start(line):
+                if block_start is not None:
+                    yield GlycoCTBlock(block_start, position - block_start, ''.join(lines))
+                lines = []
+                if self.end is not None and position >= self.end:
+                    block_start = None
+                    break
+                block_start = position
+            if block_start is not None:
+                lines.append(line)
+            position += len(line)
+        if block_start is not None:
+            yield GlycoCTBlock(block_start, position - block_start, ''.join(lines))
+
+    def parse_block(self, block):
+        '''
+        Parse the structures in the text of `block`
+
+        Parameters
+        ----------
+        block: :class:`GlycoCTBlock` or |str|
+
+        Yields
+        ------
+        |Glycan|
+        '''
+        text = block.text if isinstance(block, GlycoCTBlock) else block
+        self._reset()
+        self.state = START
+        for glycan in self._parse_tokens(tokenize(text.splitlines())):
+            yield glycan
+        if self.root is not None:
+            yield Glycan(self.root)
+            self._reset()
+
+    def parse(self):
+        '''
+        Returns an iterator that yields each complete :class:`Glycan` instance
+        from the blocks of the underlying stream, updating :attr:`offset` as each
+        block is finished.
+        '''
+        for block in self.blocks():
+            structures = list(self.parse_block(block))
+            self.offset = block.offset + block.length
+            for structure in structures:
+                yield structure
+
+
+class GlycoCTIndex(object):
+    '''
+    The byte offset and length of each structure block in a GlycoCT file, allowing
+    individual structures to be read without parsing the rest of the file.
+
+    An index is built by scanning the file once with :meth:`StreamingGlycoCT.blocks`,
+    and can be saved beside the file with :meth:`save`. :meth:`from_file` reuses a saved
+    index unless the file's size or modification time have changed since it was built.
+
+    Structures are identified by their position in the file, starting from 0.
+
+    Attributes
+    ----------
+    path: str
+        The path to the indexed GlycoCT file
+    offsets: |list|
+        A list of ``(offset, length)`` pairs, one per structure
+    '''
+    #: Incremented when the layout of a saved index changes
+    version = 1
+    suffix = ".idx"
+
+    def __init__(self, path, offsets, size=None, mtime=None):
+        self.path = path
+        self.offsets = [tuple(pair) for pair in offsets]
+        self.size = size
+        self.mtime = mtime
+
+    @staticmethod
+    def index_path(path):
+        '''
+        The path at which the index of `path` is saved
+        '''
+        return path + GlycoCTIndex.suffix
+
+    @classmethod
+    def build(cls, path):
+        '''
+        Scan `path` and record the location of each structure block.
+
+        Returns
+        -------
+        :class:`GlycoCTIndex`
+        '''
+        stat = os.stat(path)
+        reader = StreamingGlycoCT(path)
+        try:
+            offsets = [(block.offset, block.length) for block in reader.blocks()]
+        finally:
+            reader.handle.close()
+        return cls(path, offsets, stat.st_size, stat.st_mtime)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Load the saved index for `path`.
+
+        Raises
+        ------
+        GlycoCTError:
+            If the saved index was written by an incompatible version or is out of date
+
+        Returns
+        -------
+        :class:`GlycoCTIndex`
+        '''
+        with open(cls.index_path(path), 'r') as handle:
+            state = json.load(handle)
+        if state.get("version") != cls.version:
+            raise GlycoCTError("Unsupported index version {}".format(state.get("version")))
+        stat = os.stat(path)
+        if state["size"] != stat.st_size or state["mtime"] != stat.st_mtime:
+            raise GlycoCTError("The index for {} is out of date".format(path))
+        return cls(path, state["offsets"], state["size"], state["mtime"])
+
+    @classmethod
+    def from_file(cls, path, save=True):
+        '''
+        Load the saved index for `path` if it is current, otherwise build it,
+        saving it if `save` is |True|.
+
+        Returns
+        -------
+        :class:`GlycoCTIndex`
+        '''
+        try:
+            return cls.load(path)
+        except (IOError, OSError, ValueError, KeyError, GlycoCTError):
+            pass
+        index = cls.build(path)
+        if save:
+            try:
+                index.save()
+            except (IOError, OSError):  # pragma: no cover
+                logger.warning("Could not save the index for %s", path)
+        return index
+
+    def save(self, index_path=None):
+        '''
+        Write the index to `index_path`, by default :meth:`index_path` of :attr:`path`
+        '''
+        if index_path is None:
+            index_path = self.index_path(self.path)
+        with open(index_path, 'w') as handle:
+            json.dump({"version": self.version, "size": self.size, "mtime": self.mtime,
+                       "offsets": self.offsets}, handle)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+        return self.offsets[i]
+
+    def read_block(self, i, handle=None):
+        '''
+        Read the text of the `i`-th structure
+
+        Returns
+        -------
+        :class:`GlycoCTBlock`
+        '''
+        offset, length = self.offsets[i]
+        close = handle is None
+        if close:
+            handle = opener(self.path, "rb")
+        try:
+            handle.seek(offset)
+            return GlycoCTBlock(offset, length, handle.read(length))
+        finally:
+            if close:
+                handle.close()
+
+    def read(self, ids):
+        '''
+        Parse the structures at each position in `ids`, in the order given.
+
+        Parameters
+        ----------
+        ids: int or iterable of int
+
+        Yields
+        ------
+        |Glycan|
+        '''
+        if isinstance(ids, (int, long)):
+            ids = [ids]
+        handle = opener(self.path, "rb")
+        parser = StreamingGlycoCT(handle)
+        try:
+            for i in ids:
+                for structure in parser.parse_block(self.read_block(i, handle)):
+                    yield structure
+        finally:
+            handle.close()
+
+    def __repr__(self):  # pragma: no cover
+        return "<GlycoCTIndex {} ({} structures)>".format(self.path, len(self))
+
+
+def tokenize(lines):
+    '''
+    Split each line of GlycoCT text into its whitespace or semicolon-separated tokens
+
+    Parameters
+    ----------
+    lines: iterable of str
+
+    Yields
+    ------
+    str
+    '''
+    for line in lines:
+        for token in re.split(r"\s|;", line):
+            logger.debug(token)
+            if "" == token.strip():
+                continue
+            yield token
+
+
+def is_block_start(line):
+    '''
+    Test whether `line` begins a new structure, i.e. its first token is RES
+    '''
+    return re.split(r"\s|;", line.strip(), 1)[0] == RES
+
+
+def read(stream, select=None):
+    '''
+    A convenience wrapper for :class:`GlycoCT`.
+
+    If `select` is given, `stream` must be a path, and only the structures at those
+    positions in the file are parsed using its :class:`GlycoCTIndex`, which is built
+    and saved beside the file if necessary.
+
+    Parameters
+    ----------
+    stream: basestring or file-like
+    select: int or iterable of int, optional
+        The position or positions of the structures to read
+    '''
+    if select is not None:
+        return GlycoCTIndex.from_file(stream).read(select)
     return GlycoCT(stream)
 
 
+def _parse_byte_range(args):
+    '''
+    Parse the structures beginning within a byte range of a file. Run by the worker
+    processes of :func:`read_parallel`.
+    '''
+    path, start, end = args
+    reader = StreamingGlycoCT(path, start=start, end=end)
+    try:
+        return list(reader)
+    finally:
+        reader.handle.close()
+
+
+def _byte_ranges(paths, chunk_size):
+    for path in paths:
+        offsets = GlycoCTIndex.from_file(path, save=False).offsets
+        for i in range(0, len(offsets), chunk_size):
+            start = offsets[i][0]
+            end = offsets[i + chunk_size][0] if i + chunk_size < len(offsets) else None
+            yield path, start, end
+
+
+def read_parallel(paths, processes=None, chunk_size=100, ordered=True):
+    '''
+    Parse one or more GlycoCT files using a pool of worker processes.
+
+    Each file is split into chunks of `chunk_size` structures using its :class:`GlycoCTIndex`,
+    which is loaded if a current one has been saved or else built by a quick scan. Each worker
+    parses its chunks with :class:`StreamingGlycoCT` and returns the |Glycan| objects.
+
+    Parameters
+    ----------
+    paths: str or list of str
+        The path or paths of the files to read
+    processes: int, optional
+        The number of worker processes. Defaults to the number of CPUs. If 1, the files
+        are parsed in this process.
+    chunk_size: int, optional
+        The number of structures parsed by a worker at a time. Defaults to 100
+    ordered: bool, optional
+        If |True|, structures are yielded in the order they appear in `paths`. Otherwise
+        each chunk is yielded as soon as it is finished. Defaults to |True|
+
+    Yields
+    ------
+    |Glycan|
+    '''
+    if isinstance(paths, basestring):
+        paths = [paths]
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    ranges = _byte_ranges(paths, chunk_size)
+    if processes == 1:
+        for byte_range in ranges:
+            for structure in _parse_byte_range(byte_range):
+                yield structure
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        for chunk in mapper(_parse_byte_range, ranges):
+            for structure in chunk:
+                yield structure
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def read_stream(stream, start=0, end=None):
+    '''
+    A convenience wrapper for :class:`StreamingGlycoCT`
+    '''
+    return StreamingGlycoCT(stream, start=start, end=end)
+
+
 def loads(glycoct_str):
     '''
     A convenience wrapper for :meth:`GlycoCT.loads`
@@ -12,9 +12,8 @@ class IUPACException(Exception):
     pass
 
 
-# A static copy of monosaccharide names to structures for copy-free comparison
-monosaccharide_reference = {k: v for k, v in named_structures.monosaccharides.items()}
-
+# Look up monosaccharide structures by name for copy-free comparison
+monosaccharide_reference = named_structures.monosaccharides.reference
 
 anomer_map_from = dict(format_constants_map.anomer_map)
 anomer_map_from['?'] = anomer_map_from.pop('x')
@@ -87,15 +86,15 @@ def get_relevant_substituents(residue):
     '''
     positions = [p for p, sub in residue.substituents()]
     substituents = [sub.name for p, sub in residue.substituents()]
-    if identity.is_a(residue, monosaccharide_reference["NeuAc"], exact=False):
+    if identity.is_a(residue, monosaccharide_reference("NeuAc"), exact=False):
         i = substituents.index("n_acetyl")
         substituents.pop(i)
         positions.pop(i)
-    elif identity.is_a(residue, monosaccharide_reference["NeuGc"], exact=False):
+    elif identity.is_a(residue, monosaccharide_reference("NeuGc"), exact=False):
         i = substituents.index("n_glycolyl")
         substituents.pop(i)
         positions.pop(i)
-    elif identity.is_a(residue, monosaccharide_reference["Neu"], exact=False):
+    elif identity.is_a(residue, monosaccharide_reference("Neu"), exact=False):
         i = substituents.index("amino")
         substituents.pop(i)
         positions.pop(i)
@@ -18,8 +18,8 @@ from pygly2.utils import invert_dict
 Stem = constants.Stem
 Configuration = constants.Configuration
 
-# A static copy of monosaccharide names to structures for copy-free comparison
-monosaccharide_reference = {k: v for k, v in named_structures.monosaccharides.items()}
+# Look up monosaccharide structures by name for copy-free comparison
+monosaccharide_reference = named_structures.monosaccharides.reference
 
 #: A mapping from common monosaccharide names to their symbol, ordered by priority
 monosaccharides_to = OrderedDict((
@@ -81,12 +81,12 @@ def get_relevant_substituents(residue):
     '''
     positions = [p for p, sub in residue.substituents()]
     substituents = [sub.name for p, sub in residue.substituents()]
-    if identity.is_a(residue, monosaccharide_reference["HexNAc"], exact=False) or\
-       identity.is_a(residue, monosaccharide_reference["NeuAc"], exact=False):
+    if identity.is_a(residue, monosaccharide_reference("HexNAc"), exact=False) or\
+       identity.is_a(residue, monosaccharide_reference("NeuAc"), exact=False):
         i = substituents.index("n_acetyl")
         substituents.pop(i)
         positions.pop(i)
-    elif identity.is_a(residue, monosaccharide_reference["NeuGc"], exact=False):
+    elif identity.is_a(residue, monosaccharide_reference("NeuGc"), exact=False):
         i = substituents.index("n_glycolyl")
         substituents.pop(i)
         positions.pop(i)
@@ -157,9 +157,9 @@ def monosaccharide_to_linear_code(monosaccharide, max_tolerance=3):
     tolerance = 0
     while tolerance <= max_tolerance:
         for k, v in monosaccharides_to.items():
-            if k not in monosaccharide_reference:
+            if k not in named_structures.monosaccharides:
                 continue
-            if identity.is_a(monosaccharide, monosaccharide_reference[k], tolerance=tolerance):
+            if identity.is_a(monosaccharide, monosaccharide_reference(k), tolerance=tolerance):
                 residue_sym = v
                 substituents_sym = [(
                     substituent_to_linear_code(
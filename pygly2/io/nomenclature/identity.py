@@ -1,5 +1,8 @@
+from collections import defaultdict
+
 from ...structure import named_structures, Monosaccharide, Substituent
 from ...algorithms.similarity import monosaccharide_similarity
+from ...utils.enum import EnumValue
 from .synonyms import monosaccharides as monosaccharide_synonyms
 
 
@@ -70,12 +73,114 @@ def is_a(node, target, tolerance=0, include_modifications=True, include_substitu
     return (qs - res) <= tolerance
 
 
+def residue_signature(node):
+    '''
+    Summarize every trait of `node` compared by :func:`is_a`, such that two residues with the
+    same signature are identified the same way.
+
+    Parameters
+    ----------
+    node: Monosaccharide
+
+    Returns
+    -------
+    tuple or |None|:
+        |None| if `node` has a modification which is not a |Modification|, such as a
+        reduced end, or if it is not a |Monosaccharide|
+    '''
+    if not isinstance(node, Monosaccharide):
+        return None
+    if not all(isinstance(mod, EnumValue) for mod in node.modifications.values()):
+        return None
+    return (node.anomer.value, node.superclass.value, tuple(s.value for s in node.stem),
+            tuple(c.value for c in node.configuration)) + _attachment_key(node)
+
+
+def _attachment_key(node):
+    modifications = tuple(sorted(mod.value for mod in node.modifications.values()))
+    substituents = tuple(sorted(
+        (sub.name, tuple(sorted(sub.composition.items()))) for pos, sub in node.substituents()))
+    return modifications, substituents
+
+
+class ReferenceIndex(object):
+    '''
+    Groups the named residues in :obj:`pygly2.monosaccharides` by superclass, modifications
+    and substituents, which must all match `node` for :func:`is_a` to hold with no tolerance.
+    Each group keeps the order in which :func:`identify` would compare its members. The
+    names found for each :func:`residue_signature` are memoized.
+
+    Attributes
+    ----------
+    source: StructureIndex
+        The index of named residues this was built from
+    order: list
+        The names and residues of :attr:`source` in the order they are compared
+    groups: defaultdict of list
+        Maps the superclass, modifications and substituents of each residue to the positions
+        in :attr:`order` of the residues with those traits. Residues with an unknown superclass
+        are grouped under a superclass of |None|.
+    names: dict
+        The result of each previous call to :func:`identify`, keyed by the signature of
+        the residue and the arguments given
+    '''
+    def __init__(self, source):
+        self.source = source
+        self.order = list(source.items())
+        self.groups = defaultdict(list)
+        for i, (name, residue) in enumerate(self.order):
+            self.groups[(residue.superclass.value,) + _attachment_key(residue)].append(i)
+        self.names = {}
+
+    def is_current(self, source):
+        return self.source is source and len(self.order) == len(source)
+
+    def candidates(self, node, tolerance=0, include_modifications=True, include_substituents=True):
+        '''
+        The names and residues which `node` may be matched to, in the order they should be
+        compared. Every residue is a candidate unless `tolerance` is 0, both modifications
+        and substituents are included, and `node` has a :func:`residue_signature`.
+        '''
+        if tolerance != 0 or not (include_modifications and include_substituents):
+            return self.order
+        if residue_signature(node) is None:
+            return self.order
+        attachments = _attachment_key(node)
+        positions = self.groups.get((node.superclass.value,) + attachments, [])
+        if node.superclass.value is not None:
+            positions = sorted(positions + self.groups.get((None,) + attachments, []))
+        return [self.order[i] for i in positions]
+
+
+_reference_index = None
+
+
+def reference_index():
+    '''
+    The :class:`ReferenceIndex` of :obj:`pygly2.monosaccharides`, rebuilt whenever
+    residues are added to or removed from it.
+
+    Returns
+    -------
+    ReferenceIndex
+    '''
+    global _reference_index
+    source = named_structures.monosaccharides
+    if _reference_index is None or not _reference_index.is_current(source):
+        _reference_index = ReferenceIndex(source)
+    return _reference_index
+
+
 def identify(node, blacklist=None, tolerance=0, include_modifications=True, include_substituents=True):
     '''
     Attempt to find a common usage name for the given |Monosaccharide|, `node`. The name is determined by
     performing an incremental comparison of the traits of `node` with each named residue in the database
     accessed at :obj:`pygly2.monosaccharides`.
 
+    Only the residues which share the traits indexed by :class:`ReferenceIndex` with `node` are compared
+    when `tolerance` is 0, and the result is remembered for any other residue with the same
+    :func:`residue_signature`.
+
     Parameters
     ----------
     node: Monosaccharide
@@ -106,12 +211,29 @@ def identify(node, blacklist=None, tolerance=0, include_modifications=True, incl
     '''
     if blacklist is None:
         blacklist = ["Hex"]
-    for name, structure in named_structures.monosaccharides.items():
+    index = reference_index()
+    signature = residue_signature(node)
+    if signature is not None:
+        key = (signature, frozenset(blacklist), tolerance, include_modifications, include_substituents)
+        try:
+            name = index.names[key]
+        except KeyError:
+            name = index.names[key] = _identify(
+                index, node, blacklist, tolerance, include_modifications, include_substituents)
+    else:
+        name = _identify(index, node, blacklist, tolerance, include_modifications, include_substituents)
+    if name is None:
+        raise IdentifyException("Could not identify {}".format(node))
+    return name
+
+
+def _identify(index, node, blacklist, tolerance, include_modifications, include_substituents):
+    for name, structure in index.candidates(node, tolerance, include_modifications, include_substituents):
         if name in blacklist:
             continue
         if is_a(node, structure, tolerance, include_modifications, include_substituents):
             return get_preferred_name(name)
-    raise IdentifyException("Could not identify {}".format(node))
+    return None
 
 
 class IdentifyException(Exception):
@@ -11,3 +11,55 @@ class SubstituentBase(object):
 
 class ModificationBase(object):
     __metaclass__ = abc.ABCMeta
+
+
+def mark_modified(node):
+    '''
+    Record that the composition or connectivity of `node` has changed, by incrementing the
+    version of `node` and of every |Monosaccharide| it is attached below. Values cached
+    for these residues, or for a |Glycan| rooted at one of them, are discarded when next read.
+
+    The setters of |Monosaccharide| and the methods of |Link| call this for the residues they
+    change. Changes made any other way, such as altering a :class:`ReducedEnd` or reordering
+    :attr:`links` in place, should be followed by a call for the residue they belong to.
+    '''
+    stack = [node]
+    seen = set()
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, SaccharideBase):
+            node._version += 1
+        parents = getattr(node, "parents", None)
+        if parents is not None:
+            stack.extend(parent for pos, parent in parents())
+
+
+class VersionCache(dict):
+    '''
+    A :class:`dict` for values computed from a structure which empties itself when the
+    version of the structure it was filled at has changed.
+
+    Values which depend upon a `mass_data` mapping should be stored with a reference to
+    it, as its :func:`id` is only unique while it is alive.
+    '''
+
+    def __init__(self):
+        dict.__init__(self)
+        self.version = None
+
+    def validate(self, version):
+        '''
+        Discard all stored values if they were computed at a version other than `version`.
+
+        Returns
+        -------
+        VersionCache:
+            `self`, for chain calls
+        '''
+        if self.version != version:
+            self.clear()
+            self.version = version
+        return self
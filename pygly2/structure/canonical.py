@@ -0,0 +1,143 @@
+'''
+Canonical string forms and structural hashes of |Glycan| objects.
+
+Comparing two structures with :meth:`Glycan.exact_ordering_equality` or
+:meth:`Glycan.topological_equality` walks both graphs, so finding the duplicates in a
+collection of structures requires comparing every pair. Instead, each structure can be
+written as a string from which the same comparison can be made, and the strings of many
+structures can be hashed into a :class:`dict` or :class:`set`.
+
+Each residue is written from the same features compared by
+:meth:`Monosaccharide._flat_equality`: its anomer, superclass, stem, configuration, ring
+bounds, modifications and composition, followed by its substituents and then its children.
+
+    - The *exact* form writes substituents and children in the order they are attached, with
+      the position of each, matching :meth:`Monosaccharide.exact_ordering_equality`.
+    - The *topological* form omits positions and sorts the substituents and children by their
+      own forms, matching :meth:`Monosaccharide.topological_equality`, which pairs children
+      regardless of the position they are attached at.
+
+Structures which are equal under either comparison have the same form, and so the same hash.
+'''
+import hashlib
+
+from .monosaccharide import ReducedEnd
+
+
+def _composition_string(composition):
+    return ''.join("{}{}".format(element, count) for element, count in sorted(composition.items()))
+
+
+def _modification_string(modification):
+    if isinstance(modification, ReducedEnd):
+        return "{}({})".format(modification.name, _composition_string(modification.composition))
+    return modification.name
+
+
+def residue_string(residue):
+    '''
+    Write the features of `residue` compared by :meth:`Monosaccharide._flat_equality`,
+    excluding its substituents and links.
+
+    Parameters
+    ----------
+    residue: |Monosaccharide|
+
+    Returns
+    -------
+    str
+    '''
+    return "{}-{}-{}-{}-{}:{}-{}-{}".format(
+        residue.anomer.name, residue.superclass.name,
+        ','.join(str(s.name) for s in residue.stem),
+        ','.join(str(c.name) for c in residue.configuration),
+        residue.ring_start, residue.ring_end,
+        ','.join(sorted("{}={}".format(pos, _modification_string(mod))
+                        for pos, mod in residue.modifications.items())),
+        _composition_string(residue.composition))
+
+
+def _substituent_string(substituent):
+    return "{}({})".format(substituent.name, _composition_string(substituent.composition))
+
+
+def residue_form(residue, exact=True):
+    '''
+    Write the subtree rooted at `residue`.
+
+    Parameters
+    ----------
+    residue: |Monosaccharide|
+    exact: bool, optional, defaults to |True|
+        Whether to write the exact or topological form
+
+    Returns
+    -------
+    str
+    '''
+    # Visit the subtree in post-order so that each residue's children are written before it
+    forms = {}
+    stack = [(residue, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for pos, child in node.children())
+            continue
+        if exact:
+            substituents = ["{}:{}".format(pos, _substituent_string(sub))
+                            for pos, sub in node.substituents()]
+            children = ["{}:{}".format(pos, forms.pop(child.id))
+                        for pos, child in node.children()]
+        else:
+            substituents = sorted(_substituent_string(sub) for pos, sub in node.substituents())
+            children = sorted(forms.pop(child.id) for pos, child in node.children())
+        forms[node.id] = "{}[{}]{}".format(
+            residue_string(node), ','.join(substituents), ''.join("({})".format(c) for c in children))
+    return forms[residue.id]
+
+
+def canonical_form(glycan, exact=True):
+    '''
+    Write `glycan` as a string which is the same for every structure equal to it.
+
+    Parameters
+    ----------
+    glycan: |Glycan|
+    exact: bool, optional, defaults to |True|
+        If |True|, the form matches :meth:`Glycan.exact_ordering_equality`, otherwise it
+        matches :meth:`Glycan.topological_equality`
+
+    Returns
+    -------
+    str
+    '''
+    return residue_form(glycan.root, exact)
+
+
+def form_digest(form):
+    '''
+    Digest a string produced by :func:`canonical_form`
+
+    Returns
+    -------
+    str
+    '''
+    return hashlib.sha1(form).hexdigest()
+
+
+def canonical_hash(glycan, exact=True):
+    '''
+    A hexadecimal digest of :func:`canonical_form`, which is the same across processes
+    and platforms and may be stored.
+
+    Parameters
+    ----------
+    glycan: |Glycan|
+    exact: bool, optional, defaults to |True|
+
+    Returns
+    -------
+    str
+    '''
+    return form_digest(canonical_form(glycan, exact))
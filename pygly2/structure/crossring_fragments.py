@@ -2,6 +2,7 @@ import itertools
 
 from . import monosaccharide, constants
 from ..composition import Composition, structure_composition
+from ..utils import make_struct
 from ..utils.multimap import OrderedMultiMap
 
 RingType = constants.RingType
@@ -183,6 +184,90 @@ def crossring_fragments(monosaccharide, c1, c2, attach=True, copy=True):
     return a_fragment, x_fragment
 
 
+CrossRingTemplate = make_struct("CrossRingTemplate", ("c1", "c2", "kind", "composition", "contains"))
+'''
+The composition of one cross-ring fragment of a residue, and the backbone positions it
+contains, without any of the glycosidic bonds that would connect it to other residues.
+
+Created by :func:`make_struct`.
+
+Attributes
+----------
+c1, c2: |int|
+    The ring sites cleaved
+kind: |str|
+    Whether the fragment is reducing (X) or non-reducing (A)
+composition: |Composition|
+    The composition of the fragment and its substituents. The composition of the fragment
+    within a |Glycan| is this, less the losses of each glycosidic bond at a position in
+    :attr:`contains`
+contains: |frozenset|
+    The backbone positions included in the fragment
+'''
+
+_template_cache = {}
+
+
+def _composition_key(composition):
+    if composition is None:
+        return None
+    return frozenset(composition.items())
+
+
+def _substituent_signature(substituent):
+    return (substituent.name, hasattr(substituent, "_derivatize"), tuple(
+        (pos, link.child_position, _composition_key(link.parent_loss),
+         _composition_key(link.child_loss), _substituent_signature(link.child))
+        for pos, link in substituent.links.items() if not link.is_child(substituent)))
+
+
+def residue_signature(residue):
+    '''
+    Summarize the features of `residue` which determine the compositions of its cross-ring
+    fragments: its ring bounds, modifications, and substituents. Residues with the same
+    signature share their :class:`CrossRingTemplate` objects.
+
+    Returns
+    -------
+    tuple
+    '''
+    return (
+        residue.superclass.value, residue.ring_start, residue.ring_end,
+        tuple((pos, mod.name) for pos, mod in residue.modifications.items()),
+        tuple((pos, link.child_position, _composition_key(link.parent_loss),
+               _composition_key(link.child_loss), _substituent_signature(link.child))
+              for pos, link in residue.substituent_links.items()))
+
+
+def crossring_templates(residue):
+    '''
+    Get the :class:`CrossRingTemplate` of each cross-ring fragment of `residue`, for every pair
+    of sites from :func:`enumerate_cleavage_pairs`. These are computed once per
+    :func:`residue_signature` by cleaving a copy of `residue` without its glycosidic bonds.
+
+    Returns
+    -------
+    list of :class:`CrossRingTemplate`
+        The A and X fragment of each cleavage pair, in that order
+    '''
+    key = residue_signature(residue)
+    try:
+        return _template_cache[key]
+    except KeyError:
+        pass
+    ring_type = residue.ring_type
+    if ring_type is RingType.x or ring_type is RingType.open:
+        raise TypeError("Cannot cleave an open or unknown carbohydrate backbone")
+    isolated = residue.clone()
+    templates = []
+    for c1, c2 in enumerate_cleavage_pairs(isolated):
+        for fragment in crossring_fragments(isolated, c1, c2, attach=False, copy=False):
+            templates.append(CrossRingTemplate(
+                c1, c2, fragment.kind, fragment.total_composition(), frozenset(fragment.contains)))
+    _template_cache[key] = templates
+    return templates
+
+
 def enumerate_cleavage_pairs(residue):
     '''
     Enumerate all positions `residue` can be cross-ring cleaved at
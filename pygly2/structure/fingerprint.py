@@ -0,0 +1,278 @@
+'''
+Structural features of a |Glycan| which must be present in any structure that contains it.
+
+:func:`~pygly2.algorithms.subtree_search.topological_inclusion` matches each residue of a
+query to a residue of a target which has the same modifications and substituents, and
+the same superclass, stem and configuration unless the target leaves them unknown. Each
+residue is therefore summarized by a label which ignores its anomer, and whose
+superclass, stem and configuration are replaced by :data:`WILDCARD` when any of them are
+unknown. Every child of a query residue matches a child of the target residue, so the
+linkages and short downward paths of the query must also appear in the target.
+
+A query residue's label can be matched by a target residue with the same label or by
+one with its :func:`wildcard_label`. :func:`label_variants` produces every combination
+for a linkage or path.
+
+A :class:`Fingerprint` hashes these features into fixed-width bitsets, so that a structure
+which cannot contain another is usually rejected with a few bitwise operations.
+'''
+import itertools
+import zlib
+from binascii import hexlify, unhexlify
+from collections import Counter
+
+#: Stands for the superclass, stem and configuration of a residue where any are unknown
+WILDCARD = '*'
+#: The number of residues in each path produced by :func:`residue_paths`
+PATH_LENGTH = 3
+#: The number of bits in each section of a :class:`Fingerprint`
+FINGERPRINT_BITS = 1024
+#: Repeated residue and linkage labels set one bit per occurrence, up to this many
+MAX_OCCURRENCES = 8
+
+_PATH_SEPARATOR = '>'
+_HEAD_SEPARATOR = '/'
+
+
+def _is_unknown(value):
+    return value.value is None
+
+
+def residue_label(residue):
+    '''
+    Summarize the features of `residue` which a matching residue must share.
+
+    Parameters
+    ----------
+    residue: |Monosaccharide|
+
+    Returns
+    -------
+    str
+    '''
+    if (_is_unknown(residue.superclass) or _is_unknown(residue.stem[0]) or
+            _is_unknown(residue.configuration[0])):
+        head = WILDCARD
+    else:
+        head = "{}-{}-{}".format(
+            residue.superclass.name, ','.join(s.name for s in residue.stem),
+            ','.join(c.name for c in residue.configuration))
+    modifications = ','.join(sorted(mod.name for mod in residue.modifications.values()))
+    substituents = ','.join(sorted(sub.name for pos, sub in residue.substituents()))
+    return "{}{sep}{}{sep}{}".format(head, modifications, substituents, sep=_HEAD_SEPARATOR)
+
+
+def wildcard_label(label):
+    '''
+    The label of a residue like the one labeled `label` with an unknown superclass,
+    stem or configuration.
+    '''
+    return WILDCARD + label[label.index(_HEAD_SEPARATOR):]
+
+
+def label_variants(labels):
+    '''
+    Every joined label which could be matched by a target, given the `labels` of
+    a query residue, linkage or path.
+
+    Parameters
+    ----------
+    labels: sequence of str
+        The :func:`residue_label` of each residue, in order
+
+    Returns
+    -------
+    list of str
+    '''
+    options = []
+    for label in labels:
+        wild = wildcard_label(label)
+        options.append((label,) if label == wild else (label, wild))
+    return [_PATH_SEPARATOR.join(combination) for combination in itertools.product(*options)]
+
+
+def _labeled_nodes(glycan):
+    return {node.id: residue_label(node) for node in glycan}
+
+
+def residue_counts(glycan, labels=None):
+    '''
+    Count the residues of `glycan` with each :func:`residue_label`
+
+    Parameters
+    ----------
+    glycan: |Glycan|
+    labels: dict, optional
+        The label to use for each residue id, instead of its :func:`residue_label`
+
+    Returns
+    -------
+    :class:`collections.Counter`
+    '''
+    labels = labels or _labeled_nodes(glycan)
+    return Counter(labels[node.id] for node in glycan)
+
+
+def linkage_counts(glycan, labels=None):
+    '''
+    Count the parent-to-child linkages of `glycan` between each pair of residue labels,
+    regardless of position
+
+    Returns
+    -------
+    :class:`collections.Counter`
+    '''
+    labels = labels or _labeled_nodes(glycan)
+    return Counter(_PATH_SEPARATOR.join((labels[node.id], labels[child.id]))
+                   for node in glycan for pos, child in node.children())
+
+
+def residue_paths(glycan, length=PATH_LENGTH, labels=None):
+    '''
+    Collect the labels of every path of `length` residues leading away from the root
+    of `glycan`.
+
+    Returns
+    -------
+    set of str
+    '''
+    labels = labels or _labeled_nodes(glycan)
+    paths = set()
+    # Each entry is a node and the labels of up to `length - 1` of its nearest ancestors
+    stack = [(glycan.root, ())]
+    while stack:
+        node, ancestors = stack.pop()
+        path = ancestors + (labels[node.id],)
+        if len(path) == length:
+            paths.add(_PATH_SEPARATOR.join(path))
+            path = path[1:]
+        stack.extend((child, path) for pos, child in node.children())
+    return paths
+
+
+def _feature_bits(glycan, labels, bits):
+    value = 0
+    counted = (("r:", residue_counts(glycan, labels)), ("l:", linkage_counts(glycan, labels)))
+    for prefix, counts in counted:
+        for label, count in counts.items():
+            for occurrence in range(1, min(count, MAX_OCCURRENCES) + 1):
+                value |= _bit("{}{}#{}".format(prefix, label, occurrence), bits)
+    for path in residue_paths(glycan, labels=labels):
+        value |= _bit("p:" + path, bits)
+    return value
+
+
+def _bit(feature, bits):
+    return 1 << ((zlib.crc32(feature) & 0xffffffff) % bits)
+
+
+class Fingerprint(object):
+    '''
+    Fixed-width bitsets of the residue, linkage and path features of a |Glycan|, such that
+    if one structure is included in another, each bit set in the first is set in the second.
+
+    Attributes
+    ----------
+    coarse: int
+        The features computed from the :func:`wildcard_label` of each residue, which are
+        shared by any structure including this one
+    precise: int
+        The features computed from the :func:`residue_label` of each residue, which are
+        shared by any structure including this one that has no :attr:`wildcards`
+    wildcards: bool
+        Whether any residue has an unknown superclass, stem or configuration
+    bits: int
+        The width of :attr:`coarse` and :attr:`precise`
+    '''
+    __slots__ = ("coarse", "precise", "wildcards", "bits")
+
+    def __init__(self, coarse, precise, wildcards, bits=FINGERPRINT_BITS):
+        self.coarse = coarse
+        self.precise = precise
+        self.wildcards = wildcards
+        self.bits = bits
+
+    @classmethod
+    def from_glycan(cls, glycan, bits=FINGERPRINT_BITS):
+        '''
+        Compute the :class:`Fingerprint` of `glycan`. :meth:`Glycan.fingerprint` caches this.
+
+        Parameters
+        ----------
+        glycan: |Glycan|
+        bits: int, optional
+
+        Returns
+        -------
+        Fingerprint
+        '''
+        labels = _labeled_nodes(glycan)
+        coarse_labels = {key: wildcard_label(label) for key, label in labels.items()}
+        wildcards = any(label[0] == WILDCARD for label in labels.values())
+        return cls(_feature_bits(glycan, coarse_labels, bits), _feature_bits(glycan, labels, bits),
+                   wildcards, bits)
+
+    def screen(self, target):
+        '''
+        A necessary condition for the structure of `self` to be included in the
+        structure of `target`, as tested by :func:`~pygly2.algorithms.subtree_search.subtree_of`.
+
+        Parameters
+        ----------
+        target: Fingerprint
+
+        Returns
+        -------
+        bool:
+            |False| if the structure of `self` cannot be included in that of `target`
+        '''
+        if self.bits != target.bits:
+            raise ValueError("Cannot compare fingerprints of {} and {} bits".format(self.bits, target.bits))
+        if self.coarse & ~target.coarse:
+            return False
+        if target.wildcards:
+            return True
+        return not (self.precise & ~target.precise)
+
+    def to_bytes(self):
+        '''
+        Encode this fingerprint as a byte string of fixed length for storage
+
+        Returns
+        -------
+        bytes
+        '''
+        width = self.bits // 4
+        return chr(self.wildcards) + unhexlify("{:0{width}x}{:0{width}x}".format(
+            self.coarse, self.precise, width=width))
+
+    @classmethod
+    def from_bytes(cls, data):
+        '''
+        Decode a fingerprint written by :meth:`to_bytes`
+
+        Returns
+        -------
+        Fingerprint
+        '''
+        data = bytes(data)
+        size = (len(data) - 1) // 2
+        return cls(int(hexlify(data[1:1 + size]), 16), int(hexlify(data[1 + size:]), 16),
+                   bool(ord(data[0])), size * 8)
+
+    def __eq__(self, other):
+        return (self.coarse == other.coarse and self.precise == other.precise and
+                self.wildcards == other.wildcards and self.bits == other.bits)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __getstate__(self):
+        return (self.coarse, self.precise, self.wildcards, self.bits)
+
+    def __setstate__(self, state):
+        self.coarse, self.precise, self.wildcards, self.bits = state
+
+    def __repr__(self):  # pragma: no cover
+        return "<Fingerprint {} bits, {} set>".format(
+            self.bits, bin(self.coarse).count('1') + bin(self.precise).count('1'))
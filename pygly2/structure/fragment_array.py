@@ -0,0 +1,424 @@
+'''
+A columnar container for large collections of fragments.
+
+Each :class:`~.fragmentation.Fragment` holds its own :class:`str` and two :class:`list`
+objects, which dominates the memory used by a fragment library. :class:`FragmentArray`
+instead stores every fragment's mass in one NumPy array, encodes each fragment's kind as
+an index into a table of the distinct kinds, and concatenates the link and residue ids of
+all fragments into a single buffer each, located by an array of offsets. Individual
+fragments are materialized as :class:`~.fragmentation.Fragment` objects only when they
+are accessed.
+
+A collection of :class:`~.fragmentation.FragmentGroup` objects stores one row per
+group, and keeps the members of every group in a second :class:`FragmentArray`.
+'''
+from .fragmentation import Fragment, FragmentGroup
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def _require_numpy():
+    if np is None:  # pragma: no cover
+        raise ImportError("NumPy is required for FragmentArray")
+
+
+def _id_array(ids):
+    '''
+    Pack `ids` into the smallest integer array which holds them, falling back to an
+    object array for ids which do not fit in 64 bits, such as those of an unindexed |Glycan|.
+    '''
+    try:
+        values = np.array(ids, dtype=np.int64)
+    except OverflowError:
+        return np.array(ids, dtype=object)
+    if len(values) == 0:
+        return values.astype(np.int16)
+    low, high = values.min(), values.max()
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values
+
+
+class FragmentArray(object):
+    '''
+    A collection of fragments stored as parallel arrays.
+
+    Iterating over or indexing a :class:`FragmentArray` with an integer produces
+    :class:`~.fragmentation.Fragment` objects. Indexing with a :class:`slice`, an array
+    of indices, or a boolean mask produces a new :class:`FragmentArray`.
+
+    Attributes
+    ----------
+    kinds: |tuple|
+        The distinct :attr:`Fragment.kind` strings
+    kind_codes: :class:`numpy.ndarray`
+        The index into :attr:`kinds` of each fragment's kind
+    masses: :class:`numpy.ndarray`
+        The mass or `m/z` of each fragment
+    link_ids, node_ids: :class:`numpy.ndarray`
+        The concatenated :attr:`Fragment.link_ids` and :attr:`Fragment.included_nodes`
+        of every fragment
+    link_offsets, node_offsets: :class:`numpy.ndarray`
+        The start of each fragment's entries in :attr:`link_ids` and :attr:`node_ids`,
+        followed by the total length of the buffer
+    members: :class:`FragmentArray`
+        For a collection of groups, the members of every group, or |None|
+    member_offsets: :class:`numpy.ndarray`
+        For a collection of groups, the start of each group's entries in :attr:`members`,
+        followed by the number of members
+    '''
+
+    def __init__(self, kinds, kind_codes, masses, link_ids, link_offsets,
+                 node_ids, node_offsets, names=None, namer=None, members=None,
+                 member_offsets=None):
+        '''
+        Parameters
+        ----------
+        names: list, optional
+            The name of each fragment, or |None| for names not yet computed
+        namer: function, optional
+            Called with a :class:`~.fragmentation.Fragment` to compute a missing name,
+            as done by :meth:`Glycan.name_fragment`
+        members: FragmentArray, optional
+        member_offsets: sequence of int, optional
+        '''
+        _require_numpy()
+        self.kinds = tuple(kinds)
+        self.kind_codes = np.asarray(kind_codes, dtype=np.int32)
+        self.masses = np.asarray(masses, dtype=float)
+        self.link_ids = link_ids
+        self.link_offsets = _id_array(link_offsets)
+        self.node_ids = node_ids
+        self.node_offsets = _id_array(node_offsets)
+        self.names = [None] * len(self.masses) if names is None else list(names)
+        self.namer = namer
+        self.members = members
+        self.member_offsets = None if members is None else _id_array(member_offsets)
+        self._mass_order = None
+
+    @classmethod
+    def from_tuples(cls, fragments, namer=None):
+        '''
+        Build a :class:`FragmentArray` from an iterable of `(kind, link_ids, included_nodes, mass)`
+        tuples, as produced by :meth:`.FragmentationEngine.break_links`, or of
+        :class:`~.fragmentation.Fragment` objects.
+
+        Parameters
+        ----------
+        fragments: iterable
+        namer: function, optional
+            Used to compute the name of each fragment when it is first requested
+
+        Returns
+        -------
+        FragmentArray
+        '''
+        kind_index = {}
+        kinds = []
+        kind_codes = []
+        masses = []
+        link_ids = []
+        link_offsets = [0]
+        node_ids = []
+        node_offsets = [0]
+        for fragment in fragments:
+            kind, links, nodes, mass = fragment[0], fragment[1], fragment[2], fragment[3]
+            try:
+                code = kind_index[kind]
+            except KeyError:
+                code = kind_index[kind] = len(kinds)
+                kinds.append(kind)
+            kind_codes.append(code)
+            masses.append(mass)
+            link_ids.extend(links)
+            link_offsets.append(len(link_ids))
+            node_ids.extend(nodes)
+            node_offsets.append(len(node_ids))
+        return cls(kinds, kind_codes, masses, _id_array(link_ids), link_offsets,
+                   _id_array(node_ids), node_offsets, namer=namer)
+
+    @classmethod
+    def from_groups(cls, groups, namer=None):
+        '''
+        Build a :class:`FragmentArray` from :class:`~.fragmentation.FragmentGroup` objects,
+        such as those produced by :func:`~.fragmentation.group_by_composition`. Each group
+        is stored as its first member.
+
+        Parameters
+        ----------
+        groups: iterable
+        namer: function, optional
+            Used to compute the name of each fragment when it is first requested
+
+        Returns
+        -------
+        FragmentArray
+        '''
+        groups = list(groups)
+        members = []
+        member_offsets = [0]
+        for group in groups:
+            members.extend(group.members)
+            member_offsets.append(len(members))
+        inst = cls.from_tuples([group.members[0] for group in groups], namer=namer)
+        inst.members = cls.from_tuples(members, namer=namer)
+        inst.member_offsets = _id_array(member_offsets)
+        return inst
+
+    @classmethod
+    def from_fragments(cls, fragments):
+        '''
+        Build a :class:`FragmentArray` from :class:`~.fragmentation.Fragment` objects,
+        keeping their names.
+
+        Returns
+        -------
+        FragmentArray
+        '''
+        fragments = list(fragments)
+        inst = cls.from_tuples(fragments)
+        inst.names = [f.name for f in fragments]
+        return inst
+
+    def __len__(self):
+        return len(self.masses)
+
+    def kind(self, i):
+        return self.kinds[self.kind_codes[i]]
+
+    def fragment_link_ids(self, i):
+        return self.link_ids[self.link_offsets[i]:self.link_offsets[i + 1]]
+
+    def fragment_node_ids(self, i):
+        return self.node_ids[self.node_offsets[i]:self.node_offsets[i + 1]]
+
+    @property
+    def is_grouped(self):
+        return self.members is not None
+
+    def group_size(self, i):
+        '''
+        The number of members of the `i`th group, or 1 if this is not a collection of groups
+        '''
+        if self.members is None:
+            return 1
+        return int(self.member_offsets[i + 1] - self.member_offsets[i])
+
+    def member_names(self, i):
+        '''
+        The names of the members of the `i`th group, or the name of the `i`th
+        fragment if this is not a collection of groups
+        '''
+        if self.members is None:
+            return [self.name(i)]
+        return [self.members.name(j)
+                for j in range(self.member_offsets[i], self.member_offsets[i + 1])]
+
+    def name(self, i):
+        '''
+        The name of the `i`th fragment, computing it with :attr:`namer` if needed
+        '''
+        name = self.names[i]
+        if name is None and self.namer is not None:
+            name = self.names[i] = self.namer(self._view(i, None))
+        return name
+
+    def _view(self, i, name):
+        return Fragment(
+            self.kind(i), self.fragment_link_ids(i).tolist(), self.fragment_node_ids(i).tolist(),
+            float(self.masses[i]), name)
+
+    def _name_callback(self, i):
+        return lambda fragment: self.name(i)
+
+    def fragment(self, i):
+        '''
+        Materialize the `i`th fragment, or the `i`th group for a collection of groups.
+
+        Returns
+        -------
+        :class:`~.fragmentation.Fragment` or :class:`~.fragmentation.FragmentGroup`
+        '''
+        if self.members is not None:
+            return FragmentGroup([self.members.fragment(j) for j in range(
+                self.member_offsets[i], self.member_offsets[i + 1])])
+        name = self.names[i]
+        view = self._view(i, name)
+        if name is None and self.namer is not None:
+            view._namer = self._name_callback(i)
+        return view
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.fragment(i)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, long, np.integer)):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError(index)
+            return self.fragment(index)
+        elif isinstance(index, slice):
+            index = np.arange(len(self))[index]
+        return self.take(index)
+
+    def take(self, indices):
+        '''
+        Select the fragments at `indices`, or where a boolean mask is |True|.
+
+        Returns
+        -------
+        FragmentArray
+        '''
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        indices = indices.astype(np.int64)
+        link_ids, link_offsets = self._take_ragged(self.link_ids, self.link_offsets, indices)
+        node_ids, node_offsets = self._take_ragged(self.node_ids, self.node_offsets, indices)
+        names = [self.names[i] for i in indices]
+        members = member_offsets = None
+        if self.members is not None:
+            positions, member_offsets = self._take_ragged(
+                np.arange(len(self.members)), self.member_offsets, indices)
+            members = self.members.take(positions)
+        return FragmentArray(self.kinds, self.kind_codes[indices], self.masses[indices],
+                             link_ids, link_offsets, node_ids, node_offsets,
+                             names=names, namer=self.namer, members=members,
+                             member_offsets=member_offsets)
+
+    @staticmethod
+    def _take_ragged(values, offsets, indices):
+        starts = offsets[indices]
+        lengths = offsets[indices + 1] - starts
+        new_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=new_offsets[1:])
+        # The position of each selected value within `values`
+        positions = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+        return values[positions], new_offsets
+
+    # Mass-ordered Access
+
+    @property
+    def mass_order(self):
+        '''
+        The indices which sort :attr:`masses` in ascending order
+        '''
+        if self._mass_order is None:
+            self._mass_order = np.argsort(self.masses, kind='mergesort')
+        return self._mass_order
+
+    def sorted_by_mass(self):
+        '''
+        Returns
+        -------
+        FragmentArray:
+            These fragments in ascending order of mass
+        '''
+        result = self.take(self.mass_order)
+        result._mass_order = np.arange(len(result))
+        return result
+
+    def between(self, low, high):
+        '''
+        Select the fragments whose mass lies in the closed interval [`low`, `high`].
+
+        Returns
+        -------
+        FragmentArray:
+            The selected fragments in ascending order of mass
+        '''
+        order = self.mass_order
+        sorted_masses = self.masses[order]
+        start = np.searchsorted(sorted_masses, low, side='left')
+        end = np.searchsorted(sorted_masses, high, side='right')
+        return self.take(order[start:end])
+
+    # Serialization
+
+    def _compute_names(self):
+        if self.namer is not None:
+            for i in range(len(self)):
+                self.name(i)
+        if self.members is not None:
+            self.members._compute_names()
+
+    def __getstate__(self):
+        self._compute_names()
+        return {
+            "kinds": self.kinds, "kind_codes": self.kind_codes, "masses": self.masses,
+            "link_ids": self.link_ids, "link_offsets": self.link_offsets,
+            "node_ids": self.node_ids, "node_offsets": self.node_offsets,
+            "names": self.names, "members": self.members, "member_offsets": self.member_offsets
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def save(self, path):
+        '''
+        Write this collection to `path` in NumPy's ``.npz`` format. Names are
+        computed before saving.
+
+        Parameters
+        ----------
+        path: str or file
+        '''
+        self._compute_names()
+        np.savez(path, **self._arrays())
+
+    def _arrays(self, prefix=""):
+        arrays = {
+            "kinds": np.array(self.kinds, dtype=object), "kind_codes": self.kind_codes,
+            "masses": self.masses, "link_ids": self.link_ids, "link_offsets": self.link_offsets,
+            "node_ids": self.node_ids, "node_offsets": self.node_offsets,
+            "names": np.array(self.names, dtype=object)
+        }
+        if self.members is not None:
+            arrays["member_offsets"] = self.member_offsets
+            arrays.update(self.members._arrays("member_"))
+        return {prefix + key: value for key, value in arrays.items()}
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Read a collection written by :meth:`save`
+
+        Returns
+        -------
+        FragmentArray
+        '''
+        return cls._from_arrays(np.load(path, allow_pickle=True))
+
+    @classmethod
+    def _from_arrays(cls, data, prefix=""):
+        members = member_offsets = None
+        if prefix + "member_offsets" in data:
+            member_offsets = data[prefix + "member_offsets"]
+            members = cls._from_arrays(data, prefix + "member_")
+        return cls(
+            data[prefix + "kinds"].tolist(), data[prefix + "kind_codes"], data[prefix + "masses"],
+            data[prefix + "link_ids"], data[prefix + "link_offsets"],
+            data[prefix + "node_ids"], data[prefix + "node_offsets"],
+            names=data[prefix + "names"].tolist(), members=members,
+            member_offsets=member_offsets)
+
+    @property
+    def nbytes(self):
+        '''
+        The number of bytes used by the arrays of this collection, excluding names
+        '''
+        total = sum(a.nbytes for a in (self.kind_codes, self.masses, self.link_ids,
+                                       self.link_offsets, self.node_ids, self.node_offsets))
+        if self.members is not None:
+            total += self.member_offsets.nbytes + self.members.nbytes
+        return total
+
+    def __repr__(self):  # pragma: no cover
+        return "<FragmentArray {} fragments>".format(len(self))
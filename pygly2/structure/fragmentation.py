@@ -0,0 +1,611 @@
+'''
+Non-mutating enumeration of glycosidic fragments.
+
+:meth:`Glycan.break_links` generates fragments by physically breaking each
+|Link| in the graph, recursing into each of the disjoint subtrees, and then
+re-applying the links. This is expensive, and for more than one cleavage it visits
+each set of broken bonds once per permutation of the bonds.
+
+:class:`FragmentationEngine` instead traverses the graph once, storing the
+depth-first order of the residues so that every subtree is a contiguous range of
+that order. The mass of every subtree and of every bond's losses is precomputed,
+so the mass of a fragment is a handful of additions, and the structure is never
+modified. Cross-ring fragments are priced the same way, using the composition of each
+cleaved residue from :func:`~.crossring_fragments.crossring_templates`.
+
+When fragments are grouped by composition, the same bookkeeping is done with
+compositions instead of masses, and :func:`group_by_composition` merges every
+fragment with the same composition into one :class:`FragmentGroup`.
+'''
+import itertools
+import re
+from collections import OrderedDict
+
+from ..composition import Composition, calculate_mass
+from ..composition.acomposition import AComposition
+from ..utils import make_struct
+from .link import default_parent_loss, default_child_loss
+from .constants import RingType
+from .crossring_fragments import crossring_templates
+
+fragment_shift = {
+    "B": Composition(O=1, H=2),
+    "Y": Composition(),
+    "C": Composition(),
+    "Z": Composition(H=2, O=1),
+}
+
+#: The fragment types which are produced on either side of a glycosidic bond
+reducing_end_kinds = "YZ"
+non_reducing_end_kinds = "BC"
+#: The fragment types which are produced by cleaving across a residue's ring
+crossring_kinds = "AX"
+
+#: Splits a fragment's :attr:`kind` into the ring coordinates and ion type of each cleavage
+ion_type_pattern = re.compile(r"(\d+,\d+)?(\S)")
+
+
+_FragmentBase = make_struct(
+    "Fragment", ("kind", "link_ids", "included_nodes", "mass", "name"))
+_fragment_name_slot = _FragmentBase.name
+
+
+class Fragment(_FragmentBase):
+    '''
+    A simple container for a fragment ion, produced by :meth:`Glycan.fragments`
+
+    Based on a structure created by :func:`make_struct`. If :attr:`name` is |None|
+    and a `namer` function was given, the name is computed by calling it with the
+    fragment the first time :attr:`name` is read.
+
+    Attributes
+    ----------
+    kind: |str|
+        One of A, B, C, X, Y, or Z for each link broken or ring cleaved
+
+    link_ids: |list| of |int|
+        The :attr:`id` value of each link cleaved.
+
+    included_nodes: |list| of |int|
+        The :attr:`id` value of each |Monosaccharide| contained in the fragment
+
+    mass: |float|
+        The mass or `m/z` of the fragment.
+
+    name: |str|
+        The name of the fragment, as given by :meth:`Glycan.name_fragment`
+
+    See Also
+    --------
+    :meth:`Glycan.fragments`
+    :func:`.make_struct`
+    '''
+    __slots__ = ("_namer",)
+
+    def __init__(self, kind, link_ids, included_nodes, mass, name=None, namer=None):
+        self._namer = namer
+        _FragmentBase.__init__(self, kind, link_ids, included_nodes, mass, name)
+
+    @property
+    def name(self):
+        name = _fragment_name_slot.__get__(self, Fragment)
+        if name is None and self._namer is not None:
+            namer = self._namer
+            self._namer = None
+            name = namer(self)
+            _fragment_name_slot.__set__(self, name)
+        return name
+
+    @name.setter
+    def name(self, value):
+        _fragment_name_slot.__set__(self, value)
+
+    def __setstate__(self, state):
+        self._namer = None
+        _FragmentBase.__setstate__(self, state)
+
+
+class FragmentGroup(Fragment):
+    '''
+    A set of fragments with the same composition, and so the same mass, produced by
+    :meth:`Glycan.fragments` with ``group_by="composition"``.
+
+    The :attr:`kind`, :attr:`link_ids`, :attr:`included_nodes`, :attr:`mass`, and
+    :attr:`name` of the group are those of its first member.
+
+    Attributes
+    ----------
+    members: |list| of :class:`Fragment`
+        Every fragment with this composition, in the order they were generated
+    composition: :class:`~pygly2.composition.acomposition.AComposition`
+        The neutral composition shared by the members
+    '''
+    __slots__ = ("members", "composition")
+
+    def __init__(self, members, composition=None):
+        first = members[0]
+        Fragment.__init__(self, first.kind, first.link_ids, first.included_nodes, first.mass)
+        self.members = members
+        self.composition = composition
+
+    @property
+    def name(self):
+        name = _fragment_name_slot.__get__(self, FragmentGroup)
+        if name is None:
+            name = self.members[0].name
+        return name
+
+    @name.setter
+    def name(self, value):
+        _fragment_name_slot.__set__(self, value)
+
+    @property
+    def names(self):
+        '''
+        The name of each member of the group
+        '''
+        return [member.name for member in self.members]
+
+    def __len__(self):
+        return len(self.members)
+
+    def __getstate__(self):
+        return (self.members, self.composition)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __repr__(self):
+        return "<FragmentGroup {} mass={}>".format(self.names, self.mass)
+
+
+def fragment_key(kind, link_ids, included_nodes):
+    '''
+    Identify a fragment by the cleavage at each link and the residues it contains,
+    regardless of the order in which its links were broken.
+
+    Returns
+    -------
+    tuple
+    '''
+    cleavages = [''.join(token) for token in ion_type_pattern.findall(kind)]
+    if len(cleavages) == len(link_ids):
+        cleavages = tuple(sorted(zip(link_ids, cleavages)))
+    else:
+        cleavages = (tuple(sorted(link_ids)), tuple(sorted(cleavages)))
+    return cleavages, frozenset(included_nodes)
+
+
+def unique_fragments(fragments):
+    '''
+    Drop repeated fragments from `fragments`, an iterable of `(kind, link_ids, included_nodes, mass, ...)`
+    tuples, keeping the first instance of each as identified by :func:`fragment_key`.
+    '''
+    seen = set()
+    for fragment in fragments:
+        key = fragment_key(fragment[0], fragment[1], fragment[2])
+        if key in seen:
+            continue
+        seen.add(key)
+        yield fragment
+
+
+def group_by_composition(fragments, namer=None):
+    '''
+    Merge the fragments of `fragments`, an iterable of `(kind, link_ids, included_nodes, mass, composition)`
+    tuples as produced by :meth:`FragmentationEngine.break_links` with ``compositions=True``, which
+    share a composition.
+
+    Parameters
+    ----------
+    fragments: iterable
+    namer: function, optional
+        Used to compute the name of each member when it is first requested
+
+    Returns
+    -------
+    list of :class:`FragmentGroup`
+        In the order each composition was first seen
+    '''
+    groups = OrderedDict()
+    for kind, link_ids, included_nodes, mass, composition in fragments:
+        member = Fragment(kind, link_ids, included_nodes, mass, None, namer)
+        key = frozenset(composition.items())
+        try:
+            groups[key][0].append(member)
+        except KeyError:
+            groups[key] = ([member], composition)
+    return [FragmentGroup(members, composition) for members, composition in groups.values()]
+
+
+class FragmentationEngine(object):
+    '''
+    Enumerates the B, C, Y, and Z fragments of a |Glycan| from a single traversal
+    of its graph, and the A and X fragments produced by a single cleavage.
+
+    Attributes
+    ----------
+    glycan: |Glycan|
+        The structure being fragmented. It is not modified.
+    nodes: |list|
+        The |Monosaccharide| objects of :attr:`glycan` in depth-first order
+    parent_links: |list|
+        The |Link| connecting each entry of :attr:`nodes` to its parent, or |None|
+        for the root
+    parent_index: |list|
+        The index into :attr:`nodes` of the parent of each node, or -1 for the root
+    subtree_end: |list|
+        The index into :attr:`nodes` one past the last descendant of each node
+    '''
+
+    def __init__(self, glycan, average=False, charge=0, mass_data=None, visited=None):
+        '''
+        Parameters
+        ----------
+        glycan: |Glycan|
+            The structure to fragment
+        average: bool, optional, defaults to `False`
+            Whether or not to use the average isotopic composition when calculating masses.
+        charge: int, optional, defaults to 0
+            If charge is non-zero, m/z is calculated, where m is the theoretical mass, and z is `charge`
+        mass_data: dict, optional, defaults to `None`
+            If mass_data is |None|, standard NIST mass and isotopic abundance data are used.
+        visited: set, optional
+            A set of link ids which should never be broken
+        '''
+        self.glycan = glycan
+        self.average = average
+        self.charge = charge
+        self.mass_data = mass_data
+        self.visited = set() if visited is None else set(visited)
+
+        self.nodes = []
+        self.parent_links = []
+        self.parent_index = []
+        self.subtree_end = []
+
+        self._node_mass_prefix = [0.0]
+        self._parent_loss_mass = []
+        self._child_loss_mass = []
+        self._template_mass = {}
+        self._node_composition_prefix = None
+        self._shift_mass = {k: self._calc_mass(v) for k, v in fragment_shift.items()}
+        self._proton_mass = calculate_mass(
+            Composition({"H+": 1}), mass_data=mass_data, average=average)
+
+        self._traverse()
+
+    def _calc_mass(self, composition):
+        return calculate_mass(composition, average=self.average, mass_data=self.mass_data)
+
+    def _traverse(self):
+        '''
+        Visit each node of :attr:`glycan` in the same order as :meth:`Glycan.dfs`, recording
+        the link to its parent, its mass, and the extent of its subtree.
+        '''
+        sort_predicate = lambda x: x[0].order()
+        parent_index = self.parent_index
+        node_stack = [(self.glycan.root, None, -1)]
+        seen = set()
+        while len(node_stack) > 0:
+            node, parent_link, parent_ix = node_stack.pop()
+            seen.add(node.id)
+            ix = len(self.nodes)
+            self.nodes.append(node)
+            self.parent_links.append(parent_link)
+            parent_index.append(parent_ix)
+            self._node_mass_prefix.append(
+                self._node_mass_prefix[-1] + node.mass(
+                    average=self.average, mass_data=self.mass_data))
+            if parent_link is None:
+                self._parent_loss_mass.append(0.0)
+                self._child_loss_mass.append(0.0)
+            else:
+                self._parent_loss_mass.append(
+                    self._calc_mass(parent_link.parent_loss or default_parent_loss))
+                self._child_loss_mass.append(
+                    self._calc_mass(parent_link.child_loss or default_child_loss))
+            node_stack.extend(sorted(((terminal, link, ix) for pos, link in node.links.items()
+                                      for terminal in link if terminal.id not in seen), key=sort_predicate))
+
+        size = [1] * len(self.nodes)
+        for ix in range(len(self.nodes) - 1, 0, -1):
+            size[parent_index[ix]] += size[ix]
+        self.subtree_end = [ix + size[ix] for ix in range(len(self.nodes))]
+
+    def subtree_mass(self, ix):
+        '''
+        The mass of the intact subtree rooted at ``self.nodes[ix]``, with all of the losses
+        of its internal bonds applied.
+
+        Returns
+        -------
+        float
+        '''
+        return self._node_mass_prefix[self.subtree_end[ix]] - self._node_mass_prefix[ix]
+
+    def is_cleavable(self, ix):
+        '''
+        Whether the link connecting ``self.nodes[ix]`` to its parent may be broken
+        '''
+        link = self.parent_links[ix]
+        return link is not None and link.id not in self.visited
+
+    def _lower_cuts(self, start, stop, n_cuts):
+        '''
+        Generate every set of `n_cuts` nodes in ``[start, stop)`` whose parent links can be
+        broken and none of which lie beneath another, each given as a list of node indices.
+        '''
+        if n_cuts == 0:
+            yield []
+            return
+        for ix in range(start, stop):
+            if not self.is_cleavable(ix):
+                continue
+            for rest in self._lower_cuts(self.subtree_end[ix], stop, n_cuts - 1):
+                yield [ix] + rest
+
+    def pieces(self, n_links):
+        '''
+        Generate every connected piece of the graph bounded by exactly `n_links` broken links.
+
+        Yields
+        ------
+        top: int
+            The index of the node closest to the reducing end in the piece
+        lower_cuts: list
+            The indices of the nodes whose parent link was broken beneath `top`
+        '''
+        for top in range(len(self.nodes)):
+            if top == 0:
+                n_lower = n_links
+            elif self.is_cleavable(top):
+                n_lower = n_links - 1
+            else:
+                continue
+            if n_lower < 0:
+                continue
+            for lower_cuts in self._lower_cuts(top + 1, self.subtree_end[top], n_lower):
+                yield top, lower_cuts
+
+    def included_nodes(self, top, lower_cuts):
+        '''
+        The :attr:`id` of each node in the piece described by `top` and `lower_cuts`
+        '''
+        include = []
+        ix = top
+        stop = self.subtree_end[top]
+        cuts = iter(lower_cuts)
+        next_cut = next(cuts, stop)
+        while ix < stop:
+            if ix == next_cut:
+                ix = self.subtree_end[ix]
+                next_cut = next(cuts, stop)
+                continue
+            include.append(self.nodes[ix].id)
+            ix += 1
+        return include
+
+    def piece_mass(self, top, lower_cuts):
+        '''
+        The neutral mass of the piece described by `top` and `lower_cuts`, with the losses
+        of each broken bond returned to the residues on either side of it.
+        '''
+        mass = self.subtree_mass(top) + self._child_loss_mass[top]
+        for ix in lower_cuts:
+            mass += self._parent_loss_mass[ix] - self.subtree_mass(ix)
+        return mass
+
+    # Composition Tracking
+
+    def _build_compositions(self):
+        '''
+        Compute the compositions mirroring the masses recorded by :meth:`_traverse`. This
+        is only done when compositions are requested.
+        '''
+        if self._node_composition_prefix is not None:
+            return
+        prefix = [AComposition()]
+        parent_loss = []
+        child_loss = []
+        for node, link in zip(self.nodes, self.parent_links):
+            prefix.append(prefix[-1] + node.total_composition())
+            if link is None:
+                parent_loss.append(AComposition())
+                child_loss.append(AComposition())
+            else:
+                parent_loss.append(AComposition(link.parent_loss or default_parent_loss))
+                child_loss.append(AComposition(link.child_loss or default_child_loss))
+        self._parent_loss_composition = parent_loss
+        self._child_loss_composition = child_loss
+        self._shift_composition = {k: AComposition(v) for k, v in fragment_shift.items()}
+        self._template_composition = {}
+        self._node_composition_prefix = prefix
+
+    def subtree_composition(self, ix):
+        '''
+        The composition of the intact subtree rooted at ``self.nodes[ix]``, as for
+        :meth:`subtree_mass`
+
+        Returns
+        -------
+        :class:`~pygly2.composition.acomposition.AComposition`
+        '''
+        self._build_compositions()
+        prefix = self._node_composition_prefix
+        return prefix[self.subtree_end[ix]] - prefix[ix]
+
+    def piece_composition(self, top, lower_cuts):
+        '''
+        The composition of the piece described by `top` and `lower_cuts`, as for
+        :meth:`piece_mass`
+
+        Returns
+        -------
+        :class:`~pygly2.composition.acomposition.AComposition`
+        '''
+        composition = self.subtree_composition(top) + self._child_loss_composition[top]
+        for ix in lower_cuts:
+            composition += self._parent_loss_composition[ix] - self.subtree_composition(ix)
+        return composition
+
+    def break_links(self, n_links=1, kind=('B', 'Y'), compositions=False):
+        '''
+        Generate all `kind` fragments produced by breaking exactly `n_links` glycosidic bonds.
+
+        A and X fragments are only generated when `n_links` is 1, by :meth:`crossring_cleavages`.
+
+        Parameters
+        ----------
+        n_links: int
+        kind: sequence of str
+        compositions: bool, optional, defaults to `False`
+            Whether to also yield the neutral composition of each fragment
+
+        Yields
+        ------
+            ion_type: str
+                The string identifying the types of cleavages involved in creating this fragment,
+                one character per entry of `link_ids`
+            link_ids: list
+                A list of the link ids broken to create this fragment, in ascending order
+            include: list
+                A list of the |Monosaccharide| id values included in this fragment
+            mass: float
+                The mass or m/z of the fragment
+            composition: :class:`~pygly2.composition.acomposition.AComposition`
+                Only if `compositions` is |True|
+        '''
+        if n_links < 1:
+            return
+        kind = set(kind)
+        upper_kinds = sorted(kind & set(non_reducing_end_kinds))
+        lower_kinds = sorted(kind & set(reducing_end_kinds))
+        charge = self.charge
+        for top, lower_cuts in self.pieces(n_links):
+            cuts = [(self.parent_links[ix].id, lower_kinds) for ix in lower_cuts]
+            if top != 0:
+                cuts.append((self.parent_links[top].id, upper_kinds))
+            cuts.sort()
+            link_ids = [link_id for link_id, options in cuts]
+            include = self.included_nodes(top, lower_cuts)
+            base_mass = self.piece_mass(top, lower_cuts)
+            if compositions:
+                base_composition = self.piece_composition(top, lower_cuts)
+            for ion_types in itertools.product(*[options for link_id, options in cuts]):
+                mass = base_mass - sum(self._shift_mass[k] for k in ion_types)
+                if charge != 0:
+                    mass = (mass + charge * self._proton_mass) / charge
+                if compositions:
+                    composition = base_composition.clone()
+                    for k in ion_types:
+                        composition -= self._shift_composition[k]
+                    yield ''.join(ion_types), list(link_ids), list(include), mass, composition
+                else:
+                    yield ''.join(ion_types), list(link_ids), list(include), mass
+        if n_links == 1 and kind & set(crossring_kinds):
+            for fragment in self.crossring_cleavages(kind, compositions):
+                yield fragment
+
+    def _crossring_template_mass(self, template):
+        key = id(template.composition)
+        try:
+            return self._template_mass[key][1]
+        except KeyError:
+            # Hold a reference to the composition so its id is not reused
+            mass = self._calc_mass(template.composition)
+            self._template_mass[key] = (template.composition, mass)
+            return mass
+
+    def _crossring_template_composition(self, template):
+        key = id(template.composition)
+        try:
+            return self._template_composition[key][1]
+        except KeyError:
+            composition = AComposition(template.composition)
+            self._template_composition[key] = (template.composition, composition)
+            return composition
+
+    def crossring_cleavages(self, kind=crossring_kinds, compositions=False):
+        '''
+        Generate the A and X fragments of each residue whose parent link may be broken,
+        which include at least one residue besides the cleaved one.
+
+        The mass of each fragment is the mass of the cleaved residue's
+        :class:`~.crossring_fragments.CrossRingTemplate`, less the losses of the
+        glycosidic bonds at the positions it contains, plus the mass of the part of the
+        graph attached through each of those bonds.
+
+        Yields
+        ------
+            ion_type: str
+                The cleavage sites and fragment type, e.g. ``"0,2A"``
+            link_ids: list
+                The :attr:`id` of the cleaved residue
+            include: list
+                A list of the |Monosaccharide| id values included in this fragment
+            mass: float
+                The mass or m/z of the fragment
+            composition: :class:`~pygly2.composition.acomposition.AComposition`
+                Only if `compositions` is |True|
+        '''
+        kind = set(kind) & set(crossring_kinds)
+        if not kind:
+            return
+        n = len(self.nodes)
+        children = [[] for i in range(n)]
+        for ix in range(1, n):
+            children[self.parent_index[ix]].append(ix)
+        total_mass = self.subtree_mass(0)
+        if compositions:
+            total_composition = self.subtree_composition(0)
+        charge = self.charge
+        for ix in range(1, n):
+            if not self.is_cleavable(ix):
+                continue
+            residue = self.nodes[ix]
+            ring_type = residue.ring_type
+            if ring_type is RingType.x or ring_type is RingType.open:
+                continue
+            parent_link = self.parent_links[ix]
+            # Each bond is described by its position on the cleaved residue, the loss it
+            # imposes on the cleaved residue, and the range of nodes on its far side
+            bonds = [(parent_link.child_position, self._child_loss_mass[ix],
+                      total_mass - self.subtree_mass(ix), (0, ix), (self.subtree_end[ix], n))]
+            for jx in children[ix]:
+                end = self.subtree_end[jx]
+                bonds.append((self.parent_links[jx].parent_position, self._parent_loss_mass[jx],
+                              self.subtree_mass(jx), (jx, end)))
+            if compositions:
+                # The composition each bond adds to a fragment containing it, parallel to `bonds`
+                bond_compositions = [
+                    total_composition - self.subtree_composition(ix) -
+                    self._child_loss_composition[ix]]
+                bond_compositions.extend(
+                    self.subtree_composition(jx) - self._parent_loss_composition[jx]
+                    for jx in children[ix])
+            for template in crossring_templates(residue):
+                if template.kind not in kind:
+                    continue
+                attached = [i for i, bond in enumerate(bonds) if bond[0] in template.contains]
+                if not attached:
+                    continue
+                mass = self._crossring_template_mass(template)
+                spans = []
+                for i in attached:
+                    bond = bonds[i]
+                    mass += bond[2] - bond[1]
+                    spans.extend(bond[3:])
+                spans.append((ix, ix + 1))
+                spans.sort()
+                include = [self.nodes[i].id for start, stop in spans for i in range(start, stop)]
+                if charge != 0:
+                    mass = (mass + charge * self._proton_mass) / charge
+                ion_type = '{},{}{}'.format(template.c1, template.c2, template.kind)
+                if compositions:
+                    composition = self._crossring_template_composition(template).clone()
+                    for i in attached:
+                        composition += bond_compositions[i]
+                    yield ion_type, [residue.id], include, mass, composition
+                else:
+                    yield ion_type, [residue.id], include, mass
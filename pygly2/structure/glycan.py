@@ -6,23 +6,23 @@ from functools import partial
 from collections import deque, defaultdict, Callable
 from uuid import uuid4
 
-from .base import SaccharideBase
+from .base import SaccharideBase, VersionCache
 from .constants import RingType
 from .monosaccharide import Monosaccharide, graph_clone, toggle as residue_toggle
+from .link import Link
 from .crossring_fragments import enumerate_cleavage_pairs, crossring_fragments
+from .fragmentation import (
+    FragmentationEngine, Fragment, fragment_shift, ion_type_pattern, unique_fragments,
+    group_by_composition)
+from .fragment_array import FragmentArray
+from . import canonical
+from .fingerprint import Fingerprint, FINGERPRINT_BITS
 from ..utils import make_counter, identity, StringIO, chrinc, make_struct
 from ..composition import Composition
 
 methodcaller = operator.methodcaller
 logger = logging.getLogger("Glycan")
 
-fragment_shift = {
-    "B": Composition(O=1, H=2),
-    "Y": Composition(),
-    "C": Composition(),
-    "Z": Composition(H=2, O=1),
-}
-
 fragment_direction = {
     "A": -1,
     "B": -1,
@@ -34,34 +34,6 @@ fragment_direction = {
 
 MAIN_BRANCH_SYM = '-'
 
-Fragment = make_struct(
-    "Fragment", ("kind", "link_ids", "included_nodes", "mass", "name"))
-'''
-A simple container for a fragment ion, produced by :meth:`Glycan.fragments`
-
-Created by :func:`make_struct`.
-
-Attributes
-----------
-kind: |str|
-    One of A, B, C, X, Y, or Z for each link broken or ring cleaved
-
-link_ids: |list| of |int|
-    The :attr:`id` value of each link cleaved.
-
-included_nodes: |list| of |int|
-    The :attr:`id` value of each |Monosaccharide| contained in the fragment
-
-mass: |float|
-    The mass or `m/z` of the fragment.
-
-See Also
---------
-:meth:`Glycan.fragments`
-:func:`.make_struct`
-'''
-
-
 DisjointTrees = make_struct("DisjointTrees", ("parent_tree", "parent_include_nodes",
                                               "child_tree", "child_include_nodes", "link_ids"))
 
@@ -100,7 +72,7 @@ def fragment_to_substructure(fragment, tree):
     """
     # Align the fragment locations with their id values.
     # Be aware that cross-ring cleavages are labeled differently.
-    ion_types = re.findall(r"(\d+,\d+)?(\S)", fragment.kind)
+    ion_types = ion_type_pattern.findall(fragment.kind)
     links_broken = fragment.link_ids
 
     pairings = zip(ion_types, links_broken)
@@ -162,6 +134,10 @@ class Glycan(SaccharideBase):
         The index of the reducing end on :attr:`root`.
     branch_lengths: |dict|
         A dictionary mapping branch symbols to their lengths
+    link_labels: |dict|
+        A dictionary mapping each |Link| :attr:`id` to its branch label
+    parent_links: |dict|
+        A dictionary mapping each |Monosaccharide| :attr:`id` to the |Link| to its parent
     '''
 
     @classmethod
@@ -187,10 +163,13 @@ class Glycan(SaccharideBase):
         '''
         if root is None:
             root = Monosaccharide()
+        self._cache = VersionCache()
         self.root = root
         self.index = []
         self.link_index = []
         self.branch_lengths = {}
+        self.link_labels = None
+        self.parent_links = None
         if index_method is not None:
             self.reindex(index_method)
 
@@ -278,6 +257,18 @@ class Glycan(SaccharideBase):
     @root.setter
     def root(self, value):
         self._root = value
+        self._cache.clear()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_cache", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault("link_labels", None)
+        self.__dict__.setdefault("parent_links", None)
+        self._cache = VersionCache()
 
     @property
     def reducing_end(self):
@@ -564,6 +555,16 @@ class Glycan(SaccharideBase):
                         new_label_key, self.branch_lengths[new_label_key])
                     link.label = label
         self.branch_lengths["-"] = max(self.branch_lengths.values())
+        self._build_label_maps()
+
+    def _build_label_maps(self):
+        '''
+        Populate :attr:`link_labels` and :attr:`parent_links` from :attr:`link_index`,
+        used by :meth:`name_fragment`.
+        '''
+        links = [link for link in self.link_index if isinstance(link, Link)]
+        self.link_labels = {link.id: link.label for link in links}
+        self.parent_links = {link.child.id: link for link in links}
 
     def count_branches(self):
         '''
@@ -695,8 +696,16 @@ class Glycan(SaccharideBase):
         --------
         :func:`pygly2.composition.composition.calculate_mass`
         '''
-        return sum(
+        cache = self._cache.validate(self.root._version)
+        key = ("mass", average, charge, id(mass_data))
+        try:
+            return cache[key][1]
+        except KeyError:
+            pass
+        mass = sum(
             node.mass(average=average, charge=charge, mass_data=mass_data) for node in self)
+        cache[key] = (mass_data, mass)
+        return mass
 
     def total_composition(self):
         '''
@@ -706,8 +715,33 @@ class Glycan(SaccharideBase):
         -------
         :class:`~pygly2.composition.Composition`
         '''
+        cache = self._cache.validate(self.root._version)
+        try:
+            return cache["total_composition"].clone()
+        except KeyError:
+            pass
+        composition = sum((node.total_composition() for node in self), Composition())
+        cache["total_composition"] = composition
+        return composition.clone()
+
+    def fragmentation_engine(self, average=False, charge=0, mass_data=None):
+        '''
+        Get a :class:`~.fragmentation.FragmentationEngine` for `self`, holding the mass of every
+        subtree. The engine is reused until the structure is modified.
 
-        return sum((node.total_composition() for node in self), Composition())
+        Returns
+        -------
+        :class:`~.fragmentation.FragmentationEngine`
+        '''
+        cache = self._cache.validate(self.root._version)
+        key = ("engine", average, charge, id(mass_data))
+        try:
+            return cache[key][1]
+        except KeyError:
+            pass
+        engine = FragmentationEngine(self, average=average, charge=charge, mass_data=mass_data)
+        cache[key] = (mass_data, engine)
+        return engine
 
     def clone(self, index_method='dfs', visited=None):
         '''
@@ -763,16 +797,106 @@ class Glycan(SaccharideBase):
     def __ne__(self, other):
         return not self == other
 
+    def canonical_form(self, exact=True):
+        '''
+        Write `self` as a string which is the same for every structure equal to it.
+
+        Parameters
+        ----------
+        exact: bool, optional, defaults to |True|
+            If |True|, structures are equal when :meth:`exact_ordering_equality` holds,
+            otherwise when :meth:`topological_equality` holds
+
+        Returns
+        -------
+        str
+
+        See also
+        --------
+        :func:`pygly2.structure.canonical.canonical_form`
+        '''
+        cache = self._cache.validate(self.root._version)
+        key = ("canonical_form", exact)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        form = cache[key] = canonical.canonical_form(self, exact)
+        return form
+
+    def canonical_hash(self, exact=True):
+        '''
+        A hexadecimal digest of :meth:`canonical_form`, which is stable across processes and
+        may be stored to find duplicate structures.
+
+        Parameters
+        ----------
+        exact: bool, optional, defaults to |True|
+
+        Returns
+        -------
+        str
+        '''
+        cache = self._cache.validate(self.root._version)
+        key = ("canonical_hash", exact)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        digest = cache[key] = canonical.form_digest(self.canonical_form(exact))
+        return digest
+
+    def fingerprint(self, bits=FINGERPRINT_BITS):
+        '''
+        Fixed-width bitsets of the residues, linkages and short paths of `self`, used
+        to quickly rule out structures which cannot contain `self`.
+
+        Parameters
+        ----------
+        bits: int, optional
+
+        Returns
+        -------
+        :class:`~pygly2.structure.fingerprint.Fingerprint`
+        '''
+        cache = self._cache.validate(self.root._version)
+        key = ("fingerprint", bits)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        fingerprint = cache[key] = Fingerprint.from_glycan(self, bits)
+        return fingerprint
+
+    def __hash__(self):
+        '''
+        Hash consistent with :meth:`__eq__`, derived from the exact :meth:`canonical_form`.
+        Modifying a |Glycan| changes its hash, so do not modify a |Glycan| while it is a
+        member of a :class:`set` or a key of a :class:`dict`.
+
+        The canonical form is cached until a residue of `self` is changed through its
+        setters or :class:`~.link.Link` methods. Changes made any other way, such as
+        reordering :attr:`Monosaccharide.links` in place, must be followed by a call to
+        :func:`~.base.mark_modified`.
+        '''
+        return hash(self.canonical_form())
+
     def fragments(self, kind=('B', 'Y'), max_cleavages=1, average=False, charge=0, mass_data=None,
-                  min_cleavages=1, inplace=False, visited=None):
+                  min_cleavages=1, inplace=False, visited=None, unique=False, group_by=None):
         '''
         Generate carbohydrate backbone fragments from this glycan by examining the disjoint subtrees
         created by removing one or more monosaccharide-monosaccharide bond.
 
+        Fragments from a single cleavage, and all fragments which only break glycosidic bonds
+        (B, C, Y, and Z), are enumerated by :class:`~.fragmentation.FragmentationEngine` without
+        modifying or copying the |Glycan|, and each set of broken bonds is reported exactly once.
+        Fragments combining cross-ring and other cleavages are generated recursively, and are
+        reported once for each order in which their bonds can be broken unless `unique` is set.
+
         .. note::
-            While generating fragments with `inplace = True`, the |Glycan| object is being permuted. All of the
-            changes being made are reversed during the generation process, and the glycan is
-            returned to the same state it was in when :meth:`~.fragments` was called by the end
+            While generating cross-ring fragments with `inplace = True`, the |Glycan| object is being
+            permuted. All of the changes being made are reversed during the generation process, and the
+            glycan is returned to the same state it was in when :meth:`~.fragments` was called by the end
             of the generator. Do not attempt to use the |Glycan| object for other things while
             fragmenting it. If you must, copy it first with :meth:`~.clone`.
 
@@ -794,6 +918,14 @@ class Glycan(SaccharideBase):
             contents of `mass_data` are assumed to contain elemental mass and isotopic abundance information.
         inplace: `bool`
             Whether or not to first copy `self` and generate fragments from the copy, keeping `self` intact.
+        unique: `bool`
+            Whether or not to drop fragments which break the same bonds in the same way and contain the
+            same residues as an earlier fragment, which the recursive generation of multiple cross-ring
+            cleavages produces once per order of cleavage.
+        group_by: |str|, optional
+            If ``"composition"``, every fragment with the same composition is merged into a single
+            :class:`~.fragmentation.FragmentGroup`, whose :attr:`members` hold each original fragment.
+            Not supported with A or X fragments when `max_cleavages` is greater than 1.
 
         Yields
         ------
@@ -803,19 +935,86 @@ class Glycan(SaccharideBase):
         --------
         :func:`pygly2.composition.composition.calculate_mass`
         '''
-        gen = self
-        if not inplace:
-            gen = self.clone()
         results_container = Fragment
+        namer = self._name_fragment_or_default
+        if group_by is not None:
+            for group in self._fragment_groups(kind, max_cleavages, average, charge, mass_data,
+                                               min_cleavages, inplace, visited, group_by):
+                yield group
+            return
+        fragments = self._fragment_tuples(
+            kind, max_cleavages, average, charge, mass_data, min_cleavages, inplace, visited)
+        if unique:
+            fragments = unique_fragments(fragments)
+        for frag_type, link_ids, included_nodes, mass in fragments:
+            yield results_container(frag_type, link_ids, included_nodes, mass, None, namer)
+
+    def fragment_array(self, kind=('B', 'Y'), max_cleavages=1, average=False, charge=0, mass_data=None,
+                       min_cleavages=1, inplace=False, visited=None, unique=False, group_by=None):
+        '''
+        Generate the same fragments as :meth:`fragments`, collected into a
+        :class:`~.fragment_array.FragmentArray` instead of individual :class:`Fragment`
+        objects. Names are computed when they are first requested.
+
+        Returns
+        -------
+        :class:`~.fragment_array.FragmentArray`
+        '''
+        namer = self._name_fragment_or_default
+        if group_by is not None:
+            return FragmentArray.from_groups(
+                self._fragment_groups(kind, max_cleavages, average, charge, mass_data,
+                                      min_cleavages, inplace, visited, group_by),
+                namer=namer)
+        fragments = self._fragment_tuples(
+            kind, max_cleavages, average, charge, mass_data, min_cleavages, inplace, visited)
+        if unique:
+            fragments = unique_fragments(fragments)
+        return FragmentArray.from_tuples(fragments, namer=namer)
+
+    def _fragment_groups(self, kind, max_cleavages, average, charge, mass_data,
+                         min_cleavages, inplace, visited, group_by):
+        if group_by != "composition":
+            raise ValueError("Cannot group fragments by {!r}".format(group_by))
+        if len(set(kind) & set("AX")) > 0 and max_cleavages > 1:
+            raise ValueError(
+                "Cannot group A or X fragments by composition with more than one cleavage")
+        return group_by_composition(
+            self._fragment_tuples(kind, max_cleavages, average, charge, mass_data,
+                                  min_cleavages, inplace, visited, compositions=True),
+            namer=self._name_fragment_or_default)
+
+    def _fragment_tuples(self, kind, max_cleavages, average, charge, mass_data,
+                         min_cleavages, inplace, visited, compositions=False):
+        if visited:
+            engine = FragmentationEngine(self, average=average, charge=charge,
+                                         mass_data=mass_data, visited=visited)
+        else:
+            engine = self.fragmentation_engine(average=average, charge=charge, mass_data=mass_data)
+        recursive_break_links = None
+        if len(set(kind) & set("AX")) > 0 and max_cleavages > 1:
+            gen = self
+            if not inplace:
+                gen = self.clone()
+            recursive_break_links = partial(gen.break_links, kind=kind, average=average, charge=charge,
+                                            mass_data=mass_data, visited=visited)
+            glycosidic_kind = set(kind) - set("AX")
         for i in range(min_cleavages, max_cleavages + 1):
-            for frag_type, link_ids, included_nodes, mass in gen.break_links(i, kind, average, charge,
-                                                                             mass_data, visited=visited):
-                frag = results_container(frag_type, link_ids, included_nodes, mass, None)
-                try:
-                    frag.name = self.name_fragment(frag)
-                except:
-                    frag.name = str(frag)
-                yield frag
+            if i > 1 and recursive_break_links is not None:
+                # Glycosidic fragments come from the engine, as they would without A or X, and
+                # only those with a cross-ring cleavage from the recursion
+                for fragment in engine.break_links(i, kind=glycosidic_kind):
+                    yield fragment
+                for fragment in recursive_break_links(i):
+                    if "A" in fragment[0] or "X" in fragment[0]:
+                        yield fragment
+                continue
+            if compositions:
+                fragments = engine.break_links(i, kind=kind, compositions=True)
+            else:
+                fragments = engine.break_links(i, kind=kind)
+            for fragment in fragments:
+                yield fragment
 
     def break_links(self, n_links=0, kind=(
             'B', 'Y'), average=False, charge=0, mass_data=None, visited=None):
@@ -1072,15 +1271,24 @@ class Glycan(SaccharideBase):
                 logger.debug("Reapplying %d", break_id)
                 link.apply()
 
+    def _name_fragment_or_default(self, fragment):
+        '''
+        Name `fragment` with :meth:`name_fragment`, falling back to its representation
+        if its bonds cannot be found in this |Glycan|'s index.
+        '''
+        try:
+            return self.name_fragment(fragment)
+        except (KeyError, AttributeError, TypeError, ValueError):
+            return str(fragment)
+
     def name_fragment(self, fragment):
         '''
         Attempt to assign a full name to a fragment based on the branch and position relative to
         the reducing end along side A/B/C/X/Y/Z, according to :title-reference:`Domon and Costello`
         '''
-        ring_coordinates, ion_kind = re.search(r"(\d+,\d+)?(\S)", fragment.kind).groups()
-        ring_coordinates = "" if ring_coordinates is None else ring_coordinates
-
-        ion_types = re.findall(r"(\d+,\d+)?(\S)", fragment.kind)
+        if self.parent_links is None:
+            self._build_label_maps()
+        ion_types = ion_type_pattern.findall(fragment.kind)
         links_broken = fragment.link_ids
 
         pairings = zip(ion_types, links_broken)
@@ -1091,34 +1299,28 @@ class Glycan(SaccharideBase):
         # Accumulator for name components
         name_parts = []
         # Collect cross-ring fragment names
-        for crossring_id in crossring_targets:
-            # Seek the link that holds the fragmented residue
-            for link in self.link_index:
-                if link.child.id == crossring_id:
-                    ion_type = crossring_targets[crossring_id]
-                    label = link.label
-                    if fragment_direction[ion_type[1]] > 0:
-                        name = "{}{}".format(''.join(map(str, ion_type)), label.replace(MAIN_BRANCH_SYM, ""))
-                        name_parts.append(name)
-                    else:
-                        label_key = label[0]
-                        distance = int(label[1:])
-                        inverted_distance = self.branch_lengths[label_key] - (distance - 1)
-                        name = "{}{}{}".format(
-                            ''.join(map(str, ion_type)), label_key.replace(MAIN_BRANCH_SYM, ""), inverted_distance)
-                        name_parts.append(name)
+        for crossring_id, ion_type in crossring_targets.items():
+            # The link that holds the fragmented residue
+            label = self.parent_links[crossring_id].label
+            if fragment_direction[ion_type[1]] > 0:
+                name = "{}{}".format(''.join(map(str, ion_type)), label.replace(MAIN_BRANCH_SYM, ""))
+                name_parts.append(name)
+            else:
+                label_key = label[0]
+                distance = int(label[1:])
+                inverted_distance = self.branch_lengths[label_key] - (distance - 1)
+                name = "{}{}{}".format(
+                    ''.join(map(str, ion_type)), label_key.replace(MAIN_BRANCH_SYM, ""), inverted_distance)
+                name_parts.append(name)
 
         # Collect glycocidic fragment names
         for break_id, ion_type in break_targets.items():
             ion_type = ion_type[1]
+            label = self.link_labels[break_id]
             if fragment_direction[ion_type] > 0:
-                link = self.link_index[break_id - 1]
-                label = link.label
                 name = "{}{}".format(ion_type, label.replace(MAIN_BRANCH_SYM, ""))
                 name_parts.append(name)
             else:
-                link = self.link_index[break_id - 1]
-                label = link.label
                 label_key = label[0]
                 distance = int(label[1:])
                 inverted_distance = self.branch_lengths[label_key] - (distance - 1)
@@ -1,7 +1,7 @@
 from uuid import uuid4
 
 from ..composition import Composition
-from .base import SaccharideBase, SubstituentBase
+from .base import SaccharideBase, SubstituentBase, mark_modified
 
 default_parent_loss = Composition(O=1, H=1)
 default_child_loss = Composition(H=1)
@@ -96,6 +96,7 @@ class Link(object):
         else:
             self.parent.links[self.parent_position] = self
         self.child.links[self.child_position] = self
+        mark_modified(self.child)
 
     def to(self, mol):
         '''
@@ -276,6 +277,8 @@ class Link(object):
         else:
             self.parent.links.pop(self.parent_position, self)
         self.child.links.pop(self.child_position, self)
+        mark_modified(self.parent)
+        mark_modified(self.child)
         if refund:
             self.refund()
         return (self.parent, self.child)
@@ -299,6 +302,7 @@ class Link(object):
                 self.parent.links[self.parent_position], key=lambda x: x.child.order())
 
         self.child.links[self.child_position] = self
+        mark_modified(self.child)
 
         if refund:
             self.refund()
@@ -310,6 +314,8 @@ class Link(object):
         '''
         self.parent.composition += (self.parent_loss or default_parent_loss)
         self.child.composition += (self.child_loss or default_child_loss)
+        mark_modified(self.parent)
+        mark_modified(self.child)
 
     def is_attached(self):
         '''
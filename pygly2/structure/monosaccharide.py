@@ -5,7 +5,7 @@ from itertools import chain, izip_longest
 from .constants import Anomer, Configuration, Stem, SuperClass, Modification, RingType
 from .substituent import Substituent
 from .link import Link
-from .base import SaccharideBase
+from .base import SaccharideBase, VersionCache, mark_modified
 
 from ..io.format_constants_map import anomer_map, superclass_map
 from ..utils import invert_dict, make_counter, StringIO, identity as ident_op
@@ -24,6 +24,12 @@ logger.setLevel("DEBUG")
 debug = True
 
 
+def _enum_tuple(enum, value):
+    if isinstance(value, (tuple, list)):
+        return tuple(enum[v] for v in value)
+    return (enum[value],)
+
+
 def _get_standard_composition(monosaccharide):
     '''Used to get initial composition for a given monosaccharide
     |Superclass| and modifications.
@@ -213,16 +219,18 @@ class Monosaccharide(SaccharideBase):
         if modifications is None:
             modifications = OrderedMultiMap()
 
+        self._cache = VersionCache()
+        self._version = 0
         if fast:
             self._anomer = anomer
             self._configuration = tuple(configuration)
             self._stem = tuple(stem)
             self._superclass = superclass
         else:
-            self.anomer = anomer
-            self.configuration = configuration
-            self.stem = stem
-            self.superclass = superclass
+            self._anomer = Anomer[anomer]
+            self._configuration = _enum_tuple(Configuration, configuration)
+            self._stem = _enum_tuple(Stem, stem)
+            self._superclass = SuperClass[superclass]
 
         self.ring_start = ring_start
         self.ring_end = ring_end
@@ -232,10 +240,19 @@ class Monosaccharide(SaccharideBase):
             is None else substituent_links
         self.id = id or uuid4().int
         self._reducing_end = None
-        self.reducing_end = reduced
+        self._set_reducing_end(reduced)
         if composition is None:
             composition = _get_standard_composition(self)
-        self.composition = composition
+        self._composition = composition
+
+    @property
+    def composition(self):
+        return self._composition
+
+    @composition.setter
+    def composition(self, value):
+        self._composition = value
+        mark_modified(self)
 
     @property
     def anomer(self):
@@ -244,6 +261,7 @@ class Monosaccharide(SaccharideBase):
     @anomer.setter
     def anomer(self, value):
         self._anomer = Anomer[value]
+        mark_modified(self)
 
     @property
     def configuration(self):
@@ -251,10 +269,8 @@ class Monosaccharide(SaccharideBase):
 
     @configuration.setter
     def configuration(self, value):
-        if isinstance(value, (tuple, list)):
-            self._configuration = tuple(Configuration[v] for v in value)
-        else:
-            self._configuration = (Configuration[value],)
+        self._configuration = _enum_tuple(Configuration, value)
+        mark_modified(self)
 
     @property
     def stem(self):
@@ -262,10 +278,8 @@ class Monosaccharide(SaccharideBase):
 
     @stem.setter
     def stem(self, value):
-        if isinstance(value, (tuple, list)):
-            self._stem = tuple(Stem[v] for v in value)
-        else:
-            self._stem = (Stem[value],)
+        self._stem = _enum_tuple(Stem, value)
+        mark_modified(self)
 
     @property
     def superclass(self):
@@ -274,6 +288,7 @@ class Monosaccharide(SaccharideBase):
     @superclass.setter
     def superclass(self, value):
         self._superclass = SuperClass[value]
+        mark_modified(self)
 
     def clone(self, prop_id=False, fast=True):
         '''
@@ -377,6 +392,10 @@ class Monosaccharide(SaccharideBase):
         value: True, None, or :class:`.ReducedEnd`
 
         """
+        self._set_reducing_end(value)
+        mark_modified(self)
+
+    def _set_reducing_end(self, value):
         red_end = self.reducing_end
         if red_end is not None:
             self.modifications.pop(1, red_end)
@@ -960,17 +979,23 @@ class Monosaccharide(SaccharideBase):
         return self.to_glycoct().replace("\n", ' ')
 
     def __getstate__(self):
-        return self.__dict__
+        state = dict(self.__dict__)
+        state.pop("_cache", None)
+        state.pop("_version", None)
+        state["composition"] = state.pop("_composition")
+        return state
 
     def __setstate__(self, state):
         '''
         Does some testing to upgrade outdated, but equivalent
         modification models.
         '''
-        self.anomer = state['_anomer']
-        self.superclass = state['_superclass']
-        self.stem = state['_stem']
-        self.configuration = state['_configuration']
+        self._cache = VersionCache()
+        self._version = 0
+        self._anomer = Anomer[state['_anomer']]
+        self._superclass = SuperClass[state['_superclass']]
+        self._stem = _enum_tuple(Stem, state['_stem'])
+        self._configuration = _enum_tuple(Configuration, state['_configuration'])
 
         self.ring_start = state['ring_start']
         self.ring_end = state['ring_end']
@@ -979,17 +1004,17 @@ class Monosaccharide(SaccharideBase):
         self.modifications = state['modifications']
         self.links = state['links']
         self.substituent_links = state['substituent_links']
-        self.composition = state["composition"]
+        self._composition = state["composition"]
         reduced = state.get('_reducing_end', None)
         # Make sure that if "aldi" is present, to replace it with
         # the default ReducedEnd
         if reduced is None:
             if self.modifications.popv(Modification.aldi) is not None:
                 # Deduct the modification mass from the main composition
-                self.composition -= {"H": 2}
+                self._composition = self._composition - {"H": 2}
                 reduced = True
         self._reducing_end = None
-        self.reducing_end = reduced
+        self._set_reducing_end(reduced)
 
     def mass(self, substituents=True, average=False, charge=0, mass_data=None):
         '''
@@ -1016,6 +1041,12 @@ class Monosaccharide(SaccharideBase):
         --------
         :func:`pygly2.composition.composition.calculate_mass`
         '''
+        cache = self._cache.validate(self._version)
+        key = ("mass", substituents, average, charge, id(mass_data))
+        try:
+            return cache[key][1]
+        except KeyError:
+            pass
         mass = calculate_mass(
             self.composition, average=average, charge=charge, mass_data=mass_data)
         if substituents:
@@ -1025,6 +1056,7 @@ class Monosaccharide(SaccharideBase):
         if self.reducing_end is not None:
             mass += self.reducing_end.mass(
                 average=average, charge=charge, mass_data=mass_data)
+        cache[key] = (mass_data, mass)
         return mass
 
     def total_composition(self):
@@ -1036,13 +1068,19 @@ class Monosaccharide(SaccharideBase):
         -------
         :class:`~pygly2.composition.Composition`
         '''
+        cache = self._cache.validate(self._version)
+        try:
+            return cache["total_composition"].clone()
+        except KeyError:
+            pass
         comp = self.composition.clone()
         for p, sub in self.substituents():
             comp += sub.total_composition()
         red_end = self.reducing_end
         if red_end is not None:
             comp += red_end.total_composition()
-        return comp
+        cache["total_composition"] = comp
+        return comp.clone()
 
     def children(self):
         '''
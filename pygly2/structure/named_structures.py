@@ -1,33 +1,162 @@
+import os
 import pkg_resources
 import json
 import uuid
 import re
+import marshal
+import hashlib
+import logging
 
 from copy import deepcopy
+from functools import partial
+from collections import MutableMapping
 
 from pygly2.utils import StringIO, identity
-from pygly2.io import glycoct
+from pygly2.io import glycoct, binary
 
+logger = logging.getLogger(__name__)
 
-class StructureIndex(dict):
-    def __init__(self, stream, key_transform=identity, value_transform=identity):
-        self.update(json.load(stream))
-        for k, v in self.items():
-            self[key_transform(k)] = value_transform(glycoct.loads(v).next())
+#: The environment variable naming a directory where the default indices keep a binary
+#: cache of their structures. See :func:`compile_cache`
+CACHE_DIRECTORY_VARIABLE = "PYGLY2_STRUCTURE_CACHE"
+#: The version of the layout of a cache file
+CACHE_VERSION = 1
+
+
+class StructureIndex(MutableMapping):
+    '''
+    A mapping from names to structures, read from a JSON object of GlycoCT strings.
+
+    The structures are held in a private :class:`dict` and are not parsed until the index
+    is first accessed. Use ``dict(index)`` to get a plain :class:`dict` of copies. If :attr:`cache_path`
+    is set, they are decoded with :mod:`pygly2.io.binary` from the cache at that path if it
+    was written from the same JSON, and otherwise the cache is rewritten after parsing.
+
+    Attributes
+    ----------
+    key_transform: function
+        Applied to each name
+    value_transform: function
+        Applied to each parsed |Glycan|
+    cache_path: str or |None|
+        The path to the binary cache of this index
+    '''
+    def __init__(self, stream, key_transform=identity, value_transform=identity, cache_path=None):
         self.key_transform = key_transform
+        self.value_transform = value_transform
+        self.cache_path = cache_path
+        self._source = stream
+        self._loaded = False
+        self._structures = {}
+
+    def _load(self):
+        if self._loaded:
+            return self._structures
+        stream = self._source() if callable(self._source) else self._source
+        content = stream.read()
+        digest = hashlib.sha1(content).hexdigest()
+        entries = self._read_cache(digest)
+        if entries is None:
+            entries = [(name, glycoct.loads(text).next()) for name, text in json.loads(content).items()]
+            self._write_cache(digest, entries)
+        for name, structure in entries:
+            self._structures[self.key_transform(name)] = self.value_transform(structure)
+        self._source = None
+        self._loaded = True
+        return self._structures
+
+    def _read_cache(self, digest):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'rb') as handle:
+                version, source_digest, entries = marshal.load(handle)
+            if version != CACHE_VERSION or source_digest != digest:
+                return None
+            return [(name, binary.loads(data)) for name, data in entries]
+        except (IOError, EOFError, ValueError, TypeError, binary.BinaryGlycanError) as e:
+            logger.warning("Could not read structure cache %s: %r", self.cache_path, e)
+            return None
+
+    def _write_cache(self, digest, entries):
+        if self.cache_path is None:
+            return
+        payload = (CACHE_VERSION, digest, tuple((name, binary.dumps(structure)) for name, structure in entries))
+        # Write to a file private to this process first, so no process reads a partial cache
+        temp_path = "{}.{}".format(self.cache_path, os.getpid())
+        try:
+            with open(temp_path, 'wb') as handle:
+                marshal.dump(payload, handle, 2)
+            os.rename(temp_path, self.cache_path)
+        except (IOError, OSError) as e:
+            logger.warning("Could not write structure cache %s: %r", self.cache_path, e)
 
     def __getitem__(self, key):
-        x = dict.__getitem__(self, key)
+        x = self._load()[key]
         ret = deepcopy(x)
         ret.id = uuid.uuid4().int
         return ret
 
+    def reference(self, key):
+        '''
+        Get the structure stored under `key` without copying it, unlike :meth:`__getitem__`.
+        The same object is returned by each call, so it must not be modified.
+        '''
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+
+    def __delitem__(self, key):
+        del self._load()[key]
+
+    def __contains__(self, key):
+        return key in self._load()
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __eq__(self, other):
+        if isinstance(other, StructureIndex):
+            other = other._load()
+        return self._load() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    # Like :class:`dict`, these yield the stored structures rather than copies
+    def keys(self):
+        return self._load().keys()
+
+    def values(self):
+        return self._load().values()
+
+    def items(self):
+        return self._load().items()
+
+    def iterkeys(self):
+        return self._load().iterkeys()
+
+    def itervalues(self):
+        return self._load().itervalues()
+
+    def iteritems(self):
+        return self._load().iteritems()
+
+    def has_key(self, key):
+        return key in self
+
+    def copy(self):
+        return self._load().copy()
+
     def __getattr__(self, name):
-        try:
-            res = object.__getattr__(self, name)
-            return res
-        except AttributeError:
-            return self[name]
+        # Private attributes are missing only before __init__ has run, e.g. while copying
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
 
     def __dir__(self):
         return list(self.__dict__) + list(k for k in self
@@ -41,19 +170,49 @@ class StructureIndex(dict):
         return rep.getvalue()
 
 
+def _default_cache_path(name, directory=None):
+    directory = directory or os.environ.get(CACHE_DIRECTORY_VARIABLE)
+    if not directory:
+        return None
+    return os.path.join(directory, name + ".cache")
+
+
 class MonosaccharideIndex(StructureIndex):
-    def __init__(self, stream=None, key_transform=identity, value_transform=lambda x: x.root):
+    def __init__(self, stream=None, key_transform=identity, value_transform=lambda x: x.root,
+                 cache_path=None):
         if stream is None:
-            stream = pkg_resources.resource_stream(__name__, "data/monosaccharides.json")
-        super(MonosaccharideIndex, self).__init__(stream, key_transform, value_transform)
+            stream = partial(pkg_resources.resource_stream, __name__, "data/monosaccharides.json")
+            cache_path = cache_path or _default_cache_path("monosaccharides")
+        super(MonosaccharideIndex, self).__init__(stream, key_transform, value_transform, cache_path)
 
 monosaccharides = MonosaccharideIndex()
 
 
 class GlycanIndex(StructureIndex):
-    def __init__(self, stream=None, key_transform=identity, value_transform=identity):
+    def __init__(self, stream=None, key_transform=identity, value_transform=identity, cache_path=None):
         if stream is None:
-            stream = pkg_resources.resource_stream(__name__, "data/glycans.json")
-        super(GlycanIndex, self).__init__(stream, key_transform, value_transform)
+            stream = partial(pkg_resources.resource_stream, __name__, "data/glycans.json")
+            cache_path = cache_path or _default_cache_path("glycans")
+        super(GlycanIndex, self).__init__(stream, key_transform, value_transform, cache_path)
 
 glycans = GlycanIndex()
+
+
+def compile_cache(directory):
+    '''
+    Write the binary caches of the default :obj:`monosaccharides` and :obj:`glycans`
+    indices into `directory`, replacing any existing ones. When the environment variable
+    named by :data:`CACHE_DIRECTORY_VARIABLE` is set to `directory`, the default indices
+    are read from these caches instead of being parsed from GlycoCT.
+
+    Parameters
+    ----------
+    directory: str
+    '''
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    for index_type, name in ((MonosaccharideIndex, "monosaccharides"), (GlycanIndex, "glycans")):
+        index = index_type(cache_path=_default_cache_path(name, directory))
+        if os.path.exists(index.cache_path):
+            os.remove(index.cache_path)
+        index._load()
@@ -0,0 +1,52 @@
+import unittest
+from common import glycoct, load, pickle
+
+from pygly2.io import binary
+from pygly2.composition import composition_transform
+
+_file_path = "./test_data/glycoct.txt"
+
+
+class BinaryGlycanTests(unittest.TestCase):
+
+    def assertRoundTrip(self, structure):
+        data = binary.dumps(structure)
+        dup = binary.loads(data)
+        self.assertEqual(structure, dup)
+        self.assertEqual(structure.total_composition(), dup.total_composition())
+        self.assertAlmostEqual(structure.mass(), dup.mass(), 5)
+        self.assertEqual(structure.to_glycoct(), dup.to_glycoct())
+        self.assertEqual(
+            [link.label for link in structure.link_index], [link.label for link in dup.link_index])
+        self.assertEqual(binary.dumps(dup), data)
+        return dup
+
+    def test_round_trip(self):
+        for structure in glycoct.read(_file_path):
+            self.assertRoundTrip(structure)
+        self.assertRoundTrip(load("complex_glycan"))
+
+    def test_reduced_derivatized(self):
+        structure = load("broad_n_glycan")
+        structure.set_reducing_end(True)
+        composition_transform.derivatize(structure, "methyl")
+        dup = self.assertRoundTrip(structure)
+        self.assertEqual(structure.reducing_end, dup.reducing_end)
+        composition_transform.strip_derivatization(dup)
+        composition_transform.strip_derivatization(structure)
+        self.assertEqual(structure.total_composition(), dup.total_composition())
+
+    def test_smaller_than_pickle(self):
+        structure = load("broad_n_glycan")
+        self.assertLess(len(binary.dumps(structure)), len(pickle.dumps(structure, 2)))
+
+    def test_version_check(self):
+        data = binary.dumps(load("common_glycan"))
+        self.assertTrue(binary.is_encoded(data))
+        bad_version = data[:4] + chr(binary.VERSION + 1) + data[5:]
+        self.assertRaises(binary.BinaryGlycanError, binary.loads, bad_version)
+        self.assertRaises(binary.BinaryGlycanError, binary.loads, "not a glycan")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,9 @@
 import unittest
 
-from pygly2.composition import composition, composition_transform
+from pygly2.composition import composition, composition_transform, batch
 from pygly2.structure import monosaccharide
 
-from common import load
+from common import load, pickle
 
 ReducedEnd = monosaccharide.ReducedEnd
 
@@ -79,10 +79,56 @@ def make_composition_suite(composition_type):
             self.assertAlmostEqual(case.calc_mass(charge=1), 19.01784, 3)
             self.assertRaises(
                 composition.ChemicalCompositionError, lambda: protonated.calc_mass(charge=1))
+
+        def test_mass_data(self):
+            case = composition_type("H2O[18]")
+            self.assertAlmostEqual(case.calc_mass(average=True), 20.0150, 3)
+            mass_data = {"H": {0: (1.0, 1.0), 1: (1.0, 0.5), 2: (2.0, 0.5)},
+                         "O": {0: (16.0, 1.0), 16: (16.0, 1.0), 18: (18.0, 0.0)},
+                         "H+": {0: (1.0, 1.0), 1: (1.0, 1.0)}}
+            self.assertEqual(case.calc_mass(mass_data=mass_data), 20.0)
+            self.assertEqual(case.calc_mass(mass_data=mass_data, average=True), 21.0)
+            self.assertEqual(case.calc_mass(mass_data=mass_data, charge=2), 11.0)
+
+        def test_pickle(self):
+            case = composition_type("C6H12O6O[18]")
+            dup = pickle.loads(pickle.dumps(case))
+            self.assertEqual(case, dup)
+            self.assertEqual(type(case), type(dup))
+            self.assertAlmostEqual(case.mass, dup.mass, 6)
     return CompositionTests
 
 from pygly2.composition.composition import PComposition
 PCompositionTests = make_composition_suite(PComposition)
+from pygly2.composition.acomposition import AComposition
+ACompositionTests = make_composition_suite(AComposition)
+
+
+class ACompositionArrayTests(unittest.TestCase):
+    def test_array_roundtrip(self):
+        case = AComposition("C6H12O6Na")
+        self.assertEqual(case, PComposition("C6H12O6Na"))
+        self.assertEqual(PComposition("C6H12O6Na"), case)
+        dup = AComposition.from_array(case.to_array(), {"O[18]": 1})
+        self.assertEqual(dup, case + {"O[18]": 1})
+
+
+class BatchMassTests(unittest.TestCase):
+    def test_batch_calculate_mass(self):
+        cases = [AComposition("C6H12O6"), PComposition("H2O[18]"), {"C": 8, "H": 15, "N": 1, "O": 6}]
+        expected = [composition.calculate_mass(composition=c, charge=z)
+                    for c in cases for z in (0, 1, -2)]
+        observed = batch.batch_calculate_mass(cases, charge=(0, 1, -2))
+        self.assertEqual(observed.shape, (3, 3))
+        for a, b in zip(observed.flatten(), expected):
+            self.assertAlmostEqual(a, b, 6)
+
+        matrix, elements = batch.composition_matrix(cases)
+        self.assertEqual(elements[-1], "O[18]")
+        average = batch.batch_calculate_mass(matrix, average=True, elements=elements)
+        for a, c in zip(average, cases):
+            self.assertAlmostEqual(a, composition.calculate_mass(composition=c, average=True), 6)
+        self.assertRaises(composition.ChemicalCompositionError, batch.batch_calculate_mass, matrix)
 try:
     from pygly2.composition.composition import CComposition
     CCompositionTests = make_composition_suite(CComposition)
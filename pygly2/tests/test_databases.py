@@ -1,6 +1,11 @@
+import os
+import shutil
+import sqlite3
+import tempfile
 import unittest
+from pygly2.utils import pickle
 from pygly2.composition import composition_transform
-from pygly2.algorithms import database
+from pygly2.algorithms import database, subtree_search
 from common import load
 
 
@@ -33,6 +38,15 @@ class GlycanRecordTest(unittest.TestCase):
         dup = db[1]
         self.assertAlmostEqual(rec.mass(), dup.mass(), 3)
 
+    def test_serialize(self):
+        rec = database.GlycanRecord(load("broad_n_glycan"), motifs=["N-Glycan"], id=3)
+        dup = database.GlycanRecord.deserialize(rec.serialize())
+        self.assertEqual(rec, dup)
+        self.assertEqual(dup.motifs, ["N-Glycan"])
+        self.assertEqual(dup.id, 3)
+        legacy = database.GlycanRecord.deserialize(unicode(pickle.dumps(rec)))
+        self.assertEqual(rec, legacy)
+
 
 class RecordDatabaseTest(unittest.TestCase):
 
@@ -43,6 +57,94 @@ class RecordDatabaseTest(unittest.TestCase):
         self.assertTrue(db[1] == rec)
         self.assertTrue(db[2] == rec2)
 
+    def test_bulk_load(self):
+        records = [database.GlycanRecord(load(name)) for name in ("broad_n_glycan", "complex_glycan")]
+        db = database.RecordDatabase()
+        db.apply_indices()
+        count = db.bulk_load(iter(records), pragmas={"synchronous": "off", "cache_size": 1000})
+        self.assertEqual(count, 2)
+        self.assertEqual(len(db), 2)
+        self.assertEqual(db[1], records[0])
+        self.assertEqual(db[2], records[1])
+        row = db.execute("select composition, is_n_glycan from {table_name} where glycan_id = 1;").next()
+        self.assertEqual(row["composition"], database.GlycanRecord.extract_composition(records[0])[1:-1])
+        self.assertEqual(row["is_n_glycan"], 1)
+        indices = db.execute("select name from sqlite_master where type = 'index' and sql is not null "
+                             "and tbl_name = '{table_name}';")
+        self.assertEqual(sorted(r["name"] for r in indices),
+                         ["exact_hash_index", "mass_index", "topology_hash_index"])
+        self.assertEqual(db.execute("PRAGMA synchronous;").next()[0], 2)
+
+    def test_duplicates(self):
+        structures = [load(name) for name in ("broad_n_glycan", "complex_glycan", "broad_n_glycan")]
+        shuffled = load("broad_n_glycan")
+        node = [node for node in shuffled if len(list(node.children())) > 1][0]
+        node.links.key_order.reverse()
+        structures.append(shuffled)
+        db = database.RecordDatabase(records=[database.GlycanRecord(s) for s in structures])
+        self.assertEqual(db.find_duplicates(), [[1, 3]])
+        self.assertEqual(db.find_duplicates(exact=False), [[1, 3, 4]])
+        self.assertEqual([rec.id for rec in db.find_structure(shuffled)], [4])
+        self.assertEqual(sorted(rec.id for rec in db.find_structure(shuffled, exact=False)), [1, 3, 4])
+        self.assertEqual(db.deduplicate(exact=False), 2)
+        self.assertEqual(len(db), 2)
+        self.assertEqual(db.find_duplicates(exact=False), [])
+
+    def test_migrate_schema(self):
+        # A database written before the structure hash columns were added
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "records.db")
+            connection = sqlite3.connect(path)
+            connection.executescript('''create table GlycanRecord(
+                glycan_id integer unique primary key not null,
+                mass float not null,
+                structure text not null, is_n_glycan boolean, composition varchar(120));''')
+            for i, name in enumerate(("broad_n_glycan", "complex_glycan", "broad_n_glycan")):
+                rec = database.GlycanRecord(load(name), id=i + 1)
+                connection.execute("insert into GlycanRecord (glycan_id, mass, structure) values (?, ?, ?);",
+                                   (rec.id, rec.mass(), unicode(pickle.dumps(rec))))
+            connection.commit()
+            connection.close()
+
+            db = database.RecordDatabase(path)
+            self.assertEqual(db.find_duplicates(), [[1, 3]])
+            self.assertEqual([rec.id for rec in db.find_structure(load("complex_glycan"))], [2])
+            rec = db.create(load("complex_glycan"))
+            self.assertEqual(rec.id, 4)
+            self.assertEqual(db.bulk_load([database.GlycanRecord(load("sulfated_glycan"))]), 1)
+            self.assertEqual(db.find_duplicates(), [[1, 3], [2, 4]])
+            self.assertEqual(db.deduplicate(), 2)
+            self.assertEqual(len(db), 3)
+            indices = db.execute("select name from sqlite_master where type = 'index' and sql is not null "
+                                 "and tbl_name = '{table_name}';")
+            self.assertEqual(sorted(r["name"] for r in indices),
+                             ["exact_hash_index", "mass_index", "topology_hash_index"])
+            db.connection.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_substructure_search(self):
+        names = ("common_glycan", "branchy_glycan", "broad_n_glycan", "complex_glycan", "sulfated_glycan")
+        db = database.RecordDatabase(records=[database.GlycanRecord(load(name)) for name in names])
+        core = database.n_glycan_core()
+        self.assertEqual([rec.id for rec in db.substructure_search(core)], [3, 4])
+        for query in [core] + [load(name) for name in names]:
+            self.assertEqual(
+                [rec.id for rec in db.substructure_search(query)],
+                [rec.id for rec in db if subtree_search.subtree_of(query, rec.structure) is not None])
+            self.assertEqual(
+                [rec.id for rec in db.substructure_search(query, exact=True)],
+                [rec.id for rec in db if subtree_search.subtree_of(query, rec.structure, exact=True) is not None])
+
+        # Databases without the side tables are indexed on demand
+        for suffix in database._substructure_index_tables:
+            db.execute("drop table {table_name}" + suffix + ";")
+        db._has_substructure_index = None
+        self.assertFalse(db.has_substructure_index)
+        self.assertEqual([rec.id for rec in db.substructure_search(core)], [3, 4])
+        self.assertTrue(db.has_substructure_index)
+
     def test_ppm_search(self):
         rec = database.GlycanRecord(load("broad_n_glycan"))
         rec2 = database.GlycanRecord(load("complex_glycan"))
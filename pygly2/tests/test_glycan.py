@@ -1,5 +1,9 @@
 import unittest
-from common import load, glycoct, glycan, multimap, pickle, named_structures, monosaccharides
+from common import load, glycoct, glycan, multimap, pickle, named_structures, monosaccharides, StringIO
+from pygly2.structure import base, fragmentation
+from pygly2.structure.fingerprint import Fingerprint
+from pygly2.algorithms import subtree_search
+from pygly2.io import binary
 
 Glycan = glycan.Glycan
 
@@ -20,6 +24,178 @@ class GlycanTests(unittest.TestCase):
 
         self.assertEqual(structure, dup)
 
+    def test_fragments_engine_matches_break_links(self):
+        structure = load("common_glycan")
+
+        def key(frag):
+            return (frag[0], tuple(frag[1]), tuple(sorted(frag[2])), round(frag[3], 6))
+
+        reference = {key(f) for f in structure.clone().break_links(1, kind="BCYZ")}
+        observed = [key(f) for f in structure.fragments("BCYZ")]
+        self.assertEqual(len(observed), len(reference))
+        self.assertEqual(set(observed), reference)
+
+    def test_fragments_engine_crossring(self):
+        structure = load("broad_n_glycan")
+
+        def key(frag):
+            return (frag[0], tuple(frag[1]), tuple(sorted(frag[2])), round(frag[3], 6))
+
+        reference = sorted(key(f) for f in structure.clone().break_links(1, kind="AXBY"))
+        observed = sorted(key(f) for f in structure.fragments("AXBY"))
+        self.assertEqual(observed, reference)
+        self.assertTrue(any('A' in f[0] for f in observed))
+
+    def test_fragment_lazy_names(self):
+        structure = load("broad_n_glycan")
+        calls = []
+
+        def namer(frag):
+            calls.append(frag)
+            return structure.name_fragment(frag)
+
+        for frag in structure.fragments("AXBY"):
+            lazy = glycan.Fragment(frag.kind, frag.link_ids, frag.included_nodes, frag.mass, None, namer)
+            self.assertEqual(len(calls), 0)
+            self.assertEqual(lazy.name, frag.name)
+            self.assertEqual(lazy.name, frag.name)
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(pickle.loads(pickle.dumps(lazy, 2)).name, frag.name)
+            del calls[:]
+        names = [f.name for f in structure.fragments("BY")]
+        self.assertEqual(names[:3], ['Y1', 'Y2', 'Yb3'])
+
+    def test_fragments_engine_multiple_cleavages(self):
+        structure = load("branchy_glycan")
+        dup = structure.clone()
+
+        def key(frag):
+            return (''.join(sorted(frag[0])), tuple(sorted(frag[1])), tuple(sorted(frag[2])), round(frag[3], 6))
+
+        reference = {key(f) for f in structure.clone().break_links(2, kind="BY")}
+        observed = [key(f) for f in dup.fragments("BY", max_cleavages=2, min_cleavages=2)]
+        self.assertEqual(len(observed), len(set(observed)))
+        self.assertTrue(set(observed) <= reference)
+        for frag in observed:
+            self.assertEqual(len(frag[1]), 2)
+        self.assertEqual(structure, dup)
+
+    def test_fragments_group_by_composition(self):
+        structure = load("broad_n_glycan")
+        fragments = list(structure.fragments("ABCXYZ"))
+        groups = list(structure.fragments("ABCXYZ", group_by="composition"))
+        self.assertTrue(len(groups) < len(fragments))
+        self.assertEqual(sorted(f.name for g in groups for f in g.members),
+                         sorted(f.name for f in fragments))
+        for group in groups:
+            mass = group.composition.calc_mass()
+            for member in group.members:
+                self.assertAlmostEqual(member.mass, mass, 6)
+        self.assertEqual(pickle.loads(pickle.dumps(groups[-1], 2)).names, groups[-1].names)
+        with self.assertRaises(ValueError):
+            list(structure.fragments("AY", max_cleavages=2, group_by="composition"))
+
+    def test_fragments_unique(self):
+        structure = load("common_glycan")
+        fragments = list(structure.fragments("AXY", max_cleavages=2))
+        unique = list(structure.fragments("AXY", max_cleavages=2, unique=True))
+        keys = [fragmentation.fragment_key(f.kind, f.link_ids, f.included_nodes) for f in unique]
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual(set(keys), {fragmentation.fragment_key(f.kind, f.link_ids, f.included_nodes)
+                                     for f in fragments})
+
+    def test_fragments_crossring_glycosidic_subset(self):
+        structure = load("common_glycan")
+
+        def glycosidic(fragments):
+            return [(f.kind, f.link_ids, sorted(f.included_nodes), f.mass) for f in fragments
+                    if "A" not in f.kind and "X" not in f.kind]
+
+        expected = glycosidic(structure.fragments("BY", max_cleavages=2))
+        self.assertEqual(glycosidic(structure.fragments("ABXY", max_cleavages=2)), expected)
+
+    def test_canonical_hash(self):
+        structures = [load(name) for name in ("common_glycan", "branchy_glycan", "broad_n_glycan")]
+        for a in structures:
+            for b in structures:
+                self.assertEqual(a == b, a.canonical_hash() == b.canonical_hash())
+        structure = structures[2]
+        dup = structure.clone()
+        self.assertEqual(hash(structure), hash(dup))
+        self.assertEqual(len({structure, dup, structures[0]}), 2)
+        self.assertEqual(pickle.loads(pickle.dumps(structure)).canonical_hash(), structure.canonical_hash())
+
+        # Reverse the order of the children of the first branching residue
+        node = [node for node in dup if len(list(node.children())) > 1][0]
+        node.links.key_order.reverse()
+        # Reordering the links directly bypasses the mutators which invalidate cached values
+        base.mark_modified(node)
+        self.assertFalse(structure == dup)
+        self.assertTrue(structure.topological_equality(dup))
+        self.assertNotEqual(structure.canonical_hash(), dup.canonical_hash())
+        self.assertEqual(structure.canonical_hash(exact=False), dup.canonical_hash(exact=False))
+
+        mass = dup.mass()
+        dup.root.anomer = "alpha"
+        self.assertEqual(mass, dup.mass())
+        self.assertNotEqual(structure.canonical_hash(exact=False), dup.canonical_hash(exact=False))
+
+    def test_cache_versions(self):
+        structure = load("broad_n_glycan")
+        fingerprint = structure.fingerprint()
+        engine = structure.fragmentation_engine()
+        # Building and decoding other structures leaves this structure's caches intact
+        other = load("complex_glycan")
+        pickle.loads(pickle.dumps(other, 2))
+        binary.loads(binary.dumps(other))
+        self.assertIs(structure.fingerprint(), fingerprint)
+        self.assertIs(structure.fragmentation_engine(), engine)
+        other.root.anomer = "alpha"
+        self.assertIs(structure.fragmentation_engine(), engine)
+
+        mass = structure.mass()
+        leaf = [node for node in structure if not list(node.children())][0]
+        leaf.add_monosaccharide(monosaccharides.Fuc)
+        self.assertIsNot(structure.fragmentation_engine(), engine)
+        self.assertAlmostEqual(structure.mass(), mass + monosaccharides.Fuc.mass() - 18.0105646837, 5)
+
+    def test_fingerprint(self):
+        structures = [load(name) for name in ("common_glycan", "branchy_glycan", "broad_n_glycan",
+                                              "complex_glycan", "sulfated_glycan")]
+        for a in structures:
+            for b in structures:
+                included = any(subtree_search.topological_inclusion(a.root, node) for node in b)
+                if included:
+                    self.assertTrue(a.fingerprint().screen(b.fingerprint()))
+                self.assertEqual(included, subtree_search.subtree_of(a, b) is not None)
+        structure = structures[2]
+        fingerprint = structure.fingerprint()
+        self.assertIs(fingerprint, structure.fingerprint())
+        self.assertEqual(Fingerprint.from_bytes(fingerprint.to_bytes()), fingerprint)
+        self.assertEqual(pickle.loads(pickle.dumps(fingerprint)), fingerprint)
+        self.assertRaises(ValueError, fingerprint.screen, structure.fingerprint(bits=64))
+        structure.root.stem = "gal"
+        self.assertNotEqual(fingerprint, structure.fingerprint())
+
+    def test_mass_cache_invalidation(self):
+        structure = load("common_glycan")
+        mass = structure.mass()
+        composition = structure.total_composition()
+        self.assertEqual(mass, structure.mass())
+        structure.root.reducing_end = True
+        self.assertNotEqual(mass, structure.mass())
+        self.assertNotEqual(composition, structure.total_composition())
+        structure.root.reducing_end = None
+        self.assertAlmostEqual(mass, structure.mass(), 6)
+
+        leaf = list(structure.leaves())[0]
+        leaf.add_monosaccharide(named_structures.monosaccharides["Hex"], 4)
+        self.assertAlmostEqual(structure.mass() - mass, 162.0528, 3)
+
+        dup = pickle.loads(pickle.dumps(structure))
+        self.assertEqual(dup, structure)
+        self.assertAlmostEqual(dup.mass(), structure.mass(), 6)
+
     def test_branch_counts(self):
         structure = load("branchy_glycan")
         self.assertEqual(structure.count_branches(), 3)
@@ -208,5 +384,51 @@ class GlycanTests(unittest.TestCase):
         self.assertEqual(temp, subtree)
         self.assertEqual(Glycan.subtree_from(structure, 1), temp)
 
+
+class FragmentArrayTests(unittest.TestCase):
+
+    def test_matches_fragments(self):
+        structure = load("broad_n_glycan")
+        fragments = list(structure.fragments("AXBY"))
+        array = structure.fragment_array("AXBY")
+        self.assertEqual(len(array), len(fragments))
+        self.assertEqual(list(array), fragments)
+        self.assertEqual(array[-1], fragments[-1])
+        self.assertEqual([f.name for f in array[5:10]], [f.name for f in fragments[5:10]])
+
+    def test_mass_sorted(self):
+        array = load("broad_n_glycan").fragment_array("BY", max_cleavages=2)
+        ordered = array.sorted_by_mass()
+        self.assertEqual(sorted(f.mass for f in array), [f.mass for f in ordered])
+        low, high = ordered.masses[10], ordered.masses[20]
+        self.assertEqual(
+            sorted((f.mass, f.name) for f in array.between(low, high)),
+            sorted((f.mass, f.name) for f in array if low <= f.mass <= high))
+
+    def test_serialization(self):
+        array = load("broad_n_glycan").fragment_array("BY", max_cleavages=2)
+        fragments = list(array)
+        self.assertEqual(list(pickle.loads(pickle.dumps(array, 2))), fragments)
+        buff = StringIO()
+        array.save(buff)
+        buff.seek(0)
+        self.assertEqual(list(glycan.FragmentArray.load(buff)), fragments)
+
+    def test_groups(self):
+        structure = load("broad_n_glycan")
+        groups = list(structure.fragments("BY", max_cleavages=2, group_by="composition"))
+        array = structure.fragment_array("BY", max_cleavages=2, group_by="composition")
+        self.assertEqual(len(array), len(groups))
+        self.assertEqual([array.member_names(i) for i in range(len(array))], [g.names for g in groups])
+        ordered = array.sorted_by_mass()
+        self.assertEqual(sorted(sum((g.names for g in groups), [])),
+                         sorted(sum((ordered.member_names(i) for i in range(len(ordered))), [])))
+        self.assertEqual(ordered[0].names, ordered.member_names(0))
+        buff = StringIO()
+        array.save(buff)
+        buff.seek(0)
+        loaded = glycan.FragmentArray.load(buff)
+        self.assertEqual([g.names for g in loaded], [g.names for g in groups])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+from common import glycoct, load, StringIO
+
+_file_path = "./test_data/glycoct.txt"
+
+
+class GlycoCTStreamingTests(unittest.TestCase):
+
+    def test_stream_matches_read(self):
+        self.assertEqual(list(glycoct.read(_file_path)), list(glycoct.read_stream(_file_path)))
+
+    def test_blocks(self):
+        data = open(_file_path, 'rb').read()
+        blocks = list(glycoct.read_stream(_file_path).blocks())
+        self.assertEqual(len(blocks), 2)
+        for block in blocks:
+            self.assertEqual(data[block.offset:block.offset + block.length], block.text)
+            self.assertTrue(block.text.startswith("RES"))
+
+    def test_shards(self):
+        reference = list(glycoct.read(_file_path))
+        size = len(open(_file_path, 'rb').read())
+        for cut in range(0, size + 1, 5):
+            head = list(glycoct.read_stream(_file_path, end=cut))
+            tail = list(glycoct.read_stream(_file_path, start=cut))
+            self.assertEqual(head + tail, reference)
+
+    def test_resume(self):
+        text = '\n'.join(load(name).to_glycoct() for name in ("common_glycan", "branchy_glycan", "sulfated_glycan"))
+        reader = glycoct.read_stream(StringIO(text))
+        first = next(iter(reader))
+        self.assertEqual(first, load("common_glycan"))
+        rest = list(glycoct.read_stream(StringIO(text), start=reader.offset))
+        self.assertEqual(rest, [load("branchy_glycan"), load("sulfated_glycan")])
+
+
+class GlycoCTIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "structures.txt")
+        with open(self.path, 'w') as handle:
+            handle.write('\n'.join(
+                load(name).to_glycoct() for name in ("common_glycan", "branchy_glycan", "sulfated_glycan")))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_index(self):
+        index = glycoct.GlycoCTIndex.from_file(self.path)
+        self.assertEqual(len(index), 3)
+        self.assertTrue(os.path.exists(glycoct.GlycoCTIndex.index_path(self.path)))
+        self.assertEqual(glycoct.GlycoCTIndex.load(self.path).offsets, index.offsets)
+        self.assertEqual(list(index.read([2, 0])), [load("sulfated_glycan"), load("common_glycan")])
+        self.assertEqual(list(glycoct.read(self.path, select=1)), [load("branchy_glycan")])
+
+    def test_stale_index(self):
+        glycoct.GlycoCTIndex.from_file(self.path)
+        with open(self.path, 'a') as handle:
+            handle.write('\n' + load("complex_glycan").to_glycoct())
+        self.assertRaises(glycoct.GlycoCTError, glycoct.GlycoCTIndex.load, self.path)
+        index = glycoct.GlycoCTIndex.from_file(self.path)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(list(index.read(3)), [load("complex_glycan")])
+
+
+class GlycoCTParallelTests(unittest.TestCase):
+
+    def test_read_parallel(self):
+        reference = list(glycoct.read(_file_path))
+        self.assertEqual(list(glycoct.read_parallel([_file_path, _file_path], processes=2, chunk_size=1)),
+                         reference * 2)
+        unordered = list(glycoct.read_parallel(_file_path, processes=2, chunk_size=1, ordered=False))
+        self.assertEqual(len(unordered), len(reference))
+        for structure in reference:
+            self.assertIn(structure, unordered)
+        self.assertEqual(list(glycoct.read_parallel(_file_path, processes=1)), reference)
+
+
+if __name__ == '__main__':
+    unittest.main()
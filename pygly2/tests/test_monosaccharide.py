@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import unittest
 import json
 import itertools
@@ -5,6 +8,7 @@ import itertools
 from pygly2.structure import named_structures, constants, monosaccharide, substituent, glycan
 from pygly2.composition import structure_composition, Composition, composition_transform
 from pygly2.io import glycoct
+from pygly2.io.nomenclature import identity
 
 from common import StringIO, load, pickle
 
@@ -242,6 +246,61 @@ class MonosaccharideTests(unittest.TestCase):
         hexose.reducing_end = True
         self.assertEqual(hexose.total_composition(), {"C": 6, "O": 6, "H": 14})
 
+    def test_structure_index_mapping(self):
+        index = named_structures.MonosaccharideIndex()
+        # C-level dict paths must see the lazily loaded structures
+        plain = dict(index)
+        self.assertEqual(sorted(plain), sorted(named_structures.monosaccharides))
+        merged = {}
+        merged.update(named_structures.MonosaccharideIndex())
+        self.assertEqual(len(merged), len(plain))
+        self.assertEqual(dict(**named_structures.MonosaccharideIndex())["Glc"], plain["Glc"])
+        self.assertEqual(index, named_structures.MonosaccharideIndex())
+        self.assertIs(index.items()[0][1], index.reference(index.items()[0][0]))
+
+    def test_structure_index_cache(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "monosaccharides.cache")
+            index = named_structures.MonosaccharideIndex(cache_path=path)
+            self.assertFalse(index._loaded)
+            self.assertEqual(len(index), len(named_structures.monosaccharides))
+            self.assertTrue(os.path.exists(path))
+            cached = named_structures.MonosaccharideIndex(cache_path=path)
+            self.assertEqual(sorted(cached), sorted(index))
+            for name in index:
+                self.assertEqual(cached[name], index.reference(name))
+            self.assertIsNot(cached.reference("Glc"), cached["Glc"])
+
+            with open(path, 'wb') as handle:
+                handle.write(b"not a cache")
+            corrupted = named_structures.MonosaccharideIndex(cache_path=path)
+            self.assertEqual(corrupted["Glc"], index["Glc"])
+
+            named_structures.compile_cache(directory)
+            self.assertTrue(os.path.exists(os.path.join(directory, "glycans.cache")))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_identify(self):
+        structure = load("broad_n_glycan")
+        index = identity.reference_index()
+        for node in structure:
+            name = identity.identify(node)
+            for ref_name, ref in named_structures.monosaccharides.items():
+                if ref_name != "Hex" and identity.is_a(node, ref):
+                    self.assertEqual(name, identity.get_preferred_name(ref_name))
+                    break
+            self.assertIn(identity.residue_signature(node), [key[0] for key in index.names])
+        self.assertIs(index, identity.reference_index())
+        hexose = named_structures.monosaccharides["Hex"]
+        self.assertRaises(identity.IdentifyException, identity.identify, hexose)
+        self.assertEqual(identity.identify(hexose, blacklist=[]), identity.get_preferred_name("Hex"))
+        reduced = structure.root.clone()
+        reduced.reducing_end = True
+        self.assertIsNone(identity.residue_signature(reduced))
+        self.assertRaises(identity.IdentifyException, identity.identify, reduced)
+
 
 
 